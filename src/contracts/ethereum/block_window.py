@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from typing import Callable, Optional
+
+DEFAULT_WINDOW_SIZE = 64
+
+
+class BlockHashWindow:
+    """
+    Rolling window of the hashes of the latest canonical blocks, used to detect chain reorganizations
+
+    Every new block is checked against the hash of its parent in the window. When they don't match, we walk back
+    until the window agrees with the node again - the first block that was replaced is the fork point
+    """
+
+    def __init__(self, get_block: Callable, size: int = DEFAULT_WINDOW_SIZE):
+        """
+        :param get_block: returns the block (header) for a block number
+        :param size: number of blocks to track. Reorgs deeper than this can't be detected
+        """
+        self.get_block = get_block
+        self.size = size
+        self._hashes: 'OrderedDict[int, str]' = OrderedDict()
+
+    @property
+    def last(self) -> Optional[int]:
+        return next(reversed(self._hashes)) if self._hashes else None
+
+    def is_canonical(self, number: int, block_hash) -> bool:
+        """Returns False if @block_hash is not the tracked block @number. Blocks outside the window are trusted"""
+        tracked = self._hashes.get(number)
+        return tracked is None or tracked == _hex(block_hash)
+
+    def copy(self) -> 'BlockHashWindow':
+        window = BlockHashWindow(self.get_block, self.size)
+        window._hashes = self._hashes.copy()  # pylint: disable=protected-access
+        return window
+
+    def update(self, head: int) -> Optional[int]:
+        """
+        Tracks the blocks up to @head
+
+        :return: the first block that was replaced if a reorganization was detected, else None
+        """
+        fork = None
+        last = self.last
+
+        if last is not None and head <= last:
+            # the head didn't move (or moved back) - make sure it's still the block we know
+            if self._hashes.get(head) == _hex(self.get_block(head).hash):
+                self._truncate(head)
+                return None
+            fork = self._find_fork(head)
+            self._truncate(head)
+            return fork
+
+        start = max(head - self.size + 1, 0) if last is None else max(last + 1, head - self.size + 1)
+        for number in range(start, head + 1):
+            block = self.get_block(number)
+            parent = self._hashes.get(number - 1)
+            if parent is not None and parent != _hex(block.parentHash):
+                fork = self._find_fork(number - 1)
+            self._track(number, block.hash)
+
+        return fork
+
+    def _find_fork(self, number: int) -> int:
+        """Walks back from @number, replacing hashes, until the window matches the canonical chain"""
+        fork = number
+        while number in self._hashes:
+            canonical = _hex(self.get_block(number).hash)
+            if self._hashes[number] == canonical:
+                break
+            self._hashes[number] = canonical
+            fork = number
+            number -= 1
+        return fork
+
+    def _track(self, number: int, block_hash):
+        self._hashes[number] = _hex(block_hash)
+        while len(self._hashes) > self.size:
+            self._hashes.popitem(last=False)
+
+    def _truncate(self, head: int):
+        while self._hashes and self.last > head:
+            self._hashes.popitem()
+
+
+def _hex(block_hash) -> str:
+    return block_hash.hex() if isinstance(block_hash, bytes) else block_hash
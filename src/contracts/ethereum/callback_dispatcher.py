@@ -0,0 +1,139 @@
+from logging import Logger
+from queue import Queue
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 1000
+
+# tells a worker to exit
+_STOP = object()
+
+
+class CallbackStats(NamedTuple):
+    calls: int
+    errors: int
+    total_time: float
+    max_time: float
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class _Barrier:
+    """Runs @fn once every worker reached it - i.e. after everything queued before it was handled"""
+
+    def __init__(self, fn: Callable, parties: int):
+        self.fn = fn
+        self.remaining = parties
+        self.lock = Lock()
+
+    def arrive(self):
+        with self.lock:
+            self.remaining -= 1
+            done = self.remaining == 0
+        if done:
+            self.fn()
+
+
+class CallbackDispatcher:
+    """
+    Runs event callbacks on a pool of worker threads, so a slow callback (a secretcli call, a signed transaction)
+    doesn't stall the event listener
+
+    Each worker has its own bounded queue. Work is assigned to a worker by key (the callback by default), so callbacks
+    with the same key run one at a time, in the order they were submitted. When a queue is full, submit() blocks
+    until the worker catches up, which slows the listener down instead of piling up events in memory
+
+    Failed callbacks are kept (see failed_events) until they succeed on a retry (see retry_failed)
+    """
+
+    def __init__(self, logger: Logger, workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 name: str = 'CallbackDispatcher'):
+        self.logger = logger
+        self.queues: List[Queue] = [Queue(maxsize=queue_size) for _ in range(max(workers, 1))]
+        self.stats_lock = Lock()
+        self._stats: Dict[str, CallbackStats] = {}
+        # (callback, event) by (callback, id(event)) - failed and not retried yet, and retried but not done yet
+        self.failures_lock = Lock()
+        self._failed: Dict[Tuple[Callable, int], Tuple[Callable, Any]] = {}
+        self._retrying: Dict[Tuple[Callable, int], Tuple[Callable, Any]] = {}
+        self.workers = [Thread(target=self._work, args=(queue,), name=f'{name}-{i}', daemon=True)
+                        for i, queue in enumerate(self.queues)]
+        for worker in self.workers:
+            worker.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of callbacks waiting to run"""
+        return sum(queue.qsize() for queue in self.queues)
+
+    def stats(self) -> Dict[str, CallbackStats]:
+        """Calls, errors and latency (seconds) of each callback, by name"""
+        with self.stats_lock:
+            return dict(self._stats)
+
+    def failed_events(self) -> List[Any]:
+        """Events whose callback failed, and didn't succeed on a retry yet"""
+        with self.failures_lock:
+            return [event for _, event in [*self._failed.values(), *self._retrying.values()]]
+
+    def retry_failed(self) -> int:
+        """Submits the failed callbacks again. Returns how many were retried"""
+        with self.failures_lock:
+            failed = list(self._failed.values())
+            self._retrying.update(self._failed)
+            self._failed.clear()
+        for callback, event in failed:
+            self.submit(callback, event)
+        return len(failed)
+
+    def submit(self, callback: Callable, event, key: Optional[Hashable] = None):
+        """Queues callback(event). Blocks while the queue of the worker in charge of @key is full"""
+        if key is None:
+            key = callback
+        self.queues[hash(key) % len(self.queues)].put((callback, event))
+
+    def after_pending(self, fn: Callable):
+        """Runs @fn (on one of the workers) once all the callbacks submitted so far are done"""
+        barrier = _Barrier(fn, len(self.queues))
+        for queue in self.queues:
+            queue.put((barrier, None))
+
+    def stop(self):
+        for queue in self.queues:
+            queue.put((_STOP, None))
+
+    def _work(self, queue: Queue):
+        while True:
+            callback, event = queue.get()
+            if callback is _STOP:
+                return
+            if isinstance(callback, _Barrier):
+                self._run(callback.arrive)
+                continue
+            failed = self._run(callback, event)
+
+            with self.failures_lock:
+                self._retrying.pop((callback, id(event)), None)
+                if failed:
+                    self._failed[(callback, id(event))] = (callback, event)
+
+    def _run(self, callback: Callable, *args) -> bool:
+        """Returns True if @callback failed"""
+        name = getattr(callback, '__qualname__', repr(callback))
+        start = perf_counter()
+        failed = False
+        try:
+            callback(*args)
+        except Exception:  # pylint: disable=broad-except
+            failed = True
+            self.logger.exception(f"Callback {name} failed")
+        elapsed = perf_counter() - start
+
+        with self.stats_lock:
+            calls, errors, total_time, max_time = self._stats.get(name, CallbackStats(0, 0, 0.0, 0.0))
+            self._stats[name] = CallbackStats(calls + 1, errors + failed, total_time + elapsed, max(max_time, elapsed))
+        return failed
@@ -0,0 +1,179 @@
+from threading import Event, Lock, Thread
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from src.contracts.ethereum.block_window import BlockHashWindow, DEFAULT_WINDOW_SIZE
+from src.util.config import Config
+from src.util.eth.head_subscription import NewHeadsSubscription
+from src.util.eth.event_decoder import log_topic
+from src.util.logger import get_logger
+from src.util.web3 import get_block, w3
+
+
+class HeadSubscriber(Protocol):
+    """Anything that wants the new logs of a contract whenever the chain moves (see EthEventListener)"""
+
+    def log_filter(self) -> Tuple[str, List[str]]:
+        """Returns the address of the contract, and the topics (topic0 hex) it wants logs of"""
+
+    def on_new_head(self, head: int, fork: Optional[int], logs: List):
+        """
+        Called from the ChainHead thread with the new logs of the contract
+
+        :param head: the current head
+        :param fork: the first replaced block if there was a reorganization, in which case @logs contain the logs of
+                     all the blocks from @fork (and not only the new blocks)
+        :param logs: raw logs of the subscriber's contract and topics, in block order
+        """
+
+
+class ChainHead(Thread):
+    """
+    Follows the head of the chain once for the whole process, and fans the new logs out to all the subscribers
+
+    Each new block is fetched once (for reorg detection), and the logs of all the subscribed contracts are fetched
+    with a single eth_getLogs, so the RPC load doesn't grow with the number of listeners and they all see the same head
+    """
+    _instance: Optional['ChainHead'] = None
+    _instance_lock = Lock()
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.logger = get_logger(
+            db_name=config.db_name,
+            loglevel=config.log_level,
+            logger_name=self.__class__.__name__
+        )
+        # subscribers, and the last block delivered to each of them
+        self.subscribers: Dict[HeadSubscriber, int] = {}
+        self.head_subscription = NewHeadsSubscription.for_endpoint(config.eth_node)
+        self.block_window = BlockHashWindow(get_block, size=max(2 * config.eth_confirmations, DEFAULT_WINDOW_SIZE))
+        self.head: Optional[int] = None
+        # last block we fetched logs for
+        self.last_fetched: Optional[int] = None
+        # guards the subscribers and the block window - never held while waiting for the node
+        self.lock = Lock()
+        self.stop_event = Event()
+        super().__init__(group=None, name=self.__class__.__name__, target=self.run)
+        self.setDaemon(True)
+
+    @classmethod
+    def instance(cls, config: Config) -> 'ChainHead':
+        """Returns the (started) service shared by everyone in the process"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(config)
+                cls._instance.start()
+            return cls._instance
+
+    def subscribe(self, subscriber: HeadSubscriber) -> int:
+        """
+        Adds a subscriber (or refreshes the topics of an existing one)
+
+        :return: the last block which was already delivered - the subscriber gets the logs of every block after it
+        """
+        current = self.current_block() if self.last_fetched is None else None
+        with self.lock:
+            if self.last_fetched is None:
+                self.last_fetched = current
+            return self.subscribers.setdefault(subscriber, self.last_fetched)
+
+    def unsubscribe(self, subscriber: HeadSubscriber):
+        with self.lock:
+            self.subscribers.pop(subscriber, None)
+
+    def is_canonical(self, number: int, block_hash) -> bool:
+        with self.lock:
+            return self.block_window.is_canonical(number, block_hash)
+
+    def current_block(self) -> int:
+        if self.head is not None and self.head_subscription is not None and self.head_subscription.connected:
+            return self.head
+        return w3.eth.blockNumber
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        self.logger.info("Starting..")
+        while not self.stop_event.is_set():
+            try:
+                self._tick()
+            except Exception as e:  # pylint: disable=broad-except
+                # everyone in the process depends on this thread - whatever went wrong, try again on the next block
+                self.logger.error(f"Failed to follow the head of the chain: {e!r}")
+            self._wait_for_new_block()
+
+    def _wait_for_new_block(self):
+        """
+        With a WebSocket or IPC node we wake up as soon as a new block arrives (or after sleep_interval, in case
+        the subscription is down). With HTTP we just poll every sleep_interval
+        """
+        if self.head_subscription is None:
+            self.stop_event.wait(self.config.sleep_interval)
+            return
+        self.head = self.head_subscription.wait_for_head(self.head, timeout=self.config.sleep_interval)
+
+    def _tick(self):
+        """
+        Fetches the new blocks and logs without holding the lock (the subscribers check blocks against the window,
+        and may subscribe, meanwhile), and then delivers each subscriber the logs of the blocks it didn't get yet
+        """
+        head = self.current_block()
+        # only this thread updates the window - the updated copy replaces it once it's done
+        block_window = self.block_window.copy()
+        fork = block_window.update(head)
+        if fork is not None:
+            self.logger.warning(f"Chain reorganization from block {fork} (head {head})")
+
+        with self.lock:
+            subscribers = [(subscriber, delivered, *subscriber.log_filter())
+                           for subscriber, delivered in self.subscribers.items()]
+            last_fetched = self.last_fetched
+
+        from_block = min([delivered + 1 for _, delivered, _, _ in subscribers] +
+                         [last_fetched + 1 if last_fetched is not None else head])
+        if fork is not None:
+            from_block = min(from_block, fork)
+        if from_block > head and fork is None:
+            with self.lock:
+                self.block_window = block_window
+            return
+
+        logs = self._get_logs(subscribers, from_block, head)
+
+        deliveries = []
+        with self.lock:
+            self.block_window = block_window
+            self.last_fetched = head
+            for subscriber, delivered, address, topics in subscribers:
+                # a subscriber that left, or changed its topics meanwhile, gets the whole range on the next tick
+                if subscriber not in self.subscribers or subscriber.log_filter() != (address, topics):
+                    continue
+                self.subscribers[subscriber] = head
+                deliveries.append((subscriber, delivered, address, topics))
+
+        for subscriber, delivered, address, topics in deliveries:
+            first = delivered + 1 if fork is None else min(delivered + 1, fork)
+            matching = [log for log in logs if log['blockNumber'] >= first and
+                        log['address'].lower() == address.lower() and log_topic(log) in topics]
+            subscriber.on_new_head(head, fork, matching)
+
+    @staticmethod
+    def _get_logs(subscribers: List[Tuple[HeadSubscriber, int, str, List[str]]], from_block: int,
+                  to_block: int) -> List:
+        addresses: Dict[str, None] = {}
+        topics: Dict[str, None] = {}
+        for _, _, address, subscriber_topics in subscribers:
+            if subscriber_topics:
+                addresses[address] = None
+                topics.update(dict.fromkeys(subscriber_topics))
+
+        if not topics or from_block > to_block:
+            return []
+
+        return w3.eth.getLogs({
+            'address': list(addresses),
+            'topics': [list(topics)],
+            'fromBlock': from_block,
+            'toBlock': to_block
+        })
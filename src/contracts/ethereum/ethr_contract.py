@@ -9,7 +9,8 @@ from web3.datastructures import AttributeDict
 
 from src.util.crypto_store.crypto_manager import CryptoManagerBase
 from src.util.eth.transaction import Transaction
-from src.util.web3 import normalize_address, send_contract_tx, event_log, w3
+from src.util.eth.event_decoder import EventDecoder
+from src.util.web3 import normalize_address, send_contract_tx, w3
 
 GAS_LIMIT_DEFAULT = 4000000
 
@@ -28,6 +29,8 @@ class EthereumContract:
 
     def __init__(self, provider: Web3, contract_address: str, abi_path: str):
         self.abi = self.load_abi(abi_path)
+        # decoders for all the contract's events, built once
+        self.decoder = EventDecoder(self.abi)
         self._address = contract_address
         self.contract = provider.eth.contract(address=normalize_address(self._address), abi=self.abi)
         self.provider = provider
@@ -47,11 +50,12 @@ class EthereumContract:
 
         :param tx_id: a valid 32 byte hex string
         """
-        _, log = event_log(tx_id, self.tracked_event(), self.provider, self.contract)
-
-        if not log:  # because for some reason event_log can return None???
-            return None
-        return log
+        receipt = self.provider.eth.getTransactionReceipt(tx_id)
+        for event_name in self.tracked_event():
+            logs = self.decoder.decode_receipt(receipt, [event_name])
+            if logs:
+                return logs[0]
+        return None
 
     def send_transaction(self, func_name: str, from_: str, private_key: bytes, gas, gas_price=None, args: Tuple = None):
         """
@@ -66,10 +70,16 @@ class EthereumContract:
         return send_contract_tx(self.contract, func_name, from_, private_key, gas, gas_price=gas_price, args=args)
 
     def raw_transaction(self, account: str, value: int, data: str = '0x',
-                        gas_price=None, gas_limit=None) -> Transaction:
+                        gas_price=None, gas_limit=None, nonce: Optional[int] = None,
+                        network_gas_price: Optional[int] = None) -> Transaction:
+        """
+        :param gas_price: in gwei. When not set we use @network_gas_price (wei), or ask the node
+        :param nonce: when not set we ask the node
+        """
         address = to_checksum_address(account)
-        nonce = w3.eth.getTransactionCount(address, block_identifier='pending')
-        _gas_price = gas_price * 1e9 if gas_price else estimate_gas_price()
+        if nonce is None:
+            nonce = w3.eth.getTransactionCount(address, block_identifier='pending')
+        _gas_price = gas_price * 1e9 if gas_price else (network_gas_price or estimate_gas_price())
         _gas_limit = gas_limit or GAS_LIMIT_DEFAULT
         tx = Transaction(nonce=nonce,
                          gasprice=_gas_price,
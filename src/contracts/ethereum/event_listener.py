@@ -1,19 +1,26 @@
 from collections.abc import MutableMapping
+from functools import partial
 from itertools import count
+from queue import Empty, Queue
 from threading import Event
 from time import sleep
-from typing import List, Callable, Iterator, Dict, Tuple, Union
+from typing import List, Callable, Iterator, Tuple, Optional, Union
 
-from web3.contract import LogFilter, LogReceipt
+from web3.contract import LogReceipt
 
+from src.contracts.ethereum.callback_dispatcher import CallbackDispatcher, DEFAULT_QUEUE_SIZE, DEFAULT_WORKERS
+from src.contracts.ethereum.chain_head import ChainHead
 from src.contracts.ethereum.ethr_contract import EthereumContract
+from src.contracts.ethereum.pending_events import PendingEvents
 from src.contracts.event_provider import EventProvider
+from src.db.collections.swaptrackerobject import SwapTrackerObject
 from src.util.config import Config
+from src.util.eth.log_scanner import LogScanner
 from src.util.logger import get_logger
 from src.util.web3 import contract_event_in_range, w3
 
 
-class EthEventListener(EventProvider):
+class EthEventListener(EventProvider):  # pylint: disable=too-many-instance-attributes
     """Tracks the block-chain for new transactions on a given address"""
     _ids = count(0)
     _chain = "ETH"
@@ -24,20 +31,33 @@ class EthEventListener(EventProvider):
         self.tracked_contract = contract
         self.config = config
         self.callbacks = Callbacks()
+        self.prefetchers: List[Callable[[List[LogReceipt]], None]] = []
         self.logger = get_logger(
             db_name=config.db_name,
             loglevel=config.log_level,
             logger_name=config.logger_name or f"{self.__class__.__name__}-{self.id}"
         )
         self.events = []
-        self.pending_events: List[Tuple[str, LogReceipt]] = []
-        self.filters: Dict[str, LogFilter] = {}
+        self.pending_events = PendingEvents()
+        # topic0 (hex) of the registered events
+        self.topics: List[str] = []
         self.confirmations = config.eth_confirmations
+        self.cursors: List[str] = []
+        self.cursor_block = -1
+        self.chain_head = ChainHead.instance(config)
+        # updates from the chain head service - (head, fork, logs)
+        self.updates: Queue = Queue()
         self.stop_event = Event()
+        # callbacks run on their own threads, so a slow callback doesn't hold up new events
+        self.dispatcher = CallbackDispatcher(self.logger,
+                                             workers=config.eth_callback_workers or DEFAULT_WORKERS,
+                                             queue_size=config.eth_callback_queue_size or DEFAULT_QUEUE_SIZE,
+                                             name=f"EventCallbacks-{self.id}")
         super().__init__(group=None, name=f"EventListener-{config.logger_name}", target=self.run, **kwargs)
         self.setDaemon(True)
 
-    def register(self, callback: Callable, events: List[str], from_block="latest"):
+    def register(self, callback: Callable, events: List[str], from_block: Union[str, int] = "latest",
+                 cursor: Optional[str] = None):
         """
         Allows registration to certain event of contract with confirmations threshold
         Note: events are Case Sensitive
@@ -45,21 +65,51 @@ class EthEventListener(EventProvider):
         :param callback: callback function that will be invoked upon event
         :param events: list of events the caller wants to register to
         :param from_block: Starting block
+        :param cursor: unique name under which the last confirmed block is saved in the db. When the cursor was saved
+                       before, we resume from the saved block (inclusive - callbacks have to be idempotent) instead of
+                       @from_block, so restarts don't rescan the whole history
         """
+        if cursor is not None:
+            saved = SwapTrackerObject.get_or_create(src=cursor).nonce
+            if saved >= 0:
+                self.logger.info(f"Resuming {events} from block {saved}")
+                from_block = saved if from_block == "latest" else max(from_block, saved)
+            if cursor not in self.cursors:
+                self.cursors.append(cursor)
+
         for event_name in events:
             self.logger.info(f"registering event {event_name}")
             self.events.append(event_name)
             self.callbacks[event_name] = callback
 
-            event = getattr(self.tracked_contract.contract.events, event_name)
-            evt_filter = event.createFilter(fromBlock="latest")
-            self.filters[event_name] = evt_filter
+        self.topics = self.tracked_contract.decoder.topics(self.events)
+        # every block after the one returned here is delivered by the chain head service
+        delivered = self.chain_head.subscribe(self)
+
+        if from_block != "latest":
+            self.add_events_in_range(events, from_block=from_block, to_block=delivered)
+
+    def register_prefetch(self, prefetch: Callable[[List[LogReceipt]], None]):
+        """
+        @prefetch gets all the events found when catching up on a range, before their callbacks run, so it can read
+        whatever the callbacks need in bulk. Register it before the events it's for
+        """
+        self.prefetchers.append(prefetch)
+
+    def log_filter(self) -> Tuple[str, List[str]]:
+        return self.tracked_contract.contract.address, self.topics
 
-            if from_block != "latest":
-                self.add_events_in_range(event_name, from_block=from_block, to_block=w3.eth.blockNumber)
+    def on_new_head(self, head: int, fork: Optional[int], logs: List):
+        self.updates.put((head, fork, logs))
+
+    def is_alive(self) -> bool:
+        """New blocks only come from the chain head service, so without it the listener is as good as dead"""
+        return super().is_alive() and self.chain_head.is_alive()
 
     def stop(self):
         self.logger.info("Stopping..")
+        self.chain_head.unsubscribe(self)
+        self.dispatcher.stop()
         self.stop_event.set()
 
     def run(self):
@@ -67,43 +117,106 @@ class EthEventListener(EventProvider):
         self.logger.info("Starting..")
 
         while not self.stop_event.is_set():
-            self.logger.debug(f'Scanning for new events of type {self.events}')
-            for name, event in self.get_new_events():
+            self._retry_failed()
+            try:
+                head, fork, logs = self.updates.get(timeout=self.config.sleep_interval)
+            except Empty:
+                continue
+
+            if fork is not None:
+                self._handle_reorg(fork, head)
+
+            for log in logs:
+                name, event = self._decode(log)
                 self.logger.info(f"New event found {name}, adding to confirmation handler")
-                self.pending_events.append((name, event))
-            for name, event in self.confirmation_handler():
+                self.pending_events.push(name, event)
+
+            for name, event in self.confirmation_handler(head):
                 self.logger.info(f"Event {name} passed confirmation limit, executing callback")
-                self.callbacks.trigger(name, event)
+                for callback in self.callbacks[name]:
+                    self.dispatcher.submit(callback, event)
 
-            sleep(self.config.sleep_interval)
+            self._save_cursors(head - self.confirmations)
 
-    def confirmation_handler(self):
-        blockNum = w3.eth.blockNumber
-        # this creates a copy of the list, so we can remove from the original one while still iterating
-        for item in list(self.pending_events):
-            _name, event = item
-            if event.blockNumber <= (blockNum - self.confirmations):
-                self.pending_events.remove(item)
-                yield item
+    def _save_cursors(self, confirmed_block: int):
+        """
+        All the events up to @confirmed_block were dispatched, so that's where we resume from after a restart. The
+        cursors are saved only once the callbacks of these events are done
+        """
+        if not self.cursors or confirmed_block <= self.cursor_block:
+            return
+        self.dispatcher.after_pending(partial(self._update_cursors, confirmed_block))
+        self.cursor_block = confirmed_block
+
+    def _retry_failed(self):
+        """Callbacks that failed (e.g. the node was down) are retried every sleep_interval until they succeed"""
+        retried = self.dispatcher.retry_failed()
+        if retried:
+            self.logger.warning(f"Retrying {retried} failed callbacks")
+
+    def _update_cursors(self, confirmed_block: int):
+        # we resume from the first block with an event whose callback failed, until it succeeds on a retry
+        failed = [event.blockNumber for event in self.dispatcher.failed_events()]
+        if failed and min(failed) <= confirmed_block:
+            self.logger.warning(f"Callbacks of block {min(failed)} failed - not saving the cursors past it")
+            confirmed_block = min(failed)
+        for cursor in self.cursors:
+            SwapTrackerObject.update_last_processed(cursor, confirmed_block)
+
+    def _decode(self, log) -> Tuple[str, LogReceipt]:
+        event = self.tracked_contract.decoder.decode(log)
+        return event.event, event
+
+    def _handle_reorg(self, fork: int, head: int):
+        """
+        Retracts the pending events from the replaced blocks. The chain head service delivers the logs of all the
+        blocks from the fork point along with the reorg, so the events of the new blocks are re-emitted right after
+        """
+        retracted = self.pending_events.drop_from(fork)
+        self.logger.warning(f"Chain reorganization from block {fork} (head {head}), "
+                            f"retracted {retracted} pending events")
+        if fork <= head - self.confirmations:
+            self.logger.critical(f"Reorganization from block {fork} is deeper than {self.confirmations} confirmations,"
+                                 f" events from the replaced blocks might have been handled already")
+
+    def confirmation_handler(self, head: Optional[int] = None) -> List[Tuple[str, LogReceipt]]:
+        """Returns the pending events that have enough confirmations, and are still part of the canonical chain"""
+        if head is None:
+            head = self.chain_head.current_block()
+
+        res = []
+        for name, event in self.pending_events.pop_confirmed(head - self.confirmations):
+            if not self.chain_head.is_canonical(event.blockNumber, event.blockHash):
+                self.logger.warning(f"Dropping event {name} from orphaned block {event.blockNumber}")
+                continue
+            res.append((name, event))
+        return res
 
     def events_in_range(self, event: str, from_block: int, to_block: int = None):
         """ Returns a generator that yields all contract events in range"""
         return contract_event_in_range(self.tracked_contract, event, from_block=from_block,
                                        to_block=to_block)
 
-    def add_events_in_range(self, event_name, from_block: Union[int, str], to_block: int):
+    def add_events_in_range(self, events: List[str], from_block: int, to_block: int):
         """
         Used to catch up for all the events from when we wanted to start, and where we are now.
-        Todo: check on ropsten and mainnet if this behaves the same way
         """
-        event = getattr(self.tracked_contract.contract.events, event_name)
-        evt_filter = event.createFilter(fromBlock=from_block, toBlock=to_block)
-        for event in evt_filter.get_all_entries():
-            self.pending_events.append((event_name, event))
+        scanner = LogScanner(w3, self.tracked_contract.contract, events, self.logger,
+                             decoder=self.tracked_contract.decoder)
+        found = list(scanner.scan(from_block, to_block))
+
+        for prefetch in self.prefetchers:
+            try:
+                prefetch(found)
+            except (ValueError, OSError) as e:
+                self.logger.warning(f"Failed to prefetch data for {len(found)} events: {e}")
+
+        for event in found:
+            self.pending_events.push(event.event, event)
 
     def wait_for_block(self, number: int) -> int:
         while True:
-            block = (w3.eth.blockNumber - self.confirmations)
+            block = (self.chain_head.current_block() - self.confirmations)
             if block >= number:
                 return block
             sleep(self.config.sleep_interval)
@@ -111,14 +224,6 @@ class EthEventListener(EventProvider):
     def confirmation_manager(self):
         pass
 
-    def get_new_events(self):
-        """
-        Return new events from the filters (starting from events that were generated after the filters were created)
-        """
-        for name, log_filter in self.filters.items():
-            for event in log_filter.get_new_entries():
-                yield name, event
-
 
 class Callbacks(MutableMapping):
     """Utility class that manages events registration by confirmation threshold"""
@@ -145,9 +250,3 @@ class Callbacks(MutableMapping):
         if key not in self.store:
             return []
         return self.store[key]
-
-    def trigger(self, event_name: str, event):
-        """ call all the callbacks whose confirmation threshold reached """
-
-        for callback in self[event_name]:
-            callback(event)
@@ -0,0 +1,80 @@
+from typing import Any, Dict, List, Optional
+
+from hexbytes import HexBytes
+from mongoengine import NotUniqueError
+from web3.datastructures import AttributeDict
+
+from src.contracts.ethereum.ethr_contract import EthereumContract
+from src.db.collections.eth_event import EthereumEvent
+
+
+class EventStore:
+    """
+    Confirmed events of a contract, as seen by the event listener of one party (@observer), kept in the db
+
+    Reading an event from here replaces fetching and decoding the whole receipt from the node. Every party fills its own
+    store from its own listener, so a signer never validates against events observed by someone else
+    """
+
+    def __init__(self, observer: str, contract: EthereumContract, events: List[str]):
+        self.observer = observer
+        self.address = contract.address
+        self.inputs: Dict[str, Dict[str, str]] = {}
+        for event_name in events:
+            # noinspection PyProtectedMember
+            abi = getattr(contract.contract.events, event_name)._get_event_abi()  # pylint: disable=protected-access
+            self.inputs[event_name] = {arg['name']: arg['type'] for arg in abi['inputs']}
+
+    def add(self, event: AttributeDict):
+        """Saves a decoded event. Events we already have are ignored"""
+        types = self.inputs[event.event]
+        try:
+            EthereumEvent(
+                observer=self.observer,
+                tx_hash=event.transactionHash.hex(),
+                log_index=event.logIndex,
+                transaction_index=event.transactionIndex,
+                block_number=event.blockNumber,
+                block_hash=event.blockHash.hex(),
+                address=event.address,
+                event=event.event,
+                args={name: _to_db(types[name], value) for name, value in event.args.items()}
+            ).save()
+        except NotUniqueError:
+            pass
+
+    def get(self, tx_hash: str) -> Optional[AttributeDict]:
+        """Returns the first event of the tx, decoded the same way as EthereumContract.get_events_by_tx"""
+        doc = EthereumEvent.objects(observer=self.observer, tx_hash=tx_hash.lower(),
+                                    event__in=list(self.inputs)).order_by('log_index').first()
+        if doc is None:
+            return None
+
+        types = self.inputs[doc.event]
+        return AttributeDict({
+            'args': AttributeDict({name: _from_db(types[name], value) for name, value in doc.args.items()}),
+            'event': doc.event,
+            'logIndex': doc.log_index,
+            'transactionIndex': doc.transaction_index,
+            'transactionHash': HexBytes(doc.tx_hash),
+            'address': doc.address,
+            'blockHash': HexBytes(doc.block_hash),
+            'blockNumber': doc.block_number,
+        })
+
+
+def _to_db(abi_type: str, value) -> Any:
+    # uint256 doesn't fit in a mongo int, and bytes are kept as hex so the documents stay readable
+    if isinstance(value, bytes):
+        return HexBytes(value).hex()
+    if abi_type.startswith(('uint', 'int')):
+        return str(value)
+    return value
+
+
+def _from_db(abi_type: str, value) -> Any:
+    if abi_type.startswith('bytes'):
+        return bytes(HexBytes(value))
+    if abi_type.startswith(('uint', 'int')):
+        return int(value)
+    return value
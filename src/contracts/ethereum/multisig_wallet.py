@@ -1,22 +1,40 @@
 import os
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
 
+from hexbytes import HexBytes
 from web3 import Web3
 from web3.datastructures import AttributeDict
 
 from src.contracts.ethereum.ethr_contract import EthereumContract
 from src.contracts.ethereum.message import Submit, Confirm
 from src.util.common import project_base_path
+from src.util.config import config
+from src.util.eth.rpc_batch import RpcBatch, call_data, decode_output
+from src.util.eth.rpc_cache import LRUCache
+from src.util.web3 import normalize_address
+
+# view calls per eth_call (or JSON-RPC batch) when reading submissions in bulk
+BULK_CHUNK = 200
 
 
 class MultisigWallet(EthereumContract):
     SUBMIT_GAS = 5000000
     CONFIRM_GAS = 600000
+    # executed submissions never change, so they're shared by all the wallets in the process
+    executed_submissions = LRUCache()
 
-    def __init__(self, provider: Web3, contract_address: str):
+    def __init__(self, provider: Web3, contract_address: str, multicall_address: Optional[str] = None):
         abi_path = os.path.join(project_base_path(), 'src', 'contracts', 'ethereum', 'abi', 'MultiSigSwapWallet.json')
         super().__init__(provider, contract_address, abi_path)
 
+        # used to read submissions in bulk when it's deployed, otherwise we use JSON-RPC batches
+        self.multicall = None
+        multicall_address = multicall_address or config.multicall_address
+        if multicall_address:
+            multicall_abi = os.path.join(project_base_path(), 'src', 'contracts', 'ethereum', 'abi', 'Multicall.json')
+            self.multicall = provider.eth.contract(address=normalize_address(multicall_address),
+                                                   abi=self.load_abi(multicall_abi))
+
     def submit_transaction(self, from_: str, private_key: bytes, gas_price, message: Submit):
         return self.send_transaction(
             'submitTransaction',
@@ -63,7 +81,57 @@ class MultisigWallet(EthereumContract):
         return tx_hash
 
     def submission_data(self, transaction_id) -> Dict[str, any]:
-        data = self.contract.functions.transactions(transaction_id).call()
+        found, data = self.executed_submissions.get((self.address.lower(), transaction_id))
+        if not found:
+            data = self.contract.functions.transactions(transaction_id).call()
+        return self.parse_submission(transaction_id, data)
+
+    def executed_submission(self, transaction_id) -> Optional[Dict[str, any]]:
+        """Returns the submission if we already know it was executed, without asking the node"""
+        found, data = self.executed_submissions.get((self.address.lower(), transaction_id))
+        return self.parse_submission(transaction_id, data) if found else None
+
+    def submissions_data(self, transaction_ids: Iterable[int], account: Optional[str] = None) -> List[Dict[str, any]]:
+        """
+        Same as submission_data for many transactions at once, with BULK_CHUNK view calls per request
+
+        :param account: when set, each result also has 'confirmed' - confirmations(transaction_id, account)
+        """
+        transaction_ids = list(transaction_ids)
+        functions = []
+        for transaction_id in transaction_ids:
+            functions.append(self.contract.functions.transactions(transaction_id))
+            if account:
+                functions.append(self.contract.functions.confirmations(transaction_id, account))
+
+        outputs = []
+        for i in range(0, len(functions), BULK_CHUNK):
+            outputs.extend(self._bulk_call(functions[i:i + BULK_CHUNK]))
+
+        step = 2 if account else 1
+        res = []
+        for i, transaction_id in enumerate(transaction_ids):
+            data = self.parse_submission(transaction_id, outputs[i * step])
+            if account:
+                data['confirmed'] = outputs[i * step + 1]
+            res.append(data)
+        return res
+
+    def _bulk_call(self, functions: List) -> List:
+        if self.multicall is not None:
+            calls = [(function.address, HexBytes(call_data(function))) for function in functions]
+            _, return_data = self.multicall.functions.aggregate(calls).call()
+            return [decode_output(self.provider, function, data) for function, data in zip(functions, return_data)]
+
+        batch = RpcBatch(self.provider)
+        for function in functions:
+            batch.call(function)
+        return batch.execute()
+
+    def parse_submission(self, transaction_id, data: List) -> Dict[str, any]:
+        """Converts the output of transactions(@transaction_id) (which can come from a batch, see RpcBatch)"""
+        if data[3]:
+            self.executed_submissions.put((self.address.lower(), transaction_id), data)
 
         return {
             'dest': data[0],
@@ -0,0 +1,70 @@
+from heapq import heapify, heappop, heappush
+from itertools import count
+from threading import Lock
+from typing import Any, List, Set, Tuple
+
+
+def event_key(event) -> Tuple[str, int, str]:
+    """Identifies a log - the same log in a block of a different fork gets a different key"""
+    return event['transactionHash'].hex(), event['logIndex'], event['blockHash'].hex()
+
+
+class PendingEvents:
+    """
+    Events waiting for confirmations, kept in a min-heap ordered by (block number, log index)
+
+    Confirming events only pops the events up to the confirmed block, and stops at the first event which is
+    still unconfirmed, so the cost of a tick doesn't depend on the size of the backlog
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[int, int, int, str, Any]] = []
+        self._keys: Set[Tuple[str, int, str]] = set()
+        # breaks ties between entries of the same log, so the events themselves are never compared
+        self._counter = count()
+        self._lock = Lock()
+
+    def push(self, name: str, event):
+        """Adds an event, unless the same log (in the same block) is already pending"""
+        key = event_key(event)
+        with self._lock:
+            if key in self._keys:
+                return
+            self._keys.add(key)
+            heappush(self._heap, (event['blockNumber'], event['logIndex'], next(self._counter), name, event))
+
+    def pop_confirmed(self, confirmed_block: int) -> List[Tuple[str, Any]]:
+        """Removes and returns all the events at or below @confirmed_block, in block order"""
+        res = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= confirmed_block:
+                *_, name, event = heappop(self._heap)
+                self._keys.discard(event_key(event))
+                res.append((name, event))
+        return res
+
+    def discard(self, event) -> bool:
+        """Removes a single log (i.e. a log the node reported as removed). Returns True if it was pending"""
+        key = event_key(event)
+        with self._lock:
+            if key not in self._keys:
+                return False
+            self._remove(lambda item: event_key(item[-1]) == key)
+            return True
+
+    def drop_from(self, block: int) -> int:
+        """Removes all the events at or above @block (i.e. after a chain reorganization). Returns how many"""
+        with self._lock:
+            return self._remove(lambda item: item[0] >= block)
+
+    def _remove(self, predicate) -> int:
+        removed = [item for item in self._heap if predicate(item)]
+        if removed:
+            self._heap = [item for item in self._heap if not predicate(item)]
+            heapify(self._heap)
+            for item in removed:
+                self._keys.discard(event_key(item[-1]))
+        return len(removed)
+
+    def __len__(self) -> int:
+        return len(self._heap)
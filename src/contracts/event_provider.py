@@ -1,6 +1,6 @@
 from abc import ABC
 from threading import Thread
-from typing import Callable, List, Generator, Union
+from typing import Callable, List, Generator, Optional, Union
 
 
 class EventProvider(ABC, Thread):
@@ -12,7 +12,8 @@ class EventProvider(ABC, Thread):
             raise NotImplementedError
         return self._chain
 
-    def register(self, callback: Callable, events: List[str], from_block: Union[str, int]):
+    def register(self, callback: Callable, events: List[str], from_block: Union[str, int],
+                 cursor: Optional[str] = None):
         raise NotImplementedError
 
     def run(self) -> Generator:
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from mongoengine import Document, StringField, IntField, DictField, DateTimeField
+
+
+class EthereumEvent(Document):
+    """A confirmed contract event, as seen by @observer's own event listener"""
+    observer = StringField(required=True)
+    tx_hash = StringField(required=True)
+    log_index = IntField(required=True)
+    transaction_index = IntField(required=True)
+    block_number = IntField(required=True)
+    block_hash = StringField(required=True)
+    address = StringField(required=True)
+    event = StringField(required=True)
+    args = DictField(required=True)
+    creation = DateTimeField(default=datetime.now, required=True)
+
+    meta = {
+        'indexes': [
+            {'fields': ['observer', 'tx_hash', 'log_index'], 'unique': True}
+        ]
+    }
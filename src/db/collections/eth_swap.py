@@ -1,5 +1,6 @@
 from datetime import datetime
 from enum import Enum, auto
+from typing import Dict, List
 
 from mongoengine import Document, StringField, DateTimeField, signals, IntField
 
@@ -13,6 +14,8 @@ class Status(Enum):
     SWAP_CONFIRMED = auto()
     SWAP_FAILED = auto()
     SWAP_RETRY = auto()
+    # saved, but not visible to the signers until the rest of its batch is saved too
+    SWAP_STAGED = auto()
 
 
 class Swap(Document):
@@ -29,6 +32,25 @@ class Swap(Document):
     created_on = DateTimeField(default=datetime.utcnow)
     updated_on = DateTimeField(default=datetime.utcnow)
     sequence = IntField(required=False)
+    # swaps minted by the same (multi message) secret transaction share it - src_tx_hash of the first swap of the batch
+    batch_id = StringField(required=False, default='')
+
+    @property
+    def batch_key(self) -> str:
+        return self.batch_id or str(self.pk)
+
+    @classmethod
+    def batches(cls, **query) -> List[List['Swap']]:
+        """
+        Swaps matching @query, grouped by the transaction minting them, in sequence order. The first swap of a batch is
+        its head - the one the signatures of the transaction are saved for
+        """
+        batches: Dict[str, List[Swap]] = {}
+        for swap in cls.objects(**query).order_by('sequence'):
+            batches.setdefault(swap.batch_key, []).append(swap)
+        for batch in batches.values():
+            batch.sort(key=lambda swap: swap.src_tx_hash != swap.batch_key)
+        return list(batches.values())
 
     @classmethod
     def pre_save(cls, _, document, **kwargs):  # pylint: disable=unused-argument
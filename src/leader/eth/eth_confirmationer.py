@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, List
 
 from web3.datastructures import AttributeDict
 
@@ -20,6 +20,10 @@ class EthConfirmer:
         self.token_map = token_map
         self.logger = logger
 
+    def prefetch(self, events: List[AttributeDict]):
+        """Reads the (executed) submissions of a backlog of events in bulk, so _handle finds them in the cache"""
+        self.multisig_contract.submissions_data({event.args.transactionId for event in events})
+
     def withdraw(self, event: AttributeDict):
         self._handle(event, True)
 
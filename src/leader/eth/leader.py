@@ -1,6 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import CalledProcessError
-from threading import Event, Thread
-from typing import List
+from threading import Event, Lock, Thread
+from typing import List, Optional
 
 from mongoengine.errors import NotUniqueError
 from pymongo.errors import DuplicateKeyError
@@ -15,6 +16,7 @@ from src.db.collections.eth_swap import Swap, Status
 from src.db.collections.swaptrackerobject import SwapTrackerObject
 from src.db.collections.token_map import TokenPairing
 from src.leader.eth.eth_confirmationer import EthConfirmer
+from src.leader.eth.swap_scanner import DEFAULT_QUERY_CONCURRENCY, DEFAULT_SCAN_WINDOW, TokenScanner
 from src.util.coins import Erc20Info, Coin
 from src.util.common import Token
 from src.util.config import Config
@@ -25,7 +27,11 @@ from src.util.secretcli import query_scrt_swap
 from src.util.web3 import erc20_contract, w3
 
 
-class EtherLeader(Thread):
+def leader_id(account):
+    return f'leader-{account}'
+
+
+class EtherLeader(Thread):  # pylint: disable=too-many-instance-attributes
     """
     secretETH --> Swap TX --> ETH
 
@@ -67,6 +73,13 @@ class EtherLeader(Thread):
         self.confirmer = EthConfirmer(self.multisig_wallet, confirmer_token_map, self.logger)
         self.event_listener = EthEventListener(self.multisig_wallet, config)
 
+        self.scan_window = config.swap_scan_window or DEFAULT_SCAN_WINDOW
+        # shared by the scanners of all the tokens - caps the number of secret network queries in flight
+        self.query_pool = ThreadPoolExecutor(max_workers=config.secret_query_concurrency or DEFAULT_QUERY_CONCURRENCY,
+                                             thread_name_prefix='SwapQuery')
+        # the scanners broadcast from the same account - one at a time, so they don't use the same nonce
+        self.broadcast_lock = Lock()
+
         self.stop_event = Event()
         super().__init__(group=None, name="EtherLeader", target=self.run, **kwargs)
 
@@ -78,37 +91,47 @@ class EtherLeader(Thread):
     def run(self):
         self.logger.info("Starting")
 
-        # todo: fix so tracker doesn't start from 0
-        self.event_listener.register(self.confirmer.withdraw, ['Withdraw'], from_block=0)
-        self.event_listener.register(self.confirmer.failed_withdraw, ['WithdrawFailure'], from_block=0)
+        cursor = leader_id(self.signer.address)
+        self.event_listener.register_prefetch(self.confirmer.prefetch)
+        self.event_listener.register(self.confirmer.withdraw, ['Withdraw'], from_block=0, cursor=cursor)
+        self.event_listener.register(self.confirmer.failed_withdraw, ['WithdrawFailure'], from_block=0, cursor=cursor)
         self.event_listener.start()
 
         self._scan_swap()
 
     def _scan_swap(self):
-        """ Scans secret network contract for swap events """
+        """ Scans secret network contract for swap events, with a scanner per token """
         self.logger.info(f'Starting for account {self.signer.address} with tokens: {self.token_map=}')
-        while not self.stop_event.is_set():
-            for token in self.token_map:
-                try:
-                    swap_tracker = SwapTrackerObject.get_or_create(src=token)
-                    next_nonce = swap_tracker.nonce + 1
+        scanners = [self._token_scanner(token) for token in self.token_map]
+        for scanner in scanners:
+            scanner.start()
 
-                    self.logger.debug(f'Scanning token {token} for query #{next_nonce}')
+        self.stop_event.wait()
+        for scanner in scanners:
+            scanner.join()
+        self.query_pool.shutdown(wait=False)
 
-                    swap_data = query_scrt_swap(next_nonce, self.config.scrt_swap_address, token)
+    def _token_scanner(self, token: str) -> TokenScanner:
+        swap_tracker = SwapTrackerObject.get_or_create(src=token)
 
-                    self._handle_swap(swap_data, token, self.token_map[token].address)
-                    swap_tracker.nonce = next_nonce
-                    swap_tracker.save()
-                    next_nonce += 1
+        def handle(nonce: int, swap_data: str):
+            self._handle_swap(swap_data, token, self.token_map[token].address)
+            swap_tracker.nonce = nonce
+            swap_tracker.save()
 
-                except CalledProcessError as e:
-                    if b'ERROR: query result: encrypted: Failed to get swap for token' not in e.stderr:
-                        self.logger.error(f"Failed to query swap: stdout: {e.stdout} stderr: {e.stderr}")
-                        # if b'ERROR: query result: encrypted: Failed to get swap for key' not in e.stderr:
+        return TokenScanner(token, lambda: swap_tracker.nonce + 1, lambda nonce: self._query_swap(nonce, token),
+                            handle, self.query_pool, self.scan_window, self.config.sleep_interval, self.stop_event,
+                            self.logger)
 
-            self.stop_event.wait(self.config.sleep_interval)
+    def _query_swap(self, nonce: int, token: str) -> Optional[str]:
+        """ Returns None if there's no swap with this nonce (yet) """
+        try:
+            return query_scrt_swap(nonce, self.config.scrt_swap_address, token)
+        except CalledProcessError as e:
+            if b'ERROR: query result: encrypted: Failed to get swap for token' in e.stderr:
+                return None
+            self.logger.error(f"Failed to query swap: stdout: {e.stdout} stderr: {e.stderr}")
+            raise
 
     @staticmethod
     def _validate_fee(amount: int, fee: int):
@@ -163,7 +186,6 @@ class EtherLeader(Thread):
         if dst_token == 'native':
             data, tx_dest, tx_amount, tx_token, fee = self._tx_native_params(amount, dest_address)
         else:
-            self.erc20.address = dst_token
             data, tx_dest, tx_amount, tx_token, fee = self._tx_erc20_params(amount, dest_address, dst_token)
 
         if not self._validate_fee(amount, fee):
@@ -217,13 +239,14 @@ class EtherLeader(Thread):
         self._check_remaining_funds()
 
         data = self.multisig_wallet.encode_data('submitTransaction', *msg.args())
-        tx = self.multisig_wallet.raw_transaction(
-            self.signer.address, 0, data, gas_price,
-            gas_limit=self.multisig_wallet.SUBMIT_GAS
-        )
-        tx = self.multisig_wallet.sign_transaction(tx, self.signer)
-
-        tx_hash = broadcast_transaction(tx)
+        with self.broadcast_lock:
+            tx = self.multisig_wallet.raw_transaction(
+                self.signer.address, 0, data, gas_price,
+                gas_limit=self.multisig_wallet.SUBMIT_GAS
+            )
+            tx = self.multisig_wallet.sign_transaction(tx, self.signer)
+
+            tx_hash = broadcast_transaction(tx)
 
         self.logger.info(msg=f"Submitted tx: hash: {tx_hash.hex()}, msg: {msg}")
         return tx_hash.hex()
@@ -0,0 +1,101 @@
+from concurrent.futures import Executor
+from logging import Logger
+from threading import Event, Thread
+from typing import Callable, List, Optional
+
+DEFAULT_SCAN_WINDOW = 10
+# max number of secret network queries in flight, for all the tokens together
+DEFAULT_QUERY_CONCURRENCY = 16
+MAX_BACKOFF = 300
+
+
+def scan_ahead(query: Callable[[int], Optional[str]], first_nonce: int, window: int, pool: Executor) -> List[str]:
+    """
+    Queries nonces first_nonce .. first_nonce + window - 1 concurrently, and returns the answers of the contiguous run
+    of existing swaps starting at first_nonce (in order). Swaps after a missing nonce are picked up by a later scan
+
+    A failed query ends the run as well. Its error is raised only if no swap was found before it
+
+    :param query: returns the swap with the given nonce, or None if there's no such swap (yet)
+    """
+    futures = [pool.submit(query, nonce) for nonce in range(first_nonce, first_nonce + window)]
+    swaps = []
+    try:
+        for future in futures:
+            try:
+                swap = future.result()
+            except Exception:  # pylint: disable=broad-except
+                if not swaps:
+                    raise
+                break
+            if swap is None:
+                break
+            swaps.append(swap)
+    finally:
+        for future in futures:
+            future.cancel()
+    return swaps
+
+
+class TokenScanner(Thread):  # pylint: disable=too-many-instance-attributes
+    """
+    Scans the swaps of a single token, so a slow or failing token doesn't hold back the others. Errors are retried
+    with an exponential backoff (up to MAX_BACKOFF seconds)
+
+    While idle only the next nonce is queried. The scan window doubles (up to @window) with every scan that comes
+    back full, so a backlog is cleared quickly, and drops back to a single nonce once it's cleared
+
+    :param next_nonce: returns the first nonce which wasn't handled yet (the token's cursor)
+    :param query: see scan_ahead
+    :param handle: handles a swap (nonce, swap) and moves the cursor past it
+    :param window: max number of nonces queried at once
+    """
+
+    def __init__(self, token: str, next_nonce: Callable[[], int],  # pylint: disable=too-many-arguments
+                 query: Callable[[int], Optional[str]], handle: Callable[[int, str], None], pool: Executor,
+                 window: int, interval: float, stop_event: Event, logger: Logger):
+        self.token = token
+        self.next_nonce = next_nonce
+        self.query = query
+        self.handle = handle
+        self.pool = pool
+        self.max_window = window
+        self.window = 1
+        self.interval = interval
+        self.stop_event = stop_event
+        self.logger = logger
+        self.failures = 0
+        super().__init__(group=None, name=f"TokenScanner-{token}", target=self.run)
+        self.setDaemon(True)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                found = self.scan()
+                self.failures = 0
+            except Exception as e:  # pylint: disable=broad-except
+                self.failures += 1
+                self.window = 1
+                self.logger.error(f'Failed to scan token {self.token} ({self.failures} failures in a row): {e}')
+                self.stop_event.wait(self.backoff())
+                continue
+
+            # keep going while swaps keep coming - a backlog is cleared a window at a time instead of one per interval
+            if not found:
+                self.stop_event.wait(self.interval)
+
+    def scan(self) -> int:
+        """ Handles the new swaps of the token, in order. Returns the number of swaps handled """
+        nonce = self.next_nonce()
+        self.logger.debug(f'Scanning token {self.token} for queries #{nonce}-#{nonce + self.window - 1}')
+
+        swaps = scan_ahead(self.query, nonce, self.window, self.pool)
+        for swap in swaps:
+            self.handle(nonce, swap)
+            nonce += 1
+
+        self.window = min(self.window * 2, self.max_window) if len(swaps) == self.window else 1
+        return len(swaps)
+
+    def backoff(self) -> float:
+        return min(self.interval * 2 ** self.failures, MAX_BACKOFF)
@@ -14,15 +14,20 @@ from src.signer.secret20.signer import SecretAccount
 from src.util.common import temp_file, temp_files, Token
 from src.util.config import Config
 from src.util.logger import get_logger
-from src.util.secretcli import broadcast, multisig_tx, query_data_success, get_uscrt_balance
+from src.util.secretcli import broadcast, multisig_tx, query_data_success, query_tx_success, get_uscrt_balance
 
 BROADCAST_VALIDATION_COOLDOWN = 60
 SCRT_BLOCK_TIME = 7
 
 
-def _set_retry(tx: Swap):
-    tx.status = Status.SWAP_RETRY
-    tx.save()
+def _set_status(batch: List[Swap], status: Status):
+    for tx in batch:
+        tx.status = status
+        tx.save()
+
+
+def _set_retry(batch: List[Swap]):
+    _set_status(batch, Status.SWAP_RETRY)
 
 
 class Secret20Leader(Thread):
@@ -59,8 +64,8 @@ class Secret20Leader(Thread):
     def _catch_up(self):
         """ Scans the DB for signed swap tx at startup """
         # Note: As Collection.objects() call is cached, there shouldn't be collisions with DB signals
-        for tx in Swap.objects(status=Status.SWAP_SIGNED).order_by('sequence'):
-            self._create_and_broadcast(tx)
+        for batch in Swap.batches(status=Status.SWAP_SIGNED):
+            self._create_and_broadcast(batch)
 
     def stop(self):
         self.logger.info("Stopping")
@@ -75,29 +80,30 @@ class Secret20Leader(Thread):
     def _scan_swap(self):
         while not self.stop_event.is_set():
             failed_prev = False
-            for tx in Swap.objects(status=Status.SWAP_SIGNED, src_network="Ethereum"):
+            for batch in Swap.batches(status=Status.SWAP_SIGNED, src_network="Ethereum"):
                 # if there are 2 transactions that depend on each other (sequence number), and the first fails we mark
                 # the next as "retry"
                 if failed_prev:
-                    self.logger.info(f"Previous TX failed, retrying {tx.id}")
-                    _set_retry(tx)
+                    self.logger.info(f"Previous TX failed, retrying {batch[0].id}")
+                    _set_retry(batch)
                     continue
 
-                self.logger.info(f"Found tx ready for broadcasting {tx.id}")
-                failed_prev = not self._create_and_broadcast(tx)
+                self.logger.info(f"Found tx ready for broadcasting {batch[0].id} ({len(batch)} swaps)")
+                failed_prev = not self._create_and_broadcast(batch)
             failed_prev = False
-            for tx in Swap.objects(status=Status.SWAP_SUBMITTED, src_network="Ethereum"):
+            for batch in Swap.batches(status=Status.SWAP_SUBMITTED, src_network="Ethereum"):
                 if failed_prev:
-                    self.logger.info(f"Previous TX failed, retrying {tx.id}")
-                    _set_retry(tx)
+                    self.logger.info(f"Previous TX failed, retrying {batch[0].id}")
+                    _set_retry(batch)
                     continue
-                failed_prev = not self._broadcast_validation(tx)
+                failed_prev = not self._broadcast_validation(batch)
 
             self.logger.debug('done scanning for swaps. sleeping..')
             self.stop_event.wait(self.config.sleep_interval)
 
-    def _create_and_broadcast(self, tx: Swap) -> bool:
-        # reacts to signed tx in the DB that are ready to be sent to secret20
+    def _create_and_broadcast(self, batch: List[Swap]) -> bool:
+        # reacts to signed tx in the DB that are ready to be sent to secret20. The signatures are saved for the head
+        tx = batch[0]
         signatures = [signature.signed_tx for signature in Signatures.objects(tx_id=tx.id)]
         if len(signatures) < self.config.signatures_threshold:  # sanity check
             self.logger.error(msg=f"Tried to sign tx {tx.id}, without enough signatures"
@@ -108,15 +114,15 @@ class Secret20Leader(Thread):
             signed_tx = self._create_multisig(tx.unsigned_tx, tx.sequence, signatures)
             scrt_tx_hash = self._broadcast(signed_tx)
             self.logger.info(f"Broadcasted {tx.id} successfully - {scrt_tx_hash}")
-            tx.status = Status.SWAP_SUBMITTED
-            tx.dst_tx_hash = scrt_tx_hash
-            tx.save()
-            self.logger.info(f"Changed status of tx {tx.id} to submitted")
+            for swap in batch:
+                swap.status = Status.SWAP_SUBMITTED
+                swap.dst_tx_hash = scrt_tx_hash
+                swap.save()
+            self.logger.info(f"Changed status of tx {tx.id} ({len(batch)} swaps) to submitted")
             return True
         except (RuntimeError, OperationError) as e:
             self.logger.error(msg=f"Failed to create multisig and broadcast, error: {e}")
-            tx.status = Status.SWAP_FAILED
-            tx.save()
+            _set_status(batch, Status.SWAP_FAILED)
             return False
 
     def _create_multisig(self, unsigned_tx: str, sequence: int, signatures: List[str]) -> str:
@@ -142,21 +148,31 @@ class Secret20Leader(Thread):
         with temp_file(signed_tx) as signed_tx_path:
             return json.loads(broadcast(signed_tx_path))['txhash']
 
-    def _broadcast_validation(self, document: Swap) -> bool:  # pylint: disable=unused-argument
-        """validation of submitted broadcast signed tx
+    @staticmethod
+    def _is_confirmed(tx_hash: str, batch: List[Swap]) -> bool:
+        """
+        :raises ValueError: if the transaction failed
+        """
+        if len(batch) > 1:
+            # the outputs of the messages can't be told apart - but the tx is atomic, so all of them succeeded
+            return bool(query_tx_success(tx_hash))
+        res = query_data_success(tx_hash)
+        return bool(res) and res["mint_from_ext_chain"]["status"] == "success"
+
+    def _broadcast_validation(self, batch: List[Swap]) -> bool:  # pylint: disable=unused-argument
+        """validation of submitted broadcast signed tx (minting the swaps of @batch)
 
         **kwargs needs to be here even if unused, because this function gets passed arguments from mongo internals
         """
+        document = batch[0]
         if not document.status == Status.SWAP_SUBMITTED or not document.src_network == "Ethereum":
             return False
 
         tx_hash = document.dst_tx_hash
         try:
-            res = query_data_success(tx_hash)
-
-            if res and res["mint_from_ext_chain"]["status"] == "success":
+            if self._is_confirmed(tx_hash, batch):
                 self.logger.info("Updated status to confirmed")
-                document.update(status=Status.SWAP_CONFIRMED)
+                _set_status(batch, Status.SWAP_CONFIRMED)
                 return True
 
             # maybe the block took a long time - we wait 60 seconds before we mark it as failed
@@ -165,11 +181,11 @@ class Secret20Leader(Thread):
                 return True
 
             # TX isn't on-chain. We can retry it
-            document.update(status=Status.SWAP_RETRY)
+            _set_retry(batch)
 
             # update sequence number - just in case we failed because we are out of sync
             self.manager.update_sequence()
-            self.logger.critical(f"Failed confirming broadcast for tx: {repr(document)}, Hash: {tx_hash}, res: {res}")
+            self.logger.critical(f"Failed confirming broadcast for tx: {repr(document)}, Hash: {tx_hash}, not on-chain")
             return False
         except (ValueError, KeyError) as e:
             # TX failed for whatever reason. Might be a duplicate, out of gas, or any other reason
@@ -177,6 +193,6 @@ class Secret20Leader(Thread):
             # The DB update can fail, but if it does we want to crash - this can lead to
             # duplicate amounts and confusion. Better to just stop and make sure
             # everything is kosher before continuing
-            document.update(status=Status.SWAP_FAILED)
+            _set_status(batch, Status.SWAP_FAILED)
             self.manager.update_sequence()
             return False
@@ -1,5 +1,7 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from threading import Thread, Event, Lock
-from typing import Dict
+from typing import Dict, List, NamedTuple, Tuple
 
 from web3.datastructures import AttributeDict
 from mongoengine.errors import NotUniqueError
@@ -13,12 +15,28 @@ from src.db.collections.swaptrackerobject import SwapTrackerObject
 from src.signer.secret20.signer import SecretAccount
 from src.util.common import Token
 from src.util.config import Config
+from src.util.eth.log_scanner import LogScanner
 from src.util.logger import get_logger
-from src.util.secretcli import create_unsigned_tx, account_info
+from src.util.secretcli import create_unsigned_mint_tx, account_info
 from src.util.web3 import w3
 
+# number of blocks fetched by each catch up task, and how many tasks run concurrently
+CATCH_UP_SEGMENT = 10000
+CATCH_UP_WORKERS = 4
 
-class SecretManager(Thread):
+# gas of a single mint message, and max gas of a (multi message) mint transaction
+MINT_GAS = 200000
+MAX_BATCH_GAS = 3000000
+DEFAULT_MINT_BATCH_SIZE = 10
+
+
+class _Mint(NamedTuple):
+    swap: Swap
+    mint: Dict
+    block_number: int
+
+
+class SecretManager(Thread):  # pylint: disable=too-many-instance-attributes
     """Registers to contract event and manages tx state in DB"""
 
     def __init__(
@@ -45,6 +63,11 @@ class SecretManager(Thread):
         self.sequence_lock = Lock()
         self.sequence = 0
         self.update_sequence()
+
+        # confirmed swaps waiting to be minted, in a single transaction with a message per swap
+        self.batch_size = min(config.secret_mint_batch_size or DEFAULT_MINT_BATCH_SIZE, MAX_BATCH_GAS // MINT_GAS)
+        self.pending_mints: List[_Mint] = []
+        self.mint_lock = Lock()
         self.event_listener.register(self._handle, contract.tracked_event(),)
         super().__init__(group=None, name="SecretManager", target=self.run, **kwargs)
 
@@ -66,6 +89,11 @@ class SecretManager(Thread):
         """Scans for signed transactions and updates status if multisig threshold achieved"""
         self.logger.info("Starting..")
 
+        # batches we didn't finish saving - their swaps are handled again when catching up
+        staged = Swap.objects(status=Status.SWAP_STAGED).delete()
+        if staged:
+            self.logger.warning(f"Dropped {staged} swaps of partially saved batches")
+
         to_block = w3.eth.blockNumber - self.config.eth_confirmations
 
         self.catch_up(to_block)
@@ -74,16 +102,18 @@ class SecretManager(Thread):
         self.logger.info("Done catching up")
 
         while not self.stop_signal.is_set():
-            for transaction in Swap.objects(status=Status.SWAP_RETRY):
-                self._retry(transaction)
+            self._flush_mints()
 
-            for transaction in Swap.objects(status=Status.SWAP_UNSIGNED):
+            for batch in Swap.batches(status=Status.SWAP_RETRY):
+                self._retry(batch)
+
+            for batch in Swap.batches(status=Status.SWAP_UNSIGNED):
+                transaction = batch[0]
                 self.logger.debug(f"Checking unsigned tx {transaction.id}")
                 if Signatures.objects(tx_id=transaction.id).count() >= self.config.signatures_threshold:
                     self.logger.info(f"Found tx {transaction.id} with enough signatures to broadcast")
-                    transaction.status = Status.SWAP_SIGNED
-                    transaction.save()
-                    self.logger.info(f"Set status of tx {transaction.id} to signed")
+                    Swap.objects(id__in=[swap.id for swap in batch]).update(status=Status.SWAP_SIGNED)
+                    self.logger.info(f"Set status of tx {transaction.id} ({len(batch)} swaps) to signed")
                 else:
                     self.logger.debug(f"Tx {transaction.id} does not have enough signatures")
             self.stop_signal.wait(self.config.sleep_interval)
@@ -101,33 +131,45 @@ class SecretManager(Thread):
 
         self.logger.debug(f'Catching up to current block: {to_block}')
 
-        evt_filter = self.contract.contract.events.Swap.createFilter(fromBlock=from_block, toBlock=to_block)
-        for event in evt_filter.get_all_entries():
-            self._handle(event)
+        segments = [(start, min(start + CATCH_UP_SEGMENT - 1, to_block))
+                    for start in range(from_block, to_block + 1, CATCH_UP_SEGMENT)]
 
-        evt_filter = self.contract.contract.events.SwapToken.createFilter(fromBlock=from_block, toBlock=to_block)
-        for event in evt_filter.get_all_entries():
-            self._handle(event)
+        # segments are fetched concurrently (at most CATCH_UP_WORKERS ahead of the one being handled), but handled
+        # one by one in block order, saving progress after each segment so an interrupted catch up resumes from there
+        with ThreadPoolExecutor(max_workers=CATCH_UP_WORKERS) as executor:
+            pending = deque()
+            for segment in segments:
+                pending.append((segment, executor.submit(self._segment_events, *segment)))
+                if len(pending) >= CATCH_UP_WORKERS:
+                    self._handle_segment(*pending.popleft())
+            while pending:
+                self._handle_segment(*pending.popleft())
 
-        # for event_name in self.contract.tracked_event():
-        #     for event in self.event_listener.events_in_range(event_name, from_block, to_block):
-        #         self.logger.info(f'Found new event at block: {event["blockNumber"]}')
+    def _segment_events(self, from_block: int, to_block: int) -> List[AttributeDict]:
+        scanner = LogScanner(w3, self.contract.contract, self.contract.tracked_event(), self.logger,
+                             decoder=self.contract.decoder)
+        return list(scanner.scan(from_block, to_block))
 
-        SwapTrackerObject.update_last_processed('Ethereum', to_block)
+    def _handle_segment(self, segment: Tuple[int, int], events: Future):
+        for event in events.result():
+            self._handle(event)
+        self._flush_mints()
+        SwapTrackerObject.update_last_processed('Ethereum', segment[1])
 
     def _get_s20(self, foreign_token_addr: str) -> Token:
         return self.s20_map[foreign_token_addr]
 
-    def _retry(self, tx: Swap):
-        for signature in Signatures.objects(tx_id=tx.id):
+    def _retry(self, batch: List[Swap]):
+        for signature in Signatures.objects(tx_id=batch[0].id):
             signature.delete()
-        tx.status = Status.SWAP_UNSIGNED
-        tx.sequence = self.sequence
-        tx.save()
+        for tx in batch:
+            tx.status = Status.SWAP_UNSIGNED
+            tx.sequence = self.sequence
+            tx.save()
         self.sequence = self.sequence + 1
 
     def _handle(self, event: AttributeDict):
-        """Extracts tx data from @event and add unsigned_tx to db"""
+        """Extracts tx data from @event and adds it to the next mint transaction"""
         if not self.contract.verify_destination(event):
             return
 
@@ -143,31 +185,94 @@ class SecretManager(Thread):
         try:
             s20 = self._get_s20(token)
             mint = mint_json(amount, tx_hash, recipient, s20.address)
-            unsigned_tx = create_unsigned_tx(
-                self.config.scrt_swap_address,
-                mint,
-                self.config.chain_id,
-                self.config.enclave_key,
-                self.config.swap_code_hash,
-                self.multisig.address
-            )
-
-            tx = Swap(src_tx_hash=tx_hash, status=Status.SWAP_UNSIGNED, unsigned_tx=unsigned_tx, src_coin=token,
-                      dst_coin=s20.name, dst_address=s20.address, src_network="Ethereum", sequence=self.sequence,
-                      amount=amount)
-            tx.save(force_insert=True)
-            self.sequence = self.sequence + 1
-            self.logger.info(f"saved new Ethereum -> Secret transaction {tx_hash}, for {amount} {s20.name}")
-            # SwapTrackerObject.update_last_processed(src=Source.ETH.value, update_val=block_number)
         except (IndexError, AttributeError) as e:
             self.logger.error(f"Failed on tx {tx_hash}, block {block_number}, "
                               f"due to missing config: {e}")
-        except RuntimeError as e:
-            self.logger.error(f"Failed to create swap tx for eth hash {tx_hash}, block {block_number}. Error: {e}")
-        except NotUniqueError as e:
-            self.logger.error(f"Tried to save duplicate TX, might be a catch up issue - {e}")
-        # return block_number, tx_hash, recipient, s20
-        SwapTrackerObject.update_last_processed('Ethereum', block_number)
+            return
+
+        tx = Swap(src_tx_hash=tx_hash, status=Status.SWAP_STAGED, src_coin=token, dst_coin=s20.name,
+                  dst_address=s20.address, src_network="Ethereum", amount=amount)
+        with self.mint_lock:
+            if Swap.objects(src_tx_hash=tx_hash).count() or \
+                    any(pending.swap.src_tx_hash == tx_hash for pending in self.pending_mints):
+                self.logger.error(f"Tried to save duplicate TX, might be a catch up issue - {tx_hash}")
+                return
+            self.pending_mints.append(_Mint(tx, mint, block_number))
+            if len(self.pending_mints) >= self.batch_size:
+                self._mint_pending()
+
+    def _flush_mints(self):
+        with self.mint_lock:
+            self._mint_pending()
+
+    def _mint_pending(self):
+        """ Creates the mint transactions of the pending swaps, batch_size swaps per transaction. Called with the lock """
+        while self.pending_mints:
+            batch, self.pending_mints = self.pending_mints[:self.batch_size], self.pending_mints[self.batch_size:]
+            self._save_batch(batch)
+
+    def _save_batch(self, batch: List[_Mint]):
+        # swaps that were saved already (e.g. seen again when catching up) are left out of the tx, so it doesn't mint
+        # them again
+        saved = set(Swap.objects(src_tx_hash__in=[pending.swap.src_tx_hash for pending in batch]).distinct('src_tx_hash'))
+        for tx_hash in saved:
+            self.logger.error(f"Tried to save duplicate TX, might be a catch up issue - {tx_hash}")
+        new = [pending for pending in batch if pending.swap.src_tx_hash not in saved]
+
+        if new:
+            try:
+                unsigned_tx = create_unsigned_mint_tx(
+                    self.config.scrt_swap_address,
+                    [pending.mint for pending in new],
+                    self.config.chain_id,
+                    self.config.enclave_key,
+                    self.config.swap_code_hash,
+                    self.multisig.address
+                )
+            except RuntimeError as e:
+                self.logger.error(f"Failed to create swap tx for eth hashes {[p.swap.src_tx_hash for p in new]}, "
+                                  f"blocks {[p.block_number for p in new]}. Error: {e}")
+            else:
+                if not self._insert_batch(new, unsigned_tx):
+                    return
+
+        SwapTrackerObject.update_last_processed('Ethereum', max(pending.block_number for pending in batch))
+
+    def _insert_batch(self, batch: List[_Mint], unsigned_tx: str) -> bool:
+        """
+        Saves the swaps of @batch with their mint tx. If one of them turns out to be a duplicate, none is saved and the
+        others go back to the front of the pending mints, to be minted by a tx without it
+
+        The swaps are saved as staged, and become unsigned (and visible to the signers) together once all of them are
+        saved, so a signer never sees part of a batch
+
+        :return: True if the batch was saved
+        """
+        batch_id = batch[0].swap.src_tx_hash
+        inserted: List[Swap] = []
+        for pending in batch:
+            tx = pending.swap
+            tx.unsigned_tx = unsigned_tx
+            tx.sequence = self.sequence
+            tx.batch_id = batch_id
+            tx.status = Status.SWAP_STAGED
+            try:
+                tx.save(force_insert=True)
+            except NotUniqueError as e:
+                self.logger.error(f"Tried to save duplicate TX, might be a catch up issue - {e}. Rebuilding its batch")
+                for swap in inserted:
+                    swap.delete()
+                self.pending_mints[:0] = [other for other in batch if other is not pending]
+                return False
+            inserted.append(tx)
+
+        Swap.objects(batch_id=batch_id, status=Status.SWAP_STAGED).update(status=Status.SWAP_UNSIGNED)
+        for tx in inserted:
+            tx.status = Status.SWAP_UNSIGNED
+            self.logger.info(f"saved new Ethereum -> Secret transaction {tx.src_tx_hash}, for {tx.amount} "
+                             f"{tx.dst_coin} (batch of {len(batch)})")
+        self.sequence = self.sequence + 1
+        return True
 
     def _account_details(self):
         details = account_info(self.multisig.address)
@@ -1,6 +1,6 @@
 import subprocess
 from json import JSONDecodeError
-from typing import Dict
+from typing import Dict, List
 
 from web3.datastructures import AttributeDict
 
@@ -12,11 +12,11 @@ from src.db.collections.token_map import TokenPairing
 from src.util.common import Token
 from src.util.config import Config
 from src.util.crypto_store.crypto_manager import CryptoManagerBase
+from src.util.eth.rpc_batch import RpcBatch
 from src.util.logger import get_logger
 from src.util.oracle.oracle import BridgeOracle
 from src.util.secretcli import query_scrt_swap
 from src.util.web3 import erc20_contract, w3
-from src.db.collections.swaptrackerobject import SwapTrackerObject
 
 
 def signer_id(account):
@@ -67,23 +67,43 @@ class EthSignerImpl:  # pylint: disable=too-many-instance-attributes, too-many-a
 
         self.tracked_tokens = self.token_map.keys()
 
-    def _check_remaining_funds(self):
-        remaining_funds = w3.eth.getBalance(self.account)
+    def _check_remaining_funds(self, remaining_funds: int):
         self.logger.debug(f'ETH signer remaining funds: {w3.fromWei(remaining_funds, "ether")} ETH')
         fund_warning_threshold = self.config.eth_funds_warning_threshold
         if remaining_funds < w3.toWei(fund_warning_threshold, 'ether'):
             self.logger.warning(f'ETH signer {self.account} has less than {fund_warning_threshold} ETH left')
 
+    def prefetch(self, submission_events: List[AttributeDict]):
+        """
+        Reads the submissions of a backlog of events in bulk. Executed submissions are cached, so sign() skips them
+        without going to the node
+        """
+        self.multisig_contract.submissions_data({event.args.transactionId for event in submission_events})
+
     # noinspection PyUnresolvedReferences
     def sign(self, submission_event: AttributeDict):
         """Tries to validate the transaction corresponding to submission id on the smart contract,
         confirms and signs if valid"""
-        self._check_remaining_funds()
-
         transaction_id = submission_event.args.transactionId
         self.logger.info(f'Got submission event with transaction id: {transaction_id}, checking status')
 
-        data = self.multisig_contract.submission_data(transaction_id)
+        if self.multisig_contract.executed_submission(transaction_id) is not None:
+            self.logger.info(f'Transaction {transaction_id} was already executed')
+            return
+
+        # everything we need from the node, in a single round-trip
+        functions = self.multisig_contract.contract.functions
+        batch = RpcBatch(w3)
+        balance = batch.get_balance(self.account)
+        submission = batch.call(functions.transactions(transaction_id))
+        confirmed = batch.call(functions.confirmations(transaction_id, self.account))
+        nonce = batch.get_transaction_count(self.account)
+        gas_price = batch.gas_price()
+        batch.execute()
+
+        self._check_remaining_funds(balance.result)
+
+        data = self.multisig_contract.parse_submission(transaction_id, submission.result)
         # placeholder - check how this looks for ETH transactions
         # check if submitted tx is an ERC-20 transfer tx
         if data['amount'] == 0 and data['data']:
@@ -91,13 +111,13 @@ class EthSignerImpl:  # pylint: disable=too-many-instance-attributes, too-many-a
             data['amount'] = params['amount']
             data['dest'] = params['recipient']
 
-        if not self._is_confirmed(transaction_id, data):
+        if not self._is_confirmed(data, confirmed.result):
             self.logger.info(f'Transaction {transaction_id} is missing approvals. Checking validity..')
 
             try:
                 if self._is_valid(data):
                     self.logger.info(f'Transaction {transaction_id} is valid. Signing & approving..')
-                    self._approve_and_sign(transaction_id)
+                    self._approve_and_sign(transaction_id, nonce.result, gas_price.result)
 
                 else:
                     self.logger.error(f'Failed to validate transaction: {data}')
@@ -105,11 +125,6 @@ class EthSignerImpl:  # pylint: disable=too-many-instance-attributes, too-many-a
                 self.logger.error(f"Error parsing secret-20 swap event {data}. Error: {e}")
                 return
 
-            # either way we want to continue on
-            finally:
-                obj = SwapTrackerObject.objects().get(src=signer_id(self.account))
-                obj.update(nonce=submission_event["blockNumber"])
-
         self.logger.info(f'Swap from secret network to ethereum signed successfully: {data}')
 
     def _is_valid(self, submission_data: Dict[str, any]) -> bool:
@@ -161,24 +176,26 @@ class EthSignerImpl:  # pylint: disable=too-many-instance-attributes, too-many-a
 
         return True
 
-    def _is_confirmed(self, transaction_id: int, submission_data: Dict[str, any]) -> bool:
-        """Checks with the data on the contract if signer already added confirmation or if threshold already reached"""
+    @staticmethod
+    def _is_confirmed(submission_data: Dict[str, any], signed: bool) -> bool:
+        """
+        Checks with the data on the contract if signer already added confirmation or if threshold already reached
 
+        :param signed: confirmations(transaction_id, account) - whether this signer already signed the tx
+        """
         # check if already executed
         if submission_data['executed']:
             return True
 
-        # check if signer already signed the tx
-        res = self.multisig_contract.contract.functions.confirmations(transaction_id, self.account).call()
-        if res:
-            return True
+        return signed
 
-        return False
-
-    def _approve_and_sign(self, submission_id: int):
+    def _approve_and_sign(self, submission_id: int, nonce: int, network_gas_price: int):
         """
         Sign the transaction with the signer's private key and then broadcast
         Note: This operation costs gas
+
+        :param nonce: the account's pending transaction count
+        :param network_gas_price: the node's gas price (wei), used when the oracle isn't
         """
         if self.config.network == "mainnet":
             gas_prices = BridgeOracle.gas_price()
@@ -188,7 +205,8 @@ class EthSignerImpl:  # pylint: disable=too-many-instance-attributes, too-many-a
 
         data = self.multisig_contract.encode_data('confirmTransaction', *msg.args())
         tx = self.multisig_contract.raw_transaction(self.signer.address, 0, data, gas_prices,
-                                                    gas_limit=self.multisig_contract.CONFIRM_GAS)
+                                                    gas_limit=self.multisig_contract.CONFIRM_GAS, nonce=nonce,
+                                                    network_gas_price=network_gas_price)
         tx = self.multisig_contract.sign_transaction(tx, self.signer)
         tx_hash = broadcast_transaction(tx)
 
@@ -3,7 +3,6 @@ from time import sleep
 
 from src.contracts.ethereum.event_listener import EthEventListener
 from src.contracts.ethereum.multisig_wallet import MultisigWallet
-from src.db.collections.swaptrackerobject import SwapTrackerObject
 from src.signer.eth.impl import EthSignerImpl, signer_id
 from src.util.config import Config
 from src.util.crypto_store.crypto_manager import CryptoManagerBase
@@ -49,9 +48,9 @@ class EtherSigner(Thread):
     def run(self):
         self.logger.info("Starting..")
 
-        from_block = self.choose_starting_block()
-
-        self.event_listener.register(self.signer.sign, ['Submission'], from_block=from_block)
+        self.event_listener.register_prefetch(self.signer.prefetch)
+        self.event_listener.register(self.signer.sign, ['Submission'], from_block=self.config.eth_start_block,
+                                     cursor=signer_id(self.account))
         self.event_listener.start()
         while not self.stop_event.is_set():
             if not self.event_listener.is_alive():
@@ -63,11 +62,3 @@ class EtherSigner(Thread):
         self.logger.info("Stopping..")
         self.event_listener.stop()
         self.stop_event.set()
-
-    def choose_starting_block(self) -> int:
-        """Returns the block from which we start scanning Ethereum for new tx"""
-        obj = SwapTrackerObject.get_or_create(src=signer_id(self.account))
-        if obj.nonce == -1:
-            obj.update(nonce=self.config.eth_start_block)
-
-        return obj.nonce
@@ -1,17 +1,23 @@
+import base64
 import json
 from collections import namedtuple
 from threading import Thread, Event
-from typing import Dict
+from typing import Dict, List
 
 from mongoengine import OperationError
 
+from src.contracts.ethereum.event_listener import EthEventListener
+from src.contracts.ethereum.event_store import EventStore
 from src.contracts.ethereum.multisig_wallet import MultisigWallet
+from src.contracts.secret.secret_contract import mint_json
 from src.db.collections.eth_swap import Swap, Status
 from src.db.collections.signatures import Signatures
-from src.util.common import temp_file
+from src.db.collections.token_map import TokenPairing
+from src.util.common import Token, temp_file
 from src.util.config import Config
 from src.util.logger import get_logger
-from src.util.secretcli import sign_tx as secretcli_sign, decrypt, account_info
+from src.util.secret_encryption import CODE_HASH_SIZE, NONCE_SIZE, SecretEncryption
+from src.util.secretcli import sign_tx as secretcli_sign, decrypt, account_info, tx_encryption
 
 SecretAccount = namedtuple('SecretAccount', ['address', 'name'])
 
@@ -29,6 +35,12 @@ class Secret20Signer(Thread):
             loglevel=config.log_level,
             logger_name=config.logger_name or f"SecretSigner-{self.multisig.name}"
         )
+        # swap events confirmed by our own listener, so validation doesn't have to fetch receipts from the node
+        self.event_store = EventStore(self.multisig.name, contract, contract.tracked_event())
+        self.event_listener = EthEventListener(contract, config)
+        # our own view of the secret token of each ethereum token - never trust the token the leader saved in the db
+        self.token_map: Dict[str, Token] = {}
+        self._load_token_map()
         super().__init__(group=None, name=f"SecretSigner-{self.multisig.name}", target=self.run, **kwargs)
         self.setDaemon(True)  # so tests don't hang
         self.account_num, _ = self._account_details()
@@ -36,14 +48,19 @@ class Secret20Signer(Thread):
 
     def stop(self):
         self.logger.info("Stopping..")
+        self.event_listener.stop()
         self.stop_event.set()
 
     def run(self):
         """Scans the db for unsigned swap tx and signs them"""
         self.logger.info("Starting..")
+        self.event_listener.register(self.event_store.add, self.contract.tracked_event(),
+                                     from_block=self.config.eth_start_block, cursor=self._events_cursor())
+        self.event_listener.start()
         while not self.stop_event.is_set():
             failed = False
-            for tx in Swap.objects(status=Status.SWAP_UNSIGNED):
+            for batch in Swap.batches(status=Status.SWAP_UNSIGNED):
+                tx = batch[0]
 
                 # if there are 2 transactions that depend on each other (sequence number), and the first fails we mark
                 # the next as "retry"
@@ -51,9 +68,9 @@ class Secret20Signer(Thread):
                     tx.status = Status.SWAP_RETRY
                     continue
 
-                self.logger.info(f"Found new unsigned swap event {tx}")
+                self.logger.info(f"Found new unsigned swap event {tx} ({len(batch)} swaps)")
                 try:
-                    self._validate_and_sign(tx)
+                    self._validate_and_sign(batch)
                     self.logger.info(
                         f"Signed transaction successfully id:{tx.id}")
                 except ValueError as e:
@@ -61,27 +78,30 @@ class Secret20Signer(Thread):
                     failed = True
             self.stop_event.wait(self.config.sleep_interval)
 
-    def _validate_and_sign(self, tx: Swap):
+    def _validate_and_sign(self, batch: List[Swap]):
         """
-        Makes sure that the tx is valid and signs it
+        Makes sure that the tx minting the swaps of @batch is valid and signs it (the signature is saved for its head)
 
         :raises: ValueError
         """
+        tx = batch[0]
         if self._is_signed(tx):
             self.logger.debug(f"This signer already signed this transaction. Waiting for other signers... id:{tx.id}")
             return
 
-        if not self._is_valid(tx):
+        if not self._is_complete(batch):
+            self.logger.debug(f"Not all the swaps of tx {tx.id} are unsigned yet, waiting for the rest of them")
+            return
+
+        if not self._is_valid(batch):
             self.logger.error(f"Validation failed. Signer: {self.multisig.name}. Tx id:{tx.id}.")
-            tx.status = Status.SWAP_FAILED
-            tx.save()
+            self._set_failed(batch)
             raise ValueError
 
         try:
             signed_tx = self._sign_with_secret_cli(tx.unsigned_tx, tx.sequence)
         except RuntimeError as e:
-            tx.status = Status.SWAP_FAILED
-            tx.save()
+            self._set_failed(batch)
             raise ValueError from e
 
         try:
@@ -94,24 +114,57 @@ class Secret20Signer(Thread):
         """ Returns True if tx was already signed by us, else False """
         return Signatures.objects(tx_id=tx.id, signer=self.multisig.name).count() > 0
 
-    def _is_valid(self, tx: Swap) -> bool:
-        """Assert that the data in the unsigned_tx matches the tx on the chain"""
-        log = self.contract.get_events_by_tx(tx.src_tx_hash)
-        if not log:  # because for some reason event_log can return None???
-            return False
+    @staticmethod
+    def _set_failed(batch: List[Swap]):
+        for tx in batch:
+            tx.status = Status.SWAP_FAILED
+            tx.save()
 
+    @staticmethod
+    def _is_complete(batch: List[Swap]) -> bool:
+        """
+        Returns False while we see less swaps than the tx of @batch mints - the rest of them are still being saved (or
+        their status updated). A tx we can't read is left for _is_valid to fail
+        """
+        try:
+            return len(json.loads(batch[0].unsigned_tx)['value']['msg']) <= len(batch)
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return True
+
+    def _is_valid(self, batch: List[Swap]) -> bool:
+        """Assert that the unsigned_tx has exactly a message for each swap of @batch, each matching its tx on the chain"""
+        tx = batch[0]
         try:
-            unsigned_tx = json.loads(tx.unsigned_tx)
+            messages = json.loads(tx.unsigned_tx)['value']['msg']
+        except (json.JSONDecodeError, KeyError):
+            self.logger.error(f'Tried to load tx {tx.id} but got invalid json')
+            return False
+
+        if len(messages) != len(batch):
+            self.logger.error(f'Failed to validate tx {tx.id}: {len(messages)} messages for {len(batch)} swaps')
+            return False
+
+        swaps = {swap.src_tx_hash: swap for swap in batch}
+        for message in messages:
+            try:
+                decrypted_data = self._decrypt(message)
+                self.logger.debug(f'Decrypted unsigned tx successfully {decrypted_data}')
+            except ValueError:
+                self.logger.error(f'Tried to load tx {tx.id} but got data as invalid json, or failed to decrypt')
+                return False
+
+            # each swap is minted exactly once
+            swap = swaps.pop(decrypted_data.get('mint_from_ext_chain', {}).get('identifier'), None)
+            if swap is None or not self._is_valid_mint(swap, decrypted_data, message):
+                self.logger.error(f'Failed to validate tx {tx.id}: message {decrypted_data} does not match a swap')
+                return False
 
-            res = self._decrypt(unsigned_tx)
-            self.logger.debug(f'Decrypted unsigned tx successfully {res}')
-            json_start_index = res.find('{')
-            json_end_index = res.rfind('}') + 1
-            decrypted_data = json.loads(res[json_start_index:json_end_index])
+        return True
 
-        except json.JSONDecodeError:
-            self.logger.error(f'Tried to load tx with hash: {tx.src_tx_hash} {tx.id}'
-                              f'but got data as invalid json, or failed to decrypt')
+    def _is_valid_mint(self, tx: Swap, decrypted_data: Dict, message: Dict) -> bool:
+        """Assert that the data of a mint message matches the tx on the chain"""
+        log = self._swap_event(tx.src_tx_hash)
+        if not log:  # because for some reason event_log can return None???
             return False
 
         # extract address and value from unsigned transaction
@@ -144,8 +197,58 @@ class Secret20Signer(Thread):
                               f" addresses do not match")
             return False
 
+        if not self._is_expected_message(tx, log, decrypted_data, message):
+            self.logger.error(f"Failed to validate tx data: {tx}, message is not the mint we expect")
+            return False
+
         return True
 
+    def _is_expected_message(self, tx: Swap, log, decrypted_data: Dict, message: Dict) -> bool:
+        """
+        Rebuilds the mint message of @tx from the on-chain swap (minting the secret token that we map its token to),
+        and checks that it's the decrypted message. When we have the network's io key (REST server), also encrypts it
+        with the nonce of @message and checks that the result is @message, byte for byte
+        """
+        try:
+            _, _, _, token = self.contract.parse_swap_event(log)
+            s20 = self._get_s20(token or 'native')
+        except (ValueError, KeyError) as e:
+            self.logger.error(f"Failed to validate tx data: {tx}, no secret token for the swapped token: {e}")
+            return False
+
+        expected = mint_json(str(self.contract.extract_amount(log)), tx.src_tx_hash, self.contract.extract_addr(log),
+                             s20.address)
+        if decrypted_data != expected:
+            return False
+
+        encryption = tx_encryption()
+        if encryption is None:
+            return True
+
+        encrypted = base64.b64decode(message['value']['msg'])
+        return encryption.encrypt(self.config.swap_code_hash, json.dumps(expected), encrypted[:NONCE_SIZE]) == encrypted
+
+    def _get_s20(self, foreign_token_addr: str) -> Token:
+        """:raises KeyError: if @foreign_token_addr isn't paired with a secret token, even after reloading the pairs"""
+        if foreign_token_addr not in self.token_map:
+            self._load_token_map()
+        return self.token_map[foreign_token_addr]
+
+    def _load_token_map(self):
+        for pair in TokenPairing.objects(dst_network="Secret", src_network="Ethereum"):
+            self.token_map[pair.src_address] = Token(pair.dst_address, pair.dst_coin)
+
+    def _swap_event(self, tx_hash: str):
+        """Returns the swap event of @tx_hash from our event store, and only goes to the node if it's not there yet"""
+        log = self.event_store.get(tx_hash)
+        if log is None:
+            self.logger.debug(f'Swap event of {tx_hash} not in the event store yet, fetching receipt')
+            log = self.contract.get_events_by_tx(tx_hash)
+        return log
+
+    def _events_cursor(self) -> str:
+        return f'events-{self.multisig.name}'
+
     def _sign_with_secret_cli(self, unsigned_tx: str, sequence: int) -> str:
         with temp_file(unsigned_tx) as unsigned_tx_path:
             res = secretcli_sign(unsigned_tx_path, self.multisig.address, self.multisig.name,
@@ -154,9 +257,20 @@ class Secret20Signer(Thread):
         return res
 
     @staticmethod
-    def _decrypt(unsigned_tx: Dict):
-        msg = unsigned_tx['value']['msg'][0]['value']['msg']
-        return decrypt(msg)
+    def _decrypt(message: Dict) -> Dict:
+        """
+        Decrypts a mint message - in-process, with our transaction key, unless there's no REST server to get the
+        network's io key from
+
+        :raises ValueError: if the message can't be decrypted, or isn't valid json
+        """
+        encryption = tx_encryption()
+        if encryption is None:
+            res = decrypt(message['value']['msg'])
+            return json.loads(res[res.find('{'):res.rfind('}') + 1])
+
+        nonce, _, ciphertext = SecretEncryption.split(base64.b64decode(message['value']['msg']))
+        return json.loads(encryption.decrypt(ciphertext, nonce).decode()[CODE_HASH_SIZE:])
 
     def _account_details(self):
         details = account_info(self.multisig.address)
@@ -1,37 +1,48 @@
-import sys
+import atexit
+import os
 from collections import namedtuple
-from contextlib import contextmanager
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass
-from os import remove
+from functools import lru_cache
 from pathlib import Path
-from tempfile import NamedTemporaryFile
+from shutil import rmtree
+from tempfile import NamedTemporaryFile, gettempdir, mkdtemp
 from typing import List, Generator
 
 import src
 
+# RAM backed, so the transactions we hand to secretcli never hit the disk
+SHM_DIR = '/dev/shm'
 
-@contextmanager
-def temp_file(data: str):
-    f = NamedTemporaryFile(mode="w+", delete=False)
-    f.write(data)
-    f.close()
-    yield f.name
-    remove(f.name)
 
+@lru_cache(maxsize=1)
+def scratch_dir() -> str:
+    """ Per-process directory for the files we pass to secretcli, in memory when possible. Removed on exit """
+    base = SHM_DIR if os.access(SHM_DIR, os.W_OK) else gettempdir()
+    path = mkdtemp(prefix='bridge-', dir=base)
+    atexit.register(rmtree, path, ignore_errors=True)
+    return path
 
-# todo: I don't think this actually works
-@contextmanager
-def temp_files(data: List[str], logger) -> Generator:
-    temp = []
-    for d in data:
-        temp.append(temp_file(d))
 
-    yield list(manager.__enter__() for manager in temp)
-    for manager in temp:
+@contextmanager
+def temp_file(data: str, logger=None):
+    with NamedTemporaryFile(mode="w", dir=scratch_dir(), delete=False) as f:
+        f.write(data)
+    try:
+        yield f.name
+    finally:
         try:
-            manager.__exit__(*sys.exc_info())
+            os.remove(f.name)
         except OSError as e:
-            logger.debug(msg=e)
+            if logger:
+                logger.debug(msg=e)
+
+
+@contextmanager
+def temp_files(data: List[str], logger) -> Generator:
+    """ Files are removed even if creating one of them (or the body of the with) fails """
+    with ExitStack() as stack:
+        yield [stack.enter_context(temp_file(d, logger)) for d in data]
 
 
 # noinspection PyTypeChecker
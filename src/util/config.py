@@ -50,6 +50,9 @@ class Config(Model):
     network: fields.Str()
     eth_start_block: fields.Int(normalizers=[int])
     eth_confirmations: fields.Int(normalizers=[int])
+    eth_callback_workers: fields.Optional(fields.Int(normalizers=[int]))
+    eth_callback_queue_size: fields.Optional(fields.Int(normalizers=[int]))
+    multicall_address: fields.Optional(fields.Str)
 
     # eth account stuff
     eth_address: fields.Optional(fields.Str)
@@ -65,9 +68,15 @@ class Config(Model):
     # secret network stuff
     secretcli_home: fields.Str()
     secret_node: fields.Str()
+    secret_rest_api: fields.Optional(fields.Str)
+    secretcli_processes: fields.Optional(fields.Int(normalizers=[int]))
+    secretcli_timeout: fields.Optional(fields.Int(normalizers=[int]))
+    secret_mint_batch_size: fields.Optional(fields.Int(normalizers=[int]))
     enclave_key: fields.Str()
     chain_id: fields.Str()
     scrt_swap_address: fields.Str()
+    swap_scan_window: fields.Optional(fields.Int(normalizers=[int]))
+    secret_query_concurrency: fields.Optional(fields.Int(normalizers=[int]))
     swap_code_hash: fields.Str()
 
     # scrt account stuff
@@ -0,0 +1,112 @@
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from eth_abi.decoding import ContextFramesBytesIO, TupleDecoder
+from eth_abi.grammar import parse as parse_abi_type
+from eth_abi.registry import registry as abi_registry
+from eth_utils import encode_hex, event_abi_to_log_topic, to_checksum_address
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+
+def log_topic(log) -> str:
+    """Returns the topic0 (hex) of a raw log"""
+    return encode_hex(log['topics'][0])
+
+
+def _normalizer(abi_type: str) -> Optional[Callable]:
+    # same as web3 - addresses are returned in checksum format
+    if abi_type == 'address':
+        return to_checksum_address
+    return None
+
+
+class _EventType(NamedTuple):
+    name: str
+    # (name, decoder, normalizer) of each indexed argument, in topic order. Dynamic types are hashed into the topic,
+    # so they have no decoder and are returned as the raw topic
+    indexed: List
+    # names of the non indexed arguments, their tuple decoder, and normalizers
+    data_names: List[str]
+    data_decoder: TupleDecoder
+    data_normalizers: List[Optional[Callable]]
+    # names of all the arguments, in the ABI order (web3 returns args in this order)
+    arg_names: List[str]
+
+
+class EventDecoder:
+    """
+    Decodes the logs of a contract with decoders built once from the ABI, keyed by topic0
+
+    Compared to web3's processReceipt (which rebuilds the event and tries to decode every log with every event it's
+    asked for), each log is looked up by its topic and decoded exactly once
+    """
+
+    def __init__(self, abi: List[Dict]):
+        self.events: Dict[str, _EventType] = {}
+        self.topics_by_name: Dict[str, str] = {}
+        for item in abi:
+            if item.get('type') != 'event' or item.get('anonymous'):
+                continue
+            topic = encode_hex(event_abi_to_log_topic(item))
+            self.events[topic] = self._event_type(item)
+            self.topics_by_name[item['name']] = topic
+
+    @staticmethod
+    def _event_type(abi: Dict) -> _EventType:
+        indexed = []
+        data = []
+        for arg in abi['inputs']:
+            if arg['indexed']:
+                decoder = None
+                if not parse_abi_type(arg['type']).is_dynamic:
+                    decoder = abi_registry.get_decoder(arg['type'])
+                indexed.append((arg['name'], decoder, _normalizer(arg['type'])))
+            else:
+                data.append(arg)
+
+        return _EventType(
+            name=abi['name'],
+            indexed=indexed,
+            data_names=[arg['name'] for arg in data],
+            data_decoder=TupleDecoder(decoders=[abi_registry.get_decoder(arg['type']) for arg in data]),
+            data_normalizers=[_normalizer(arg['type']) for arg in data],
+            arg_names=[arg['name'] for arg in abi['inputs']]
+        )
+
+    def topics(self, events: Iterable[str]) -> List[str]:
+        """Returns the topic0 (hex) of each of @events. Names which aren't events of the contract are skipped"""
+        return [self.topics_by_name[event_name] for event_name in events if event_name in self.topics_by_name]
+
+    def decode(self, log) -> Optional[AttributeDict]:
+        """Decodes a raw log. Returns None if the log isn't one of the contract's events"""
+        if not log['topics']:
+            return None
+        event_type = self.events.get(log_topic(log))
+        if event_type is None:
+            return None
+
+        args = {}
+        for (name, decoder, normalizer), topic in zip(event_type.indexed, log['topics'][1:]):
+            value = decoder(ContextFramesBytesIO(bytes(topic))) if decoder else HexBytes(topic)
+            args[name] = normalizer(value) if normalizer else value
+
+        data = log['data']
+        values = event_type.data_decoder(ContextFramesBytesIO(bytes(HexBytes(data))))
+        for name, normalizer, value in zip(event_type.data_names, event_type.data_normalizers, values):
+            args[name] = normalizer(value) if normalizer else value
+
+        return AttributeDict({
+            'args': AttributeDict({name: args[name] for name in event_type.arg_names}),
+            'event': event_type.name,
+            'logIndex': log['logIndex'],
+            'transactionIndex': log['transactionIndex'],
+            'transactionHash': log['transactionHash'],
+            'address': log['address'],
+            'blockHash': log['blockHash'],
+            'blockNumber': log['blockNumber'],
+        })
+
+    def decode_receipt(self, receipt, events: Iterable[str]) -> List[AttributeDict]:
+        """Returns the decoded logs of @events in a receipt, in log order"""
+        topics = set(self.topics(events))
+        return [self.decode(log) for log in receipt['logs'] if log['topics'] and log_topic(log) in topics]
@@ -0,0 +1,111 @@
+import asyncio
+import json
+from logging import Logger
+from threading import Condition, Lock, Thread
+from time import sleep
+from typing import Dict, Optional
+
+import websockets
+
+from src.util.logger import get_logger
+
+RECONNECT_INTERVAL = 5.0
+
+_subscriptions: Dict[str, 'NewHeadsSubscription'] = {}
+_subscriptions_lock = Lock()
+
+
+def subscribe_request(request_id: int = 1) -> str:
+    return json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': 'eth_subscribe', 'params': ['newHeads']})
+
+
+class NewHeadsSubscription(Thread):
+    """
+    Subscribes to 'newHeads' on a WebSocket or IPC node, and wakes up the threads waiting for a new block as soon as
+    one arrives, instead of having them poll eth_blockNumber every sleep interval
+
+    HTTP nodes can't push notifications, so there is no subscription for them - see for_endpoint
+    """
+
+    def __init__(self, endpoint: str, logger: Optional[Logger] = None):
+        self.endpoint = endpoint
+        self.head: Optional[int] = None
+        # False while we're reconnecting, which means self.head might be stale
+        self.connected = False
+        self._new_head = Condition()
+        self.logger = logger or get_logger(logger_name=self.__class__.__name__)
+        super().__init__(group=None, name=f"NewHeads-{endpoint}", target=self.run)
+        self.setDaemon(True)
+
+    @classmethod
+    def for_endpoint(cls, endpoint: str) -> Optional['NewHeadsSubscription']:
+        """Returns the (started) subscription shared by everyone in the process, or None if @endpoint is HTTP"""
+        if endpoint.startswith('http'):
+            return None
+
+        with _subscriptions_lock:
+            if endpoint not in _subscriptions:
+                subscription = cls(endpoint)
+                subscription.start()
+                _subscriptions[endpoint] = subscription
+            return _subscriptions[endpoint]
+
+    def wait_for_head(self, last_seen: Optional[int], timeout: float) -> Optional[int]:
+        """
+        Blocks until the head is past @last_seen, or until @timeout passed
+
+        :return: the current head, or None if we didn't get any head from the node yet
+        """
+        with self._new_head:
+            self._new_head.wait_for(lambda: self.head is not None and (last_seen is None or self.head > last_seen),
+                                    timeout=timeout)
+            return self.head
+
+    def _on_head(self, number: int):
+        with self._new_head:
+            self.head = number
+            self._new_head.notify_all()
+
+    def _on_message(self, message: str):
+        data = json.loads(message)
+        if data.get('method') != 'eth_subscription':
+            return
+        self._on_head(int(data['params']['result']['number'], 16))
+
+    def run(self):
+        while True:
+            try:
+                asyncio.run(self._subscribe())
+            except (OSError, ValueError, KeyError, websockets.WebSocketException) as e:
+                self.logger.error(f'Lost newHeads subscription to {self.endpoint}: {e}')
+            self.connected = False
+            sleep(RECONNECT_INTERVAL)
+
+    async def _subscribe(self):
+        if self.endpoint.startswith('ws'):
+            await self._subscribe_ws()
+        else:
+            await self._subscribe_ipc()
+
+    async def _subscribe_ws(self):
+        async with websockets.connect(self.endpoint, max_size=None) as ws:
+            await ws.send(subscribe_request())
+            self.logger.info(f'Subscribed to new heads of {self.endpoint}: {await ws.recv()}')
+            self.connected = True
+            async for message in ws:
+                self._on_message(message)
+
+    async def _subscribe_ipc(self):
+        reader, writer = await asyncio.open_unix_connection(self.endpoint, limit=2 ** 24)
+        try:
+            writer.write(subscribe_request().encode() + b'\n')
+            await writer.drain()
+            self.logger.info(f'Subscribed to new heads of {self.endpoint}: {await reader.readline()}')
+            self.connected = True
+            while True:
+                message = await reader.readline()
+                if not message:
+                    raise ConnectionResetError('IPC connection closed')
+                self._on_message(message.decode())
+        finally:
+            writer.close()
@@ -0,0 +1,110 @@
+from logging import Logger
+from time import monotonic
+from typing import Generator, List, Optional
+
+from requests.exceptions import Timeout
+from web3 import Web3
+from web3.contract import Contract as Web3Contract
+from web3.datastructures import AttributeDict
+
+from src.util.eth.event_decoder import EventDecoder
+from src.util.logger import get_logger
+
+# error code used by most node implementations (and infura) when a query exceeds the node's limits
+LIMIT_EXCEEDED_CODE = -32005
+LIMIT_EXCEEDED_MESSAGES = ('more than', 'too large', 'too wide', 'too many', 'limit exceeded', 'size exceeded',
+                           'exceed maximum', 'block range')
+
+
+def is_limit_exceeded(error: Exception) -> bool:
+    """Returns True if the node refused an eth_getLogs query because the requested range was too large"""
+    if isinstance(error, Timeout):
+        return True
+
+    details = error.args[0] if error.args else ''
+    if isinstance(details, dict):
+        if details.get('code') == LIMIT_EXCEEDED_CODE:
+            return True
+        details = details.get('message', '')
+
+    details = str(details).lower()
+    return any(msg in details for msg in LIMIT_EXCEEDED_MESSAGES)
+
+
+class LogScanner:
+    """
+    Scans a block range for contract events using eth_getLogs, instead of fetching every block and receipt
+
+    The range is requested in chunks. The chunk grows while the results are sparse, and shrinks whenever the node
+    refuses the query as too large, so a scan adapts both to empty history and to busy ranges.
+    """
+    MIN_CHUNK = 1
+    MAX_CHUNK = 10000
+    START_CHUNK = 100
+    # grow the chunk only while a query returns less logs than this
+    SPARSE_RESULTS = 100
+
+    def __init__(self, provider: Web3, contract: Web3Contract, events: List[str], logger: Optional[Logger] = None,
+                 chunk_size: int = START_CHUNK, decoder: Optional[EventDecoder] = None):
+        self.provider = provider
+        self.address = contract.address
+        # pass the contract's decoder (EthereumContract.decoder) to avoid building a new one for every scan
+        self.decoder = decoder or EventDecoder(contract.abi)
+        self.topics = self.decoder.topics(events)
+
+        self.chunk_size = min(max(chunk_size, self.MIN_CHUNK), self.MAX_CHUNK)
+        self.logger = logger or get_logger(logger_name=self.__class__.__name__)
+
+        self.blocks_scanned = 0
+        self.fetch_time = 0.0
+
+    @property
+    def blocks_per_second(self) -> float:
+        if not self.fetch_time:
+            return 0.0
+        return self.blocks_scanned / self.fetch_time
+
+    def scan(self, from_block: int, to_block: int) -> Generator[AttributeDict, None, None]:
+        """
+        Yields the decoded events of the contract in [from_block, to_block] (inclusive), in block order
+
+        :raises ValueError: if the node refuses the query even for a single block
+        """
+        current = from_block
+        while current <= to_block:
+            end = min(current + self.chunk_size - 1, to_block)
+
+            try:
+                logs = self._get_logs(current, end)
+            except (ValueError, Timeout) as e:
+                if self.chunk_size == self.MIN_CHUNK or not is_limit_exceeded(e):
+                    raise
+                self.chunk_size = max(self.chunk_size // 2, self.MIN_CHUNK)
+                self.logger.debug(f'Query for blocks {current}-{end} refused, shrinking chunk to {self.chunk_size}')
+                continue
+
+            for log in logs:
+                yield self.decode(log)
+
+            self.blocks_scanned += end - current + 1
+            current = end + 1
+
+            if len(logs) < self.SPARSE_RESULTS:
+                self.chunk_size = min(self.chunk_size * 2, self.MAX_CHUNK)
+
+        self.logger.info(f'Scanned blocks {from_block}-{to_block} of {self.address} '
+                         f'({self.blocks_per_second:.1f} blocks/sec)')
+
+    def decode(self, log) -> AttributeDict:
+        return self.decoder.decode(log)
+
+    def _get_logs(self, from_block: int, to_block: int) -> List:
+        start = monotonic()
+        logs = self.provider.eth.getLogs({
+            'address': self.address,
+            'topics': [self.topics],
+            'fromBlock': from_block,
+            'toBlock': to_block
+        })
+        self.fetch_time += monotonic() - start
+        return logs
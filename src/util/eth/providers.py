@@ -0,0 +1,63 @@
+from threading import Lock, local
+from typing import Any
+
+import requests
+from web3 import HTTPProvider, WebsocketProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+REQUEST_TIMEOUT = 10
+
+
+class ThreadLocalSession:
+    """A keep-alive requests session per thread, so threads never wait for each other's connections"""
+
+    def __init__(self):
+        self._local = local()
+
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+
+class ThreadLocalHTTPProvider(HTTPProvider):
+    """
+    HTTPProvider with a session per thread. The stock provider shares one session (and its connection pool) between
+    all the threads of the process, which is why we used to serialize requests behind a lock
+    """
+
+    def __init__(self, endpoint_uri: str, request_kwargs: Any = None):
+        super().__init__(endpoint_uri, request_kwargs)
+        self.sessions = ThreadLocalSession()
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        return self.decode_rpc_response(self._post(self.encode_rpc_request(method, params)))
+
+    def make_batch_request(self, request_data: bytes) -> bytes:
+        """Sends an already encoded JSON-RPC batch, and returns the raw answer (see RpcBatch)"""
+        return self._post(request_data)
+
+    def _post(self, request_data: bytes) -> bytes:
+        kwargs = dict(self.get_request_kwargs())
+        # same default as web3
+        kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+        response = self.sessions.session.post(self.endpoint_uri, data=request_data, **kwargs)
+        response.raise_for_status()
+        return response.content
+
+
+class SerializedWebsocketProvider(WebsocketProvider):
+    """
+    web3's WebsocketProvider reads the answer from the shared connection right after sending the request, so requests
+    from different threads can't overlap (the IPC provider has the same lock built in)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = Lock()
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        with self.lock:
+            return super().make_request(method, params)
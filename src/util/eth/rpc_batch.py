@@ -0,0 +1,129 @@
+import json
+from itertools import count
+from typing import Any, Callable, List
+
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from web3 import HTTPProvider, Web3
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from web3._utils.request import make_post_request
+from web3.contract import ContractFunction
+
+
+def _to_int(value: str) -> int:
+    return int(value, 16)
+
+
+def call_data(function: ContractFunction) -> str:
+    """The eth_call data (selector and encoded arguments) of a contract function call"""
+    # noinspection PyProtectedMember
+    return function._encode_transaction_data()  # pylint: disable=protected-access
+
+
+def decode_output(provider: Web3, function: ContractFunction, data: bytes):
+    """Decodes the output of a contract function call, same as function.call()"""
+    output_types = get_abi_output_types(function.abi)
+    decoded = provider.codec.decode_abi(output_types, HexBytes(data))
+    normalized = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, decoded)
+    return normalized[0] if len(normalized) == 1 else normalized
+
+
+class BatchResult:
+    """Placeholder for the result of one request in the batch, filled in by RpcBatch.execute()"""
+    _unset = object()
+
+    def __init__(self, method: str, params: List, formatter: Callable[[Any], Any]):
+        self.method = method
+        self.params = params
+        self.formatter = formatter
+        self._result = self._unset
+
+    @property
+    def result(self):
+        if self._result is self._unset:
+            raise RuntimeError(f"{self.method} wasn't executed yet")
+        return self._result
+
+    def set(self, raw_result):
+        self._result = self.formatter(raw_result)
+
+
+class RpcBatch:
+    """
+    Collects independent reads, and sends them to the node in a single JSON-RPC batch request
+
+        batch = RpcBatch(w3)
+        balance = batch.get_balance(account)
+        nonce = batch.get_transaction_count(account)
+        batch.execute()
+        balance.result, nonce.result
+
+    Results are converted the same way web3 converts them (ints, checksum addresses, decoded contract outputs). Nodes
+    that aren't reached over HTTP get the requests one by one
+    """
+    _ids = count(1)
+
+    def __init__(self, provider: Web3):
+        self.provider = provider
+        self.requests: List[BatchResult] = []
+
+    def __len__(self) -> int:
+        return len(self.requests)
+
+    def add(self, method: str, params: List, formatter: Callable[[Any], Any] = lambda result: result) -> BatchResult:
+        request = BatchResult(method, params, formatter)
+        self.requests.append(request)
+        return request
+
+    def get_balance(self, account: str, block_identifier: str = 'latest') -> BatchResult:
+        return self.add('eth_getBalance', [to_checksum_address(account), block_identifier], _to_int)
+
+    def get_transaction_count(self, account: str, block_identifier: str = 'pending') -> BatchResult:
+        return self.add('eth_getTransactionCount', [to_checksum_address(account), block_identifier], _to_int)
+
+    def gas_price(self) -> BatchResult:
+        return self.add('eth_gasPrice', [], _to_int)
+
+    def block_number(self) -> BatchResult:
+        return self.add('eth_blockNumber', [], _to_int)
+
+    def call(self, function: ContractFunction, block_identifier: str = 'latest') -> BatchResult:
+        """Same as function.call(), returns the decoded output of a contract view function"""
+        tx = {'to': function.address, 'data': call_data(function)}
+        return self.add('eth_call', [tx, block_identifier], lambda result: decode_output(self.provider, function, result))
+
+    def execute(self) -> List[Any]:
+        """
+        Sends all the requests, and returns their results in order
+
+        :raises ValueError: if the node returned an error for one of the requests (same as web3)
+        """
+        if not self.requests:
+            return []
+
+        responses = self._send([{'jsonrpc': '2.0', 'method': request.method, 'params': request.params,
+                                 'id': next(self._ids)} for request in self.requests])
+        for request, response in zip(self.requests, responses):
+            if 'error' in response:
+                raise ValueError(response['error'])
+            request.set(response['result'])
+        return [request.result for request in self.requests]
+
+    def _send(self, payload: List[dict]) -> List[dict]:
+        provider = self.provider.provider
+        data = json.dumps(payload).encode()
+
+        if hasattr(provider, 'make_batch_request'):  # our HTTP providers
+            raw = provider.make_batch_request(data)
+        elif isinstance(provider, HTTPProvider):
+            raw = make_post_request(provider.endpoint_uri, data, **provider.get_request_kwargs())
+        else:
+            return [provider.make_request(item['method'], item['params']) for item in payload]
+
+        responses = json.loads(raw)
+        if not isinstance(responses, list):
+            # some nodes answer a batch they don't support with a single error
+            raise ValueError(responses.get('error', responses))
+        by_id = {response.get('id'): response for response in responses}
+        return [by_id.get(item['id'], {'error': f"No response for {item['method']}"}) for item in payload]
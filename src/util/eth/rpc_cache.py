@@ -0,0 +1,130 @@
+import json
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+DEFAULT_CACHE_SIZE = 10000
+
+# answers which never change
+STATIC_METHODS = ('eth_chainId', 'net_version')
+# blocks are identified by their hash, so the answer can't change (once the node knows the block)
+BY_HASH_METHODS = ('eth_getBlockByHash',)
+# answers which can only change if the block they're part of is replaced by a reorg
+IN_BLOCK_METHODS = ('eth_getTransactionReceipt', 'eth_getTransactionByHash')
+
+
+class LRUCache:
+    """Thread safe LRU cache with a maximum number of entries, which counts its hits and misses"""
+    _missing = object()
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Returns (found, value)"""
+        with self.lock:
+            value = self.entries.get(key, self._missing)
+            if value is self._missing:
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def put(self, key: Hashable, value: Any):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def _to_int(value) -> Optional[int]:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.startswith('0x'):
+        return int(value, 16)
+    return None
+
+
+class FinalityCache:
+    """
+    web3 middleware which caches the answers that can't change anymore: the chain id, blocks by hash, and blocks,
+    receipts, transactions and contract calls from blocks that are at least @confirmations deep
+
+    The head is learned from the eth_blockNumber answers going through the middleware, so until we see one (or when
+    it's stale) less is cached, but nothing that can still change. It works on the raw JSON-RPC params and results,
+    so only middlewares that pass them through untouched (like SingleFlight) may sit between it and the provider
+    """
+
+    def __init__(self, confirmations: int, max_size: int = DEFAULT_CACHE_SIZE):
+        self.confirmations = confirmations
+        self.cache = LRUCache(max_size)
+        self.head: Optional[int] = None
+
+    @property
+    def hits(self) -> int:
+        return self.cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self.cache.misses
+
+    def __call__(self, make_request: Callable, _web3) -> Callable:
+        def middleware(method, params):
+            if not self._may_cache(method, params):
+                response = make_request(method, params)
+                self._observe_head(method, params, response)
+                return response
+
+            key = (method, json.dumps(params, sort_keys=True))
+            found, result = self.cache.get(key)
+            if found:
+                return {'jsonrpc': '2.0', 'result': result}
+
+            response = make_request(method, params)
+            if 'result' in response and self._is_final(method, response['result']):
+                self.cache.put(key, response['result'])
+            return response
+        return middleware
+
+    def _observe_head(self, method: str, params, response):
+        result = response.get('result')
+        if result is None:
+            return
+        head = None
+        if method == 'eth_blockNumber':
+            head = _to_int(result)
+        elif method == 'eth_getBlockByNumber' and params[0] == 'latest':
+            head = _to_int(result.get('number'))
+        if head is not None and (self.head is None or head > self.head):
+            self.head = head
+
+    def _final_block(self, number: Optional[int]) -> bool:
+        return number is not None and self.head is not None and number <= self.head - self.confirmations
+
+    def _may_cache(self, method: str, params) -> bool:
+        """Whether the request can have a final answer at all"""
+        if method in STATIC_METHODS or method in BY_HASH_METHODS or method in IN_BLOCK_METHODS:
+            return True
+        if method == 'eth_getBlockByNumber':
+            return self._final_block(_to_int(params[0]))
+        if method == 'eth_call':
+            return len(params) > 1 and self._final_block(_to_int(params[1]))
+        return False
+
+    def _is_final(self, method: str, result) -> bool:
+        """Whether the answer we got can't change anymore"""
+        if result is None:
+            # unknown block or transaction - might be there later
+            return False
+        if method in IN_BLOCK_METHODS:
+            return self._final_block(_to_int(result.get('blockNumber')))
+        return True
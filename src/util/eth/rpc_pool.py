@@ -0,0 +1,157 @@
+import random
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, List, Optional
+
+import requests
+from web3.providers.base import JSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from src.util.eth.providers import REQUEST_TIMEOUT, ThreadLocalSession
+from src.util.logger import get_logger
+
+# weight of the latest request in the latency average
+LATENCY_ALPHA = 0.3
+# share of the requests sent to a random healthy node, so the latency of the other nodes stays up to date
+EXPLORE_RATE = 0.05
+# consecutive failures after which a node is ejected, and for how long (seconds)
+FAILURE_THRESHOLD = 3
+EJECT_TIME = 30
+# HTTP statuses which mean the node (and not the request) has a problem
+UNHEALTHY_STATUSES = (429, 500, 502, 503, 504)
+# methods which can take long on a healthy node - a timeout means the query was too heavy (the log scanner shrinks
+# its range when it times out), so the node isn't failed for it and the query isn't retried on the other nodes
+HEAVY_METHODS = ('eth_getLogs',)
+
+
+class NodeUnavailable(ConnectionError):
+    pass
+
+
+class Endpoint:
+    """An ethereum node, its keep-alive sessions (one per thread), latency and circuit breaker state"""
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        self.sessions = ThreadLocalSession()
+        # None until the first request, so new nodes get tried
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def healthy(self, now: float) -> bool:
+        """Ejected nodes become available again (half open) once their ejection time is over"""
+        return self.ejected_until <= now
+
+    def record_success(self, elapsed: float):
+        self.latency = elapsed if self.latency is None else \
+            LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * self.latency
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def record_failure(self, now: float) -> bool:
+        """Returns True if the node was just ejected"""
+        self.failures += 1
+        if self.failures >= FAILURE_THRESHOLD:
+            self.ejected_until = now + EJECT_TIME
+            # a node that comes back has to prove itself again with a single failure
+            self.failures = FAILURE_THRESHOLD - 1
+            return True
+        return False
+
+
+class PooledHTTPProvider(JSONBaseProvider):
+    """
+    web3 provider over several HTTP ethereum nodes
+
+    Each request goes to the healthy node with the lowest (moving average) latency. When a node fails to answer (a
+    connection error, timeout or 5xx/429 response) the request is retried on the next node, and a node that keeps
+    failing is ejected for EJECT_TIME seconds. JSON-RPC errors are answers, and are returned as usual
+
+    When no node answers, requests.Timeout is raised if a node timed out, and NodeUnavailable otherwise
+    """
+
+    def __init__(self, endpoint_uris: List[str], request_timeout: float = REQUEST_TIMEOUT):
+        super().__init__()
+        if not endpoint_uris:
+            raise ValueError("No ethereum nodes were configured")
+        self.endpoints = [Endpoint(uri) for uri in endpoint_uris]
+        self.request_timeout = request_timeout
+        self.lock = Lock()
+        self.logger = get_logger(logger_name=self.__class__.__name__)
+
+    def __str__(self):
+        return f"Pooled HTTP connection {[endpoint.uri for endpoint in self.endpoints]}"
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = monotonic()
+        with self.lock:
+            return [{'uri': endpoint.uri, 'latency': endpoint.latency, 'healthy': endpoint.healthy(now)}
+                    for endpoint in self.endpoints]
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        return self.decode_rpc_response(self._send(request_data, method))
+
+    def make_batch_request(self, request_data: bytes) -> bytes:
+        """Sends an already encoded JSON-RPC batch, and returns the raw answer (see RpcBatch)"""
+        return self._send(request_data, 'batch')
+
+    def _send(self, request_data: bytes, description: str) -> bytes:
+        errors = []
+        timed_out = False
+        for endpoint in self._route():
+            start = monotonic()
+            try:
+                raw_response = self._post(endpoint, request_data)
+            except requests.ReadTimeout as e:
+                if description in HEAVY_METHODS:
+                    raise
+                timed_out = True
+                errors.append(f"{endpoint.uri}: {e}")
+                self._failed(endpoint, e)
+                continue
+            except (requests.RequestException, NodeUnavailable) as e:
+                errors.append(f"{endpoint.uri}: {e}")
+                self._failed(endpoint, e)
+                continue
+
+            with self.lock:
+                endpoint.record_success(monotonic() - start)
+            return raw_response
+
+        if timed_out:
+            raise requests.Timeout(f"All ethereum nodes failed to answer {description}: {errors}")
+        raise NodeUnavailable(f"All ethereum nodes failed to answer {description}: {errors}")
+
+    def _route(self) -> List[Endpoint]:
+        """Returns the nodes in the order we should try them"""
+        now = monotonic()
+        with self.lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy(now)]
+            ejected = [endpoint for endpoint in self.endpoints if not endpoint.healthy(now)]
+
+        # untested nodes first, then by latency
+        healthy.sort(key=lambda endpoint: -1.0 if endpoint.latency is None else endpoint.latency)
+        if len(healthy) > 1 and random.random() < EXPLORE_RATE:
+            healthy.insert(0, healthy.pop(random.randrange(1, len(healthy))))
+
+        # when everything is down, it's still better to try than to fail right away
+        ejected.sort(key=lambda endpoint: endpoint.ejected_until)
+        return healthy + ejected
+
+    def _post(self, endpoint: Endpoint, request_data: bytes) -> bytes:
+        response = endpoint.sessions.session.post(endpoint.uri, data=request_data, timeout=self.request_timeout,
+                                                  headers={'Content-Type': 'application/json'})
+        if response.status_code in UNHEALTHY_STATUSES:
+            raise NodeUnavailable(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        return response.content
+
+    def _failed(self, endpoint: Endpoint, error: Exception):
+        with self.lock:
+            ejected = endpoint.record_failure(monotonic())
+        if ejected:
+            self.logger.warning(f"Ejecting ethereum node {endpoint.uri} for {EJECT_TIME} seconds: {error}")
+        else:
+            self.logger.info(f"Ethereum node {endpoint.uri} failed, trying the next one: {error}")
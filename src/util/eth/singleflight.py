@@ -0,0 +1,65 @@
+import json
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Hashable
+
+# reads which are safe to share between callers. Writes (eth_sendRawTransaction..) always go to the node
+COALESCED_METHODS = frozenset([
+    'eth_blockNumber', 'eth_gasPrice', 'eth_chainId', 'net_version', 'eth_getBalance', 'eth_getTransactionCount',
+    'eth_getCode', 'eth_call', 'eth_estimateGas', 'eth_getBlockByNumber', 'eth_getBlockByHash',
+    'eth_getTransactionReceipt', 'eth_getTransactionByHash', 'eth_getLogs',
+])
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.response: Any = None
+        self.error: Exception = None
+
+
+class SingleFlight:
+    """
+    web3 middleware which coalesces identical concurrent requests: while a request is in flight, threads asking the
+    exact same thing wait for its answer instead of sending their own
+
+    @saved counts the requests which didn't reach the node thanks to that
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.in_flight: Dict[Hashable, _Call] = {}
+        self.requests = 0
+        self.saved = 0
+
+    def __call__(self, make_request: Callable, _web3) -> Callable:
+        def middleware(method, params):
+            if method not in COALESCED_METHODS:
+                return make_request(method, params)
+
+            key = (method, json.dumps(params, sort_keys=True, default=str))
+            with self.lock:
+                self.requests += 1
+                call = self.in_flight.get(key)
+                leader = call is None
+                if leader:
+                    call = self.in_flight[key] = _Call()
+                else:
+                    self.saved += 1
+
+            if not leader:
+                call.done.wait()
+                if call.error is not None:
+                    raise call.error
+                return call.response
+
+            try:
+                call.response = make_request(method, params)
+                return call.response
+            except Exception as e:
+                call.error = e
+                raise
+            finally:
+                with self.lock:
+                    del self.in_flight[key]
+                call.done.set()
+        return middleware
@@ -0,0 +1,68 @@
+import json
+import os
+from typing import Optional
+
+from Crypto.Cipher import AES
+from Crypto.Hash import SHA256
+from Crypto.Protocol.DH import import_x25519_public_key, key_agreement
+from Crypto.Protocol.KDF import HKDF
+from Crypto.PublicKey import ECC
+
+# fixed salt used by the Secret Network clients (secretcli / secretjs) to derive transaction keys
+HKDF_SALT = bytes.fromhex('000000000000000000024bead8df69990852c202db0e0097c1a12ea637d7e96d')
+NONCE_SIZE = 32
+PUBKEY_SIZE = 32
+# contract messages are prefixed with the (hex) code hash of the contract
+CODE_HASH_SIZE = 64
+
+
+def load_tx_seed(secretcli_home: str) -> bytes:
+    """Reads the transaction key seed that secretcli keeps in id_tx_io.json"""
+    with open(os.path.join(secretcli_home, 'id_tx_io.json')) as f:
+        return bytes.fromhex(json.load(f)['seed'])
+
+
+class SecretEncryption:
+    """
+    Encryption of contract messages (and decryption of their results), same as secretcli does it:
+
+    tx key = HKDF-SHA256(X25519(seed, consensus io pubkey) || nonce), and messages are AES-SIV encrypted with it. An
+    encrypted message is nonce || our pubkey || ciphertext, and the enclave answers with the same key
+    """
+
+    def __init__(self, seed: bytes, io_pubkey: bytes):
+        self.private_key = ECC.construct(curve='Curve25519', seed=seed)
+        self.pubkey: bytes = self.private_key.public_key().export_key(format='raw')
+        self.shared_secret: bytes = key_agreement(static_priv=self.private_key,
+                                                  static_pub=import_x25519_public_key(io_pubkey),
+                                                  kdf=lambda secret: secret)
+
+    def tx_key(self, nonce: bytes) -> bytes:
+        return HKDF(self.shared_secret + nonce, 32, HKDF_SALT, SHA256)
+
+    def encrypt(self, code_hash: str, msg: str, nonce: Optional[bytes] = None) -> bytes:
+        """Encrypts a contract message (json string). A random nonce is used unless one is given"""
+        if nonce is None:
+            nonce = os.urandom(NONCE_SIZE)
+        plaintext = code_hash.lower().encode() + msg.encode()
+
+        cipher = AES.new(self.tx_key(nonce), AES.MODE_SIV)
+        cipher.update(b'')
+        ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+        return nonce + self.pubkey + tag + ciphertext
+
+    def decrypt(self, ciphertext: bytes, nonce: bytes) -> bytes:
+        """
+        Decrypts an answer of the enclave (or a message we encrypted, without its nonce and pubkey)
+
+        :raises ValueError: if the ciphertext wasn't encrypted with our key and @nonce
+        """
+        cipher = AES.new(self.tx_key(nonce), AES.MODE_SIV)
+        cipher.update(b'')
+        return cipher.decrypt_and_verify(ciphertext[16:], ciphertext[:16])
+
+    @staticmethod
+    def split(encrypted_msg: bytes):
+        """Returns (nonce, pubkey, ciphertext) of an encrypted message"""
+        return (encrypted_msg[:NONCE_SIZE], encrypted_msg[NONCE_SIZE:NONCE_SIZE + PUBKEY_SIZE],
+                encrypted_msg[NONCE_SIZE + PUBKEY_SIZE:])
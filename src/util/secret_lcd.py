@@ -0,0 +1,141 @@
+import base64
+import re
+from subprocess import CalledProcessError
+from threading import Lock
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.util.secret_encryption import SecretEncryption, NONCE_SIZE
+
+REQUEST_TIMEOUT = 10
+POOL_SIZE = 32
+
+ENCRYPTED_ERROR = re.compile(r'encrypted: ([A-Za-z0-9+/=]+)')
+
+
+class QueryError(CalledProcessError):
+    """
+    A contract query the contract answered with an error. Same as the one raised by `secretcli query compute query`,
+    so callers which look at its stderr keep working
+    """
+
+    def __init__(self, cmd, error: str):
+        super().__init__(1, cmd, output=b'', stderr=f'ERROR: query result: encrypted: {error}'.encode())
+
+
+class SecretLCDClient:
+    """
+    Queries the secret network node through its REST server (LCD), instead of forking a secretcli process for each one
+
+    Contract queries are encrypted with the transaction key of secretcli (@seed, see load_tx_seed), so the answers are
+    the same as secretcli's
+    """
+
+    def __init__(self, url: str, seed: bytes, timeout: int = REQUEST_TIMEOUT):
+        self.url = url.rstrip('/')
+        self.seed = seed
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._encryption: Optional[SecretEncryption] = None
+        self._encryption_lock = Lock()
+
+    @property
+    def encryption(self) -> SecretEncryption:
+        """Created on first use - the network's io key is needed for that"""
+        with self._encryption_lock:
+            if self._encryption is None:
+                io_pubkey = self._get('/reg/consensus-io-exch-pubkey')['result']['ioExchPubkey']
+                self._encryption = SecretEncryption(self.seed, base64.b64decode(io_pubkey))
+        return self._encryption
+
+    def query_contract(self, contract: str, code_hash: str, query: str) -> str:
+        """
+        Same as `secretcli query compute query`
+
+        :return: the answer of the contract (json string)
+        :raises QueryError: if the contract answered with an error
+        """
+        encrypted = self.encryption.encrypt(code_hash, query)
+        nonce = encrypted[:NONCE_SIZE]
+        encoded = base64.b64encode(encrypted).hex()
+
+        response = self.session.get(f'{self.url}/wasm/contract/{contract}/query/{encoded}',
+                                    params={'encoding': 'hex'}, timeout=self.timeout)
+        if response.status_code != 200:
+            error = self._decrypt_error(response.text, nonce)
+            if error is None:
+                response.raise_for_status()
+            raise QueryError(['query', contract, query], error)
+
+        answer = self.encryption.decrypt(base64.b64decode(response.json()['result']['smart']), nonce)
+        return base64.b64decode(answer).decode()
+
+    def account(self, address: str) -> Dict:
+        """
+        Same as `secretcli query account` - {"type": .., "value": {"account_number": .., "sequence": .., "coins": ..}}
+
+        :raises RuntimeError: if the account doesn't exist or the node failed to answer
+        """
+        try:
+            account = self._get(f'/auth/accounts/{address}')['result']
+        except (requests.RequestException, KeyError) as e:
+            raise RuntimeError(f'Failed to get account {address}: {e}') from e
+        if not account.get('value', {}).get('address'):
+            raise RuntimeError(f'Account {address} does not exist')
+        return account
+
+    def tx(self, tx_hash: str) -> Optional[Dict]:
+        """Same as `secretcli query tx`. Returns None if the transaction isn't on-chain (yet)"""
+        response = self.session.get(f'{self.url}/txs/{tx_hash}', timeout=self.timeout)
+        if response.status_code == 404 or (response.status_code != 200 and 'not found' in response.text):
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def compute_tx(self, tx_hash: str) -> Optional[Dict]:
+        """
+        Same as `secretcli query compute tx` - the decrypted result of a contract execution, as
+        {"output_data_as_string": .., "output_error": ..}. Returns None if the transaction isn't on-chain (yet)
+
+        :raises ValueError: if the transaction isn't one of ours (can't be decrypted)
+        """
+        tx = self.tx(tx_hash)
+        if tx is None:
+            return None
+
+        try:
+            encrypted_msg = base64.b64decode(tx['tx']['value']['msg'][0]['value']['msg'])
+        except (KeyError, IndexError) as e:
+            raise ValueError(f'Transaction {tx_hash} is not a contract execution') from e
+        nonce = encrypted_msg[:NONCE_SIZE]
+
+        output_error = ''
+        if tx.get('code'):
+            output_error = self._decrypt_error(tx.get('raw_log', ''), nonce) or tx.get('raw_log', '')
+
+        output_data = ''
+        if tx.get('data'):
+            output_data = base64.b64decode(self.encryption.decrypt(bytes.fromhex(tx['data']), nonce)).decode()
+
+        return {'output_data_as_string': output_data, 'output_error': output_error}
+
+    def _decrypt_error(self, log: str, nonce: bytes) -> Optional[str]:
+        match = ENCRYPTED_ERROR.search(log)
+        if not match:
+            return None
+        try:
+            return self.encryption.decrypt(base64.b64decode(match.group(1)), nonce).decode()
+        except ValueError:
+            return None
+
+    def _get(self, path: str) -> Dict:
+        response = self.session.get(f'{self.url}{path}', timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
@@ -0,0 +1,30 @@
+import base64
+import json
+
+DEFAULT_GAS = 200000
+
+
+def unsigned_execute_tx(sender: str, contract: str, encrypted_msg: bytes, gas: int = DEFAULT_GAS) -> str:
+    """
+    Same unsigned transaction `secretcli tx compute execute --generate-only` creates: a StdTx executing @contract with
+    @encrypted_msg (see SecretEncryption.encrypt), from @sender, without fees
+    """
+    return json.dumps({
+        "type": "cosmos-sdk/StdTx",
+        "value": {
+            "msg": [{
+                "type": "wasm/MsgExecuteContract",
+                "value": {
+                    "sender": sender,
+                    "contract": contract,
+                    "msg": base64.b64encode(encrypted_msg).decode(),
+                    "callback_code_hash": "",
+                    "sent_funds": [],
+                    "callback_sig": None
+                }
+            }],
+            "fee": {"amount": [], "gas": str(gas)},
+            "signatures": None,
+            "memo": ""
+        }
+    })
@@ -1,23 +1,51 @@
 import os
 import json
 import subprocess
+from functools import lru_cache
 from shutil import copyfile
-from subprocess import PIPE, run as subprocess_run
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from src.contracts.secret.secret_contract import swap_json
 from src.util.config import Config, config
 from src.util.logger import get_logger
+from src.util.secret_encryption import SecretEncryption, load_tx_seed
+from src.util.secret_lcd import SecretLCDClient
+from src.util.secret_tx import DEFAULT_GAS, unsigned_execute_tx
+from src.util.secretcli_executor import DEFAULT_MAX_PROCESSES, DEFAULT_TIMEOUT, SecretCliExecutor
 
 logger = get_logger(logger_name="SecretCLI", loglevel=config.log_level)
+executor = SecretCliExecutor(logger, max_processes=config.secretcli_processes or DEFAULT_MAX_PROCESSES,
+                             timeout=config.secretcli_timeout or DEFAULT_TIMEOUT)
 
 
-def query_encrypted_error(tx_hash: str):
-    cmd = ['secretcli', 'q', 'compute', 'tx', tx_hash]
-    resp = run_secret_cli(cmd)
+@lru_cache(maxsize=1)
+def lcd_client() -> Optional[SecretLCDClient]:
+    """Queries go through the node's REST server when one is configured, instead of forking secretcli"""
+    if not config.secret_rest_api:
+        return None
+    return SecretLCDClient(config.secret_rest_api, load_tx_seed(config.secretcli_home))
+
+
+def tx_encryption() -> Optional[SecretEncryption]:
+    """Encryption of contract messages with our transaction key - the network's io key comes from the REST server"""
+    client = lcd_client()
+    return client.encryption if client is not None else None
+
 
-    resp_json = json.loads(resp)
-    return resp_json["output_error"]
+def _compute_tx(tx_hash: str) -> Dict:
+    """`secretcli q compute tx`. Raises RuntimeError if the transaction isn't on-chain, like secretcli"""
+    client = lcd_client()
+    if client is None:
+        return json.loads(run_secret_cli(['secretcli', 'q', 'compute', 'tx', tx_hash], log=False))
+
+    result = client.compute_tx(tx_hash)
+    if result is None:
+        raise RuntimeError(f'Transaction {tx_hash} not found')
+    return result
+
+
+def query_encrypted_error(tx_hash: str):
+    return _compute_tx(tx_hash)["output_error"]
 
 
 def sign_tx(unsigned_tx_path: str, multi_sig_account_addr: str, account_name: str, account: int, sequence: int):
@@ -36,12 +64,42 @@ def multisig_tx(unsigned_tx_path: str, multi_sig_account_name: str, account: int
 
 def create_unsigned_tx(secret_contract_addr: str, transaction_data: Dict, chain_id: str, enclave_key: str,
                        code_hash: str, multisig_acc_addr: str) -> str:
+    client = lcd_client()
+    if client is not None:
+        # the network's io key is fetched once - after that it's just encrypting the message
+        encrypted_msg = client.encryption.encrypt(code_hash, json.dumps(transaction_data))
+        return unsigned_execute_tx(multisig_acc_addr, secret_contract_addr, encrypted_msg, DEFAULT_GAS)
+
+    return _generate_unsigned_tx(secret_contract_addr, transaction_data, chain_id, enclave_key, code_hash,
+                                 multisig_acc_addr)
+
+
+def _generate_unsigned_tx(secret_contract_addr: str, transaction_data: Dict, chain_id: str, enclave_key: str,
+                          code_hash: str, multisig_acc_addr: str) -> str:
     cmd = ['secretcli', 'tx', 'compute', 'execute', secret_contract_addr, f"{json.dumps(transaction_data)}",
            '--generate-only', '--chain-id', f"{chain_id}", '--enclave-key', enclave_key, '--code-hash',
-           code_hash, '--from', multisig_acc_addr, '--gas', '200000']
+           code_hash, '--from', multisig_acc_addr, '--gas', str(DEFAULT_GAS)]
     return run_secret_cli(cmd)
 
 
+def create_unsigned_mint_tx(secret_contract_addr: str, mints: List[Dict], chain_id: str, enclave_key: str,
+                            code_hash: str, multisig_acc_addr: str) -> str:
+    """ A single transaction with a message for each of @mints - its gas and fees are the sum of theirs """
+    txs = [json.loads(create_unsigned_tx(secret_contract_addr, mint, chain_id, enclave_key, code_hash,
+                                         multisig_acc_addr)) for mint in mints]
+    tx = txs[0]
+    fee = tx['value']['fee']
+    amounts: Dict[str, int] = {}
+    for other in txs:
+        for coin in other['value']['fee']['amount'] or []:
+            amounts[coin['denom']] = amounts.get(coin['denom'], 0) + int(coin['amount'])
+    for other in txs[1:]:
+        tx['value']['msg'] += other['value']['msg']
+    fee['gas'] = str(sum(int(other['value']['fee']['gas']) for other in txs))
+    fee['amount'] = [{'denom': denom, 'amount': str(amount)} for denom, amount in amounts.items()]
+    return json.dumps(tx)
+
+
 def broadcast(signed_tx_path: str) -> str:
     # async mode allows sending more than 1 tx per block
     cmd = ['secretcli', 'tx', 'broadcast', signed_tx_path, '-b', 'async']
@@ -55,17 +113,32 @@ def decrypt(data: str) -> str:
 
 def query_scrt_swap(nonce: int, scrt_swap_address: str, token: str) -> str:
     query_str = swap_json(nonce, token)
+    client = lcd_client()
+    if client is not None:
+        return client.query_contract(scrt_swap_address, config.swap_code_hash, query_str)
+
     cmd = ['secretcli', 'query', 'compute', 'query', scrt_swap_address, f"{query_str}"]
-    p = subprocess_run(cmd, stdout=PIPE, stderr=PIPE, check=True)
+    p = executor.run(cmd)
     return p.stdout.decode()
 
 
 def query_tx(tx_hash: str):
+    client = lcd_client()
+    if client is not None:
+        tx = client.tx(tx_hash)
+        if tx is None:
+            raise RuntimeError(f'Transaction {tx_hash} not found')
+        return json.dumps(tx)
+
     cmd = ['secretcli', 'query', 'tx', tx_hash]
     return run_secret_cli(cmd)
 
 
 def account_info(account: str):
+    client = lcd_client()
+    if client is not None:
+        return client.account(account)
+
     cmd = ['secretcli', 'query', 'account', account]
     return json.loads(run_secret_cli(cmd))
 
@@ -77,23 +150,41 @@ def query_data_success(tx_hash: str) -> Dict:
     :raises ValueError: On any bad response
 
     """
-    cmd = ['secretcli', 'query', 'compute', 'tx', tx_hash]
     try:
-        resp = run_secret_cli(cmd, log=False)
+        as_json = _compute_tx(tx_hash)
     except RuntimeError:
         return {}
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Failed to decode response as valid json: {e}") from None
     try:
-        as_json = json.loads(resp)
         output_error = as_json["output_error"]
         if output_error:
             raise ValueError(f"Failed to execute transaction: {output_error}")
-        return json.loads(json.loads(resp)["output_data_as_string"])
+        return json.loads(as_json["output_data_as_string"])
     except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to decode response as valid json: {e}, {resp}") from None
+        raise ValueError(f"Failed to decode response as valid json: {e}, {as_json}") from None
     except KeyError as e:
         raise ValueError(f"Failed to decode response {e}") from e
 
 
+def query_tx_success(tx_hash: str) -> Dict:
+    """ query_data_success for transactions with several messages, whose outputs can't be told apart. Returns the
+    transaction if it was executed (all of its messages, as transactions are atomic), or empty dict if it isn't
+    on-chain yet
+
+    :raises ValueError: if the transaction failed
+    """
+    try:
+        tx = json.loads(query_tx(tx_hash))
+    except RuntimeError:
+        return {}
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Failed to decode response as valid json: {e}") from None
+    if int(tx.get("code") or 0):
+        raise ValueError(f"Failed to execute transaction: {tx.get('raw_log')}")
+    return tx
+
+
 def get_uscrt_balance(address: str) -> int:
     info = account_info(address)
     amount = 0
@@ -111,7 +202,7 @@ def run_secret_cli(cmd: List[str], log: bool = True) -> str:
     """
     try:
         logger.debug(f'Running command: {cmd}')
-        p = subprocess.run(cmd, stdout=PIPE, stderr=PIPE, check=True)
+        p = executor.run(cmd)
     except subprocess.CalledProcessError as e:
         if log:
             logger.error(f'Failed: stderr: {e.stderr.decode()}, stdout: {e.stdout.decode()}')
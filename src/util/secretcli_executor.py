@@ -0,0 +1,173 @@
+import heapq
+import itertools
+import subprocess
+from logging import Logger
+from subprocess import PIPE, CalledProcessError, CompletedProcess
+from threading import Event, Lock
+from time import monotonic
+from typing import Dict, List, Optional
+
+DEFAULT_MAX_PROCESSES = 8
+DEFAULT_TIMEOUT = 60
+STATS_LOG_INTERVAL = 600
+
+# command class -> (priority (lower goes first), max number of processes of the class)
+COMMAND_CLASSES = {
+    'broadcast': (0, 2),
+    'sign': (1, 4),
+    'tx': (2, 4),
+    'query': (3, 8),
+    'other': (2, 1),
+}
+
+# seconds
+HISTOGRAM_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+
+
+def command_class(cmd: List[str]) -> str:
+    """ 'secretcli tx broadcast ..' -> broadcast, 'secretcli tx sign ..' -> sign, 'secretcli query ..' -> query.. """
+    if len(cmd) > 2 and cmd[1] == 'tx':
+        if cmd[2] == 'broadcast':
+            return 'broadcast'
+        if cmd[2] in ('sign', 'multisign'):
+            return 'sign'
+        return 'tx'
+    if len(cmd) > 1 and cmd[1] in ('q', 'query'):
+        return 'query'
+    return 'other'
+
+
+class SecretCliTimeout(CalledProcessError):
+    """ A secretcli process which was killed after running for too long. Handled like any failed command """
+
+    def __init__(self, cmd, timeout: float):
+        super().__init__(-9, cmd, output=b'', stderr=f'timed out after {timeout} seconds'.encode())
+
+
+class Histogram:
+    """ Counts of observed values by (cumulative) bucket, Prometheus style """
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q: float) -> float:
+        """ Upper bound of the bucket holding the q-quantile """
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= q * self.count:
+                return bound
+        return self.buckets[-1]
+
+    def __repr__(self):
+        avg = self.sum / self.count if self.count else 0
+        return f'count={self.count} avg={avg:.3f}s p50<={self.quantile(0.5)}s p99<={self.quantile(0.99)}s'
+
+
+class _Request:
+    def __init__(self, cls: str, seq: int):
+        self.cls = cls
+        self.priority = COMMAND_CLASSES[cls][0]
+        self.seq = seq
+        self.admitted = Event()
+
+    def __lt__(self, other: '_Request'):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class SecretCliExecutor:
+    """
+    Runs secretcli commands, at most @max_processes at a time (and at most the limit of its class for each command
+    class, see COMMAND_CLASSES). Waiting commands start by priority - broadcasts first, queries last - then in order
+
+    Processes running longer than @timeout are killed. Time spent waiting for a slot and running is kept per class in
+    histograms (see stats), which are logged every STATS_LOG_INTERVAL seconds
+    """
+
+    def __init__(self, logger: Logger, max_processes: int = DEFAULT_MAX_PROCESSES, timeout: float = DEFAULT_TIMEOUT):
+        self.logger = logger
+        self.max_processes = max_processes
+        self.timeout = timeout
+
+        self.lock = Lock()
+        self.waiting: List[_Request] = []
+        self.running: Dict[str, int] = {cls: 0 for cls in COMMAND_CLASSES}
+        self.seq = itertools.count()
+
+        self.queue_wait: Dict[str, Histogram] = {cls: Histogram() for cls in COMMAND_CLASSES}
+        self.execution_time: Dict[str, Histogram] = {cls: Histogram() for cls in COMMAND_CLASSES}
+        self.last_stats_log = monotonic()
+
+    def run(self, cmd: List[str], input: Optional[bytes] = None) -> CompletedProcess:  # pylint: disable=redefined-builtin
+        """
+        Same as subprocess.run(cmd, stdout=PIPE, stderr=PIPE, check=True)
+
+        :raises CalledProcessError: if the command failed (SecretCliTimeout if it timed out)
+        """
+        cls = command_class(cmd)
+        enqueued = monotonic()
+        self._acquire(cls)
+        started = monotonic()
+        try:
+            return subprocess.run(cmd, input=input, stdout=PIPE, stderr=PIPE, check=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            raise SecretCliTimeout(cmd, self.timeout) from None
+        finally:
+            self._release(cls, started - enqueued, monotonic() - started)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.waiting)
+
+    def stats(self) -> Dict[str, Dict[str, Histogram]]:
+        """ {command class: {'queue_wait': histogram, 'execution_time': histogram}} """
+        with self.lock:
+            return {cls: {'queue_wait': self.queue_wait[cls], 'execution_time': self.execution_time[cls]}
+                    for cls in COMMAND_CLASSES}
+
+    def _acquire(self, cls: str):
+        request = _Request(cls, next(self.seq))
+        with self.lock:
+            heapq.heappush(self.waiting, request)
+            self._admit()
+        request.admitted.wait()
+
+    def _release(self, cls: str, queue_wait: float, execution_time: float):
+        with self.lock:
+            self.running[cls] -= 1
+            self.queue_wait[cls].observe(queue_wait)
+            self.execution_time[cls].observe(execution_time)
+            self._admit()
+
+            log_stats = monotonic() - self.last_stats_log > STATS_LOG_INTERVAL
+            if log_stats:
+                self.last_stats_log = monotonic()
+        if log_stats:
+            self._log_stats()
+
+    def _admit(self):
+        """ Starts waiting requests, best priority first, while there are free slots. Called with the lock held """
+        blocked = []
+        while self.waiting and sum(self.running.values()) < self.max_processes:
+            request = heapq.heappop(self.waiting)
+            if self.running[request.cls] < COMMAND_CLASSES[request.cls][1]:
+                self.running[request.cls] += 1
+                request.admitted.set()
+            else:
+                blocked.append(request)
+        for request in blocked:
+            heapq.heappush(self.waiting, request)
+
+    def _log_stats(self):
+        for cls, histograms in self.stats().items():
+            if histograms['execution_time'].count:
+                self.logger.info(f'secretcli {cls}: queue wait {histograms["queue_wait"]}, '
+                                 f'execution {histograms["execution_time"]}')
@@ -1,41 +1,45 @@
 import json
 import os
-from threading import Lock
 from typing import List, Tuple, Optional, Generator
 
-from web3 import Web3, HTTPProvider
+from web3 import Web3
 from web3.contract import Contract as Web3Contract
 from web3.datastructures import AttributeDict
 from web3.logs import DISCARD
-from web3.types import BlockData
 
 from src.util.common import project_base_path
 from src.util.config import config
+from src.util.eth.log_scanner import LogScanner
+from src.util.eth.providers import SerializedWebsocketProvider, ThreadLocalHTTPProvider
+from src.util.eth.rpc_cache import FinalityCache
+from src.util.eth.rpc_pool import PooledHTTPProvider
+from src.util.eth.singleflight import SingleFlight
 
 
 def web3_provider(address_: str) -> Web3:
+    endpoints = [endpoint.strip() for endpoint in address_.split(',') if endpoint.strip()]
+    if len(endpoints) > 1:  # pool of HTTP nodes
+        if not all(endpoint.startswith('http') for endpoint in endpoints):
+            raise ValueError(f"Only HTTP ethereum nodes can be pooled: {address_}")
+        return Web3(PooledHTTPProvider(endpoints))
     if address_.startswith('http'):  # HTTP
-        return Web3(Web3.HTTPProvider(address_))
+        return Web3(ThreadLocalHTTPProvider(address_))
     if address_.startswith('ws'):  # WebSocket
-        return Web3(Web3.WebsocketProvider(address_))
+        return Web3(SerializedWebsocketProvider(address_))
     return Web3(Web3.IPCProvider(address_))
 
 
 w3: Web3 = web3_provider(config.eth_node)
-
-w3_lock = Lock()
-event_lock = Lock()
+# immutable chain data (chain id, confirmed blocks, receipts and calls) is fetched once per process
+rpc_cache = FinalityCache(config.eth_confirmations)
+w3.middleware_onion.inject(rpc_cache, name='rpc_cache', layer=0)
+# identical reads from different threads at the same time share one request (below the cache, so cache misses too)
+singleflight = SingleFlight()
+w3.middleware_onion.inject(singleflight, name='singleflight', layer=0)
 
 
 def get_block(block_identifier, full_transactions: bool = False):
-    with w3_lock:
-        res = w3.eth.getBlock(block_identifier, full_transactions)
-    return res
-
-
-def extract_tx_by_address(address, block: BlockData) -> list:
-    # Note: block attribute dict has to be generated with full_transactions=True flag
-    return [tx for tx in block.transactions if tx.to and address.lower() == tx.to.lower()]
+    return w3.eth.getBlock(block_identifier, full_transactions)
 
 
 def event_log(tx_hash: str, events: List[str], provider: Web3, contract: Web3Contract) -> \
@@ -69,44 +73,19 @@ def normalize_address(address: str):
 def contract_event_in_range(contract, event_name: str, from_block: int = 0,
                             to_block: Optional[int] = None) -> Generator:
     """
-    scans the blockchain, and yields blocks that has contract tx with the provided event
+    scans the blockchain, and yields the logs of the provided contract event
 
-    Note: Be cautions with the range provided, as the logic creates query for each block which could be a bottleneck.
+    Note: The range is queried with eth_getLogs in adaptive chunks (see LogScanner), so large ranges are fine
     :param from_block: starting block, defaults to 0
     :param to_block: end block, defaults to 'latest'
-    :param provider:
-    :param logger:
-    :param contract:
+    :param contract: EthereumContract
     :param event_name: name of the contract emit event you wish to be notified of
     """
     if to_block is None:
         to_block = w3.eth.blockNumber
 
-    with w3_lock:
-
-        if isinstance(w3.provider, HTTPProvider):
-            for block_num in range(from_block, to_block + 1):
-                block = w3.eth.getBlock(block_num, full_transactions=True)
-                contract_transactions = extract_tx_by_address(contract.address, block)
-
-                if not contract_transactions:
-                    continue
-                for tx in contract_transactions:
-                    _, log = event_log(tx_hash=tx.hash, events=[event_name], provider=w3, contract=contract.tracked_contract)
-                    if log is None:
-                        continue
-                    yield log
-        else:
-            event = getattr(contract.tracked_contract.events, event_name)
-            event_filter = event.createFilter(fromBlock=from_block, toBlock=to_block)
-
-            for tx in event_filter.get_new_entries():
-                _, log = event_log(tx_hash=tx.hash, events=[event_name], provider=w3, contract=contract.tracked_contract)
-
-                if log is None:
-                    continue
-
-                yield log
+    scanner = LogScanner(w3, contract.contract, [event_name], decoder=contract.decoder)
+    yield from scanner.scan(from_block, to_block)
 
 
 def estimate_gas_price():
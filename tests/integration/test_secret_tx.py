@@ -0,0 +1,31 @@
+import base64
+import json
+
+import pytest
+
+from src.contracts.secret.secret_contract import mint_json
+from src.util.config import Config
+from src.util.secret_encryption import NONCE_SIZE
+from src.util.secret_tx import DEFAULT_GAS, unsigned_execute_tx
+from src.util.secretcli import _generate_unsigned_tx, tx_encryption  # pylint: disable=protected-access
+
+CODE_HASH = 'AB' * 32
+
+
+def test_unsigned_tx_matches_secretcli(configuration: Config):
+    """ The tx we build in-process is the one `secretcli tx compute execute --generate-only` gives, byte for byte """
+    encryption = tx_encryption()
+    if encryption is None:
+        pytest.skip('the network io key comes from the REST server - set secret_rest_api')
+
+    mint = mint_json('1000', '0xabc', configuration.multisig_acc_addr, configuration.multisig_acc_addr)
+    recorded = json.loads(_generate_unsigned_tx(configuration.multisig_acc_addr, mint, configuration.chain_id,
+                                                configuration.enclave_key, CODE_HASH,
+                                                configuration.multisig_acc_addr))
+
+    # same nonce as secretcli - it's random
+    nonce = base64.b64decode(recorded['value']['msg'][0]['value']['msg'])[:NONCE_SIZE]
+    ours = unsigned_execute_tx(configuration.multisig_acc_addr, configuration.multisig_acc_addr,
+                               encryption.encrypt(CODE_HASH, json.dumps(mint), nonce), DEFAULT_GAS)
+
+    assert json.loads(ours) == recorded
@@ -0,0 +1,40 @@
+from collections import namedtuple
+
+from src.contracts.ethereum.block_window import BlockHashWindow
+
+Block = namedtuple('Block', ['hash', 'parentHash'])
+
+
+class FakeChain:
+    def __init__(self, length: int):
+        self.hashes = [f'a{i}' for i in range(length)]
+
+    def fork(self, number: int, tag: str, length: int):
+        self.hashes = self.hashes[:number] + [f'{tag}{i}' for i in range(number, length)]
+
+    def get_block(self, number: int) -> Block:
+        parent = self.hashes[number - 1] if number else ''
+        return Block(self.hashes[number], parent)
+
+
+def test_block_window_reorg():
+    chain = FakeChain(20)
+    window = BlockHashWindow(chain.get_block, size=10)
+
+    assert window.update(19) is None
+    assert window.is_canonical(15, 'a15')
+
+    # replace blocks 16 and up, and extend the chain
+    chain.fork(16, 'b', 23)
+    assert window.update(22) == 16
+    assert not window.is_canonical(17, 'a17')
+    assert window.is_canonical(17, 'b17')
+    assert window.is_canonical(15, 'a15')
+
+    # same height reorg of the tip
+    chain.fork(22, 'c', 23)
+    assert window.update(22) == 22
+    assert window.update(22) is None
+
+    # blocks outside the window are trusted
+    assert window.is_canonical(1, 'whatever')
@@ -0,0 +1,84 @@
+import logging
+from threading import Event
+from time import sleep, perf_counter
+
+from src.contracts.ethereum.callback_dispatcher import CallbackDispatcher
+
+logger = logging.getLogger('test')
+
+
+def test_dispatcher_order_and_barrier():
+    dispatcher = CallbackDispatcher(logger, workers=4, queue_size=10)
+    results = {'a': [], 'b': []}
+    done = Event()
+
+    def handle_a(event):
+        results['a'].append(event)
+
+    def handle_b(event):
+        sleep(0.001)
+        results['b'].append(event)
+
+    for i in range(100):
+        dispatcher.submit(handle_a, i)
+        dispatcher.submit(handle_b, i)
+    dispatcher.after_pending(done.set)
+
+    assert done.wait(5)
+    assert results['a'] == list(range(100))
+    assert results['b'] == list(range(100))
+    assert dispatcher.stats()[handle_b.__qualname__].calls == 100
+    dispatcher.stop()
+
+
+def test_slow_callback_doesnt_block_others():
+    dispatcher = CallbackDispatcher(logger, workers=2, queue_size=100)
+    release = Event()
+    slow_started = Event()
+    fast_done = Event()
+
+    def slow(_):
+        slow_started.set()
+        release.wait(5)
+
+    def fast(_):
+        fast_done.set()
+
+    # find a key which isn't handled by the slow callback's worker
+    key = next(k for k in range(10) if hash(k) % 2 != hash(slow) % 2)
+    start = perf_counter()
+    dispatcher.submit(slow, None)
+    dispatcher.submit(fast, None, key=key)
+
+    assert fast_done.wait(1)
+    assert perf_counter() - start < 1
+    assert slow_started.wait(1)
+    assert dispatcher.queue_depth == 0
+    release.set()
+    dispatcher.stop()
+
+
+def test_failing_callback_is_kept():
+    dispatcher = CallbackDispatcher(logger, workers=1)
+    done, retried = Event(), Event()
+    attempts = []
+
+    def fail(event):
+        attempts.append(event)
+        if len(attempts) == 1:
+            raise ValueError('boom')
+
+    dispatcher.submit(fail, 'event')
+    dispatcher.after_pending(done.set)
+    assert done.wait(5)
+    assert dispatcher.stats()[fail.__qualname__].errors == 1
+    assert dispatcher.failed_events() == ['event']
+
+    # still failed while it's retried, and done once it succeeds
+    assert dispatcher.retry_failed() == 1
+    assert dispatcher.retry_failed() == 0
+    dispatcher.after_pending(retried.set)
+    assert retried.wait(5)
+    assert attempts == ['event', 'event']
+    assert dispatcher.failed_events() == []
+    dispatcher.stop()
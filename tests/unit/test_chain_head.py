@@ -0,0 +1,124 @@
+from collections import namedtuple
+from threading import Event
+from types import SimpleNamespace
+
+from web3.exceptions import BlockNotFound
+
+from src.contracts.ethereum import chain_head as chain_head_module
+from src.contracts.ethereum.chain_head import ChainHead
+
+Block = namedtuple('Block', ['hash', 'parentHash'])
+
+TOPIC_A = '0x' + 'aa' * 32
+TOPIC_B = '0x' + 'bb' * 32
+
+
+class FakeNode:
+    """ A chain with a log per block for each of the contracts, which can be forked """
+    def __init__(self, length: int, contracts):
+        self.contracts = contracts
+        self.hashes = [f'a{i}' for i in range(length)]
+        self.get_logs_calls = 0
+        self.missing_blocks = 0
+
+    @property
+    def blockNumber(self):  # pylint: disable=invalid-name
+        return len(self.hashes) - 1
+
+    def fork(self, number: int, tag: str, length: int):
+        self.hashes = self.hashes[:number] + [f'{tag}{i}' for i in range(number, length)]
+
+    def get_block(self, number: int) -> Block:
+        if self.missing_blocks:
+            # a lagging node behind the pool
+            self.missing_blocks -= 1
+            raise BlockNotFound(f'Block with id: {number} not found.')
+        return Block(self.hashes[number], self.hashes[number - 1] if number else '')
+
+    def getLogs(self, log_filter):  # pylint: disable=invalid-name
+        self.get_logs_calls += 1
+        return [{'address': address, 'topics': [bytes.fromhex(topic[2:])], 'blockNumber': number,
+                 'blockHash': self.hashes[number]}
+                for number in range(log_filter['fromBlock'], log_filter['toBlock'] + 1)
+                for address, topic in self.contracts
+                if address in log_filter['address'] and topic in log_filter['topics'][0]]
+
+
+class Subscriber:
+    def __init__(self, address: str, topic: str):
+        self.address = address
+        self.topics = [topic]
+        self.updates = []
+
+    def log_filter(self):
+        return self.address, self.topics
+
+    def on_new_head(self, head, fork, logs):
+        self.updates.append((head, fork, [(log['blockNumber'], log['blockHash']) for log in logs]))
+
+
+def _chain_head(monkeypatch, node: FakeNode) -> ChainHead:
+    monkeypatch.setattr(chain_head_module, 'get_block', node.get_block)
+    monkeypatch.setattr(chain_head_module, 'w3', SimpleNamespace(eth=node))
+    config = SimpleNamespace(db_name='', log_level='info', eth_node='http://localhost', eth_confirmations=2,
+                             sleep_interval=0.01)
+    return ChainHead(config)
+
+
+def test_fan_out(monkeypatch):
+    node = FakeNode(10, [('0xA', TOPIC_A), ('0xB', TOPIC_B)])
+    chain_head = _chain_head(monkeypatch, node)
+    first, second = Subscriber('0xA', TOPIC_A), Subscriber('0xB', TOPIC_B)
+
+    assert chain_head.subscribe(first) == 9
+    assert chain_head.subscribe(second) == 9
+
+    node.fork(10, 'a', 13)
+    chain_head._tick()  # pylint: disable=protected-access
+
+    # a single eth_getLogs for everyone, each subscriber gets the logs of its own contract
+    assert node.get_logs_calls == 1
+    assert first.updates == [(12, None, [(10, 'a10'), (11, 'a11'), (12, 'a12')])]
+    assert second.updates == first.updates
+
+    # a late subscriber gets the blocks after the ones already delivered, without duplicates for the others
+    late = Subscriber('0xA', TOPIC_A)
+    assert chain_head.subscribe(late) == 12
+    node.fork(13, 'a', 14)
+    chain_head._tick()  # pylint: disable=protected-access
+    assert first.updates[-1] == late.updates[-1] == (13, None, [(13, 'a13')])
+
+
+def test_reorg_redelivery(monkeypatch):
+    node = FakeNode(10, [('0xA', TOPIC_A)])
+    chain_head = _chain_head(monkeypatch, node)
+    subscriber = Subscriber('0xA', TOPIC_A)
+    chain_head.subscribe(subscriber)
+    chain_head._tick()  # pylint: disable=protected-access
+    assert chain_head.is_canonical(8, 'a8')
+
+    # blocks 8 and up are replaced - their logs are delivered again, from the new blocks
+    node.fork(8, 'b', 12)
+    chain_head._tick()  # pylint: disable=protected-access
+    assert subscriber.updates[-1] == (11, 8, [(8, 'b8'), (9, 'b9'), (10, 'b10'), (11, 'b11')])
+    assert not chain_head.is_canonical(8, 'a8')
+    assert chain_head.is_canonical(8, 'b8')
+
+
+def test_survives_errors(monkeypatch):
+    node = FakeNode(10, [('0xA', TOPIC_A)])
+    chain_head = _chain_head(monkeypatch, node)
+    delivered = Event()
+    subscriber = Subscriber('0xA', TOPIC_A)
+    subscriber.on_new_head = lambda head, fork, logs: delivered.set() if head == 12 else None
+    chain_head.subscribe(subscriber)
+
+    node.missing_blocks = 3
+    node.fork(10, 'a', 13)
+    chain_head.start()
+    try:
+        assert delivered.wait(5)
+        assert chain_head.is_alive()
+    finally:
+        chain_head.stop()
+        chain_head.join(5)
@@ -0,0 +1,85 @@
+import json
+import os
+from time import perf_counter
+
+from eth_abi import encode_abi
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.logs import DISCARD
+
+from src.util.common import project_base_path
+from src.util.eth.event_decoder import EventDecoder
+
+ADDRESS = '0x' + '11' * 20
+TOKEN = '0x' + '22' * 20
+LOGS_PER_RECEIPT = 200
+
+
+def _abi():
+    path = os.path.join(project_base_path(), 'src', 'contracts', 'ethereum', 'abi', 'MultiSigSwapWallet.json')
+    with open(path) as f:
+        return json.load(f)['abi']
+
+
+def _log(event_abi, types, values, log_index: int) -> dict:
+    return {
+        'address': Web3.toChecksumAddress(ADDRESS),
+        'topics': [HexBytes(event_abi_to_log_topic(event_abi))],
+        'data': HexBytes(encode_abi(types, values)).hex(),
+        'logIndex': log_index,
+        'transactionIndex': 0,
+        'transactionHash': HexBytes(b'\x01' * 32),
+        'blockHash': HexBytes(b'\x02' * 32),
+        'blockNumber': 100,
+    }
+
+
+def _receipt(abi) -> dict:
+    """A receipt with a mix of Swap and SwapToken logs (and a log of another contract's event)"""
+    events = {item['name']: item for item in abi if item['type'] == 'event'}
+    logs = []
+    for i in range(LOGS_PER_RECEIPT):
+        if i % 2:
+            logs.append(_log(events['Swap'], ['uint256', 'bytes'], [i, b'secret1recipient'], i))
+        else:
+            logs.append(_log(events['SwapToken'], ['address', 'bytes', 'uint256', 'address'],
+                             [ADDRESS, b'secret1recipient', i, TOKEN], i))
+    logs.append({**logs[0], 'topics': [HexBytes(b'\x03' * 32)], 'logIndex': LOGS_PER_RECEIPT})
+    return {'logs': logs}
+
+
+def test_event_decoder_matches_web3():
+    abi = _abi()
+    receipt = _receipt(abi)
+    contract = Web3().eth.contract(address=Web3.toChecksumAddress(ADDRESS), abi=abi)
+    decoder = EventDecoder(abi)
+
+    for event_name in ['Swap', 'SwapToken']:
+        expected = getattr(contract.events, event_name)().processReceipt(receipt, DISCARD)
+        assert list(decoder.decode_receipt(receipt, [event_name])) == list(expected)
+
+    assert decoder.decode(receipt['logs'][-1]) is None
+
+
+def test_event_decoder_benchmark():
+    abi = _abi()
+    receipt = _receipt(abi)
+    contract = Web3().eth.contract(address=Web3.toChecksumAddress(ADDRESS), abi=abi)
+    rounds = 20
+
+    start = perf_counter()
+    for _ in range(rounds):
+        for event_name in ['Swap', 'SwapToken']:
+            getattr(contract.events, event_name)().processReceipt(receipt, DISCARD)
+    web3_time = perf_counter() - start
+
+    start = perf_counter()
+    decoder = EventDecoder(abi)
+    for _ in range(rounds):
+        decoder.decode_receipt(receipt, ['Swap', 'SwapToken'])
+    decoder_time = perf_counter() - start
+
+    print(f"\n{rounds} receipts of {LOGS_PER_RECEIPT} logs: processReceipt {web3_time:.3f}s, "
+          f"EventDecoder {decoder_time:.3f}s ({web3_time / decoder_time:.1f}x)")
+    assert decoder_time < web3_time
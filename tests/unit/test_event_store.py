@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+from types import SimpleNamespace
+
+import pytest
+from hexbytes import HexBytes
+from mongoengine import NotUniqueError
+from web3 import Web3
+from web3.datastructures import AttributeDict
+
+from src.contracts.ethereum import event_store as event_store_module
+from src.contracts.ethereum.event_store import EventStore
+from src.contracts.ethereum.multisig_wallet import MultisigWallet
+from src.signer.secret20.signer import Secret20Signer
+from src.util.common import project_base_path
+
+ADDRESS = '0x' + '11' * 20
+SENDER = Web3.toChecksumAddress('0x' + '22' * 20)
+TOKEN = Web3.toChecksumAddress('0x' + '33' * 20)
+TX_HASH = '0x' + 'ab' * 32
+
+
+class EthereumEvents:
+    """ Stands in for the EthereumEvent collection """
+    def __init__(self):
+        self.docs = []
+
+    def __call__(self, **fields):
+        docs = self.docs
+
+        class _Event(SimpleNamespace):
+            def save(self):
+                if any((doc.observer, doc.tx_hash, doc.log_index) == (self.observer, self.tx_hash, self.log_index)
+                       for doc in docs):
+                    raise NotUniqueError('duplicate key')
+                docs.append(self)
+
+        return _Event(**fields)
+
+    def objects(self, observer, tx_hash, event__in):
+        found = sorted((doc for doc in self.docs
+                        if doc.observer == observer and doc.tx_hash == tx_hash and doc.event in event__in),
+                       key=lambda doc: doc.log_index)
+        return SimpleNamespace(order_by=lambda _: SimpleNamespace(first=lambda: found[0] if found else None))
+
+
+@pytest.fixture(name='collection')
+def fixture_collection(monkeypatch):
+    collection = EthereumEvents()
+    monkeypatch.setattr(event_store_module, 'EthereumEvent', collection)
+    return collection
+
+
+def _wallet() -> MultisigWallet:
+    """ The wallet contract, without a node """
+    wallet = MultisigWallet.__new__(MultisigWallet)
+    wallet.abi = wallet.load_abi(os.path.join(project_base_path(), 'src', 'contracts', 'ethereum', 'abi',
+                                              'MultiSigSwapWallet.json'))
+    wallet.contract = Web3().eth.contract(address=Web3.toChecksumAddress(ADDRESS), abi=wallet.abi)
+    wallet._address = ADDRESS  # pylint: disable=protected-access
+    return wallet
+
+
+def _swap_token(log_index: int = 1) -> AttributeDict:
+    """ A SwapToken event, as the contract's decoder gives it """
+    return AttributeDict({
+        'args': AttributeDict({'sender': SENDER, 'recipient': b'secret1recipient', 'amount': 2 ** 200,
+                               'tokenAddress': TOKEN}),
+        'event': 'SwapToken',
+        'logIndex': log_index,
+        'transactionIndex': 3,
+        'transactionHash': HexBytes(TX_HASH),
+        'address': Web3.toChecksumAddress(ADDRESS),
+        'blockHash': HexBytes('0x' + 'cd' * 32),
+        'blockNumber': 1234,
+    })
+
+
+def test_round_trip(collection):
+    store = EventStore('signer', _wallet(), MultisigWallet.tracked_event())
+    event = _swap_token()
+
+    store.add(event)
+    store.add(event)
+    assert len(collection.docs) == 1
+
+    # the stored document is plain json - no bytes, and uint256 kept as a string
+    doc = collection.docs[0]
+    json.dumps(doc.args)
+    assert doc.args['amount'] == str(2 ** 200)
+    assert doc.args['recipient'] == HexBytes(b'secret1recipient').hex()
+
+    assert store.get(TX_HASH) == event
+    assert store.get(TX_HASH.upper().replace('0X', '0x')) == event
+    assert store.get('0x' + 'ef' * 32) is None
+
+    # another party's store doesn't see our events
+    assert EventStore('other', _wallet(), MultisigWallet.tracked_event()).get(TX_HASH) is None
+
+
+@pytest.mark.usefixtures('collection')
+def test_first_event_of_tx():
+    store = EventStore('signer', _wallet(), MultisigWallet.tracked_event())
+    store.add(_swap_token(log_index=7))
+    store.add(_swap_token(log_index=2))
+    assert store.get(TX_HASH).logIndex == 2
+
+
+@pytest.mark.usefixtures('collection')
+def test_signer_reads_stored_events():
+    wallet = _wallet()
+    receipts = []
+    wallet.get_events_by_tx = lambda tx_hash: receipts.append(tx_hash)
+
+    signer = Secret20Signer.__new__(Secret20Signer)
+    signer.contract = wallet
+    signer.logger = logging.getLogger('signer')
+    signer.event_store = EventStore('signer', wallet, MultisigWallet.tracked_event())
+    signer.event_store.add(_swap_token())
+
+    log = signer._swap_event(TX_HASH)  # pylint: disable=protected-access
+    assert receipts == []
+    assert wallet.extract_amount(log) == 2 ** 200
+    assert wallet.extract_addr(log) == 'secret1recipient'
+    assert wallet.parse_swap_event(log) == (1234, TX_HASH, 'secret1recipient', TOKEN)
+
+    # events that aren't in the store yet are read from the node
+    signer._swap_event('0x' + 'ef' * 32)  # pylint: disable=protected-access
+    assert receipts == ['0x' + 'ef' * 32]
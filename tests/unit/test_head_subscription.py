@@ -0,0 +1,76 @@
+import asyncio
+import json
+from threading import Event, Thread
+from time import perf_counter, sleep
+
+import websockets
+
+from src.util.eth.head_subscription import NewHeadsSubscription
+
+SLEEP_INTERVAL = 2.0
+BLOCKS = 5
+
+
+class StandInNode(Thread):
+    """Minimal websocket node which only knows how to push newHeads notifications"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.loop = asyncio.new_event_loop()
+        self.clients = []
+        # any free port, known once the server is listening
+        self.port = None
+        self.listening = Event()
+
+    async def _handler(self, ws, _path=None):
+        request = json.loads(await ws.recv())
+        await ws.send(json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': '0x1'}))
+        self.clients.append(ws)
+        await ws.wait_closed()
+
+    async def _push(self, number: int):
+        message = json.dumps({'jsonrpc': '2.0', 'method': 'eth_subscription',
+                              'params': {'subscription': '0x1', 'result': {'number': hex(number)}}})
+        for ws in self.clients:
+            await ws.send(message)
+
+    def push(self, number: int):
+        asyncio.run_coroutine_threadsafe(self._push(number), self.loop).result()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(websockets.serve(self._handler, 'localhost', 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self.listening.set()
+        self.loop.run_forever()
+
+
+def test_new_heads_latency():
+    node = StandInNode()
+    node.start()
+    assert node.listening.wait(5)
+
+    subscription = NewHeadsSubscription(f'ws://localhost:{node.port}')
+    subscription.start()
+    while not node.clients:
+        sleep(0.05)
+
+    latencies = []
+    head = None
+    for number in range(1, BLOCKS + 1):
+        result = []
+        waiter = Thread(target=lambda: result.append(subscription.wait_for_head(head, SLEEP_INTERVAL)))
+        waiter.start()
+        sleep(0.1)
+
+        start = perf_counter()
+        node.push(number)
+        waiter.join()
+        latencies.append(perf_counter() - start)
+
+        head = result[0]
+        assert head == number
+
+    print(f"\nmax wake-up latency {max(latencies) * 1000:.1f}ms, polling latency up to {SLEEP_INTERVAL * 1000:.0f}ms")
+    assert subscription.connected
+    assert max(latencies) < SLEEP_INTERVAL / 10
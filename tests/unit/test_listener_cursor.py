@@ -0,0 +1,172 @@
+from threading import Event
+from time import sleep
+from types import SimpleNamespace
+
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+from src.contracts.ethereum import event_listener as event_listener_module
+from src.contracts.ethereum.event_listener import EthEventListener
+
+CONFIRMATIONS = 2
+
+
+class Tracker:
+    """ Stands in for the SwapTrackerObject collection """
+    def __init__(self, saved):
+        self.saved = dict(saved)
+        self.updates = []
+
+    def get_or_create(self, src):
+        return SimpleNamespace(nonce=self.saved.setdefault(src, -1))
+
+    def update_last_processed(self, src, block):
+        self.saved[src] = block
+        self.updates.append((src, block))
+
+
+class ChainHead:
+    def __init__(self, head: int):
+        self.head = head
+
+    def subscribe(self, _):
+        return self.head
+
+    def unsubscribe(self, _):
+        pass
+
+    @staticmethod
+    def is_canonical(*_):
+        return True
+
+    @staticmethod
+    def is_alive():
+        return True
+
+
+class Decoder:
+    @staticmethod
+    def topics(events):
+        return events
+
+    @staticmethod
+    def decode(log):
+        return log
+
+
+def _event(block: int):
+    return AttributeDict({'event': 'Swap', 'blockNumber': block, 'logIndex': 0, 'transactionHash': HexBytes(block),
+                          'blockHash': HexBytes(0)})
+
+
+def _listener(monkeypatch, tracker: Tracker, history, head: int = 100) -> EthEventListener:
+    scans = []
+
+    class _Scanner:
+        def __init__(self, *_, **__):
+            pass
+
+        @staticmethod
+        def scan(from_block, to_block):
+            scans.append((from_block, to_block))
+            return [event for event in history if from_block <= event.blockNumber <= to_block]
+
+    monkeypatch.setattr(event_listener_module, 'SwapTrackerObject', tracker)
+    monkeypatch.setattr(event_listener_module, 'ChainHead', SimpleNamespace(instance=lambda _: ChainHead(head)))
+    monkeypatch.setattr(event_listener_module, 'LogScanner', _Scanner)
+
+    config = SimpleNamespace(db_name='', log_level='info', logger_name='listener', eth_confirmations=CONFIRMATIONS,
+                             eth_callback_workers=2, eth_callback_queue_size=10, sleep_interval=0.01)
+    contract = SimpleNamespace(contract=SimpleNamespace(address='0xA', abi=[]), decoder=Decoder())
+    listener = EthEventListener(contract, config)
+    listener.scans = scans
+    return listener
+
+
+def test_resume_from_cursor(monkeypatch):
+    tracker = Tracker({'signer': 40})
+    listener = _listener(monkeypatch, tracker, [_event(10), _event(40), _event(60)])
+
+    listener.register(lambda _: None, ['Swap'], from_block=0, cursor='signer')
+    listener.register(lambda _: None, ['Withdraw'], from_block=0, cursor='signer')
+
+    # the saved block is scanned again (callbacks are idempotent), nothing before it
+    assert listener.scans[0] == (40, 100)
+    assert [event.blockNumber for _, event in listener.confirmation_handler(100)] == [40, 60]
+    # the same cursor registered twice is saved once
+    assert listener.cursors == ['signer']
+
+
+def test_new_cursor_starts_from_block(monkeypatch):
+    tracker = Tracker({})
+    listener = _listener(monkeypatch, tracker, [_event(10), _event(40)])
+
+    listener.register(lambda _: None, ['Swap'], from_block=20, cursor='signer')
+    assert listener.scans == [(20, 100)]
+
+
+def test_cursor_saved_after_dispatch(monkeypatch):
+    tracker = Tracker({})
+    listener = _listener(monkeypatch, tracker, [])
+    release, handled = Event(), []
+
+    def _slow(event):
+        release.wait(5)
+        handled.append(event.blockNumber)
+
+    listener.register(_slow, ['Swap'], cursor='signer')
+    listener.register(lambda _: None, ['Withdraw'], cursor='signer')
+    listener.start()
+    try:
+        listener.on_new_head(103, None, [_event(101)])
+        listener.on_new_head(104, None, [])
+        # the callback of block 101 is still running - the cursor can't move past it yet
+        assert not release.wait(0.2)
+        assert tracker.updates == []
+
+        release.set()
+        for _ in range(500):
+            if tracker.saved.get('signer') == 104 - CONFIRMATIONS:
+                break
+            sleep(0.01)
+        assert handled == [101]
+        assert tracker.updates == [('signer', 101), ('signer', 102)]
+    finally:
+        listener.stop()
+
+
+def test_cursor_held_at_failed_callback(monkeypatch):
+    tracker = Tracker({})
+    listener = _listener(monkeypatch, tracker, [])
+    attempts = []
+
+    def _flaky(event):
+        attempts.append(event.blockNumber)
+        if len(attempts) == 1:
+            raise ValueError('node unavailable')
+
+    listener.register(_flaky, ['Swap'], cursor='signer')
+    listener.start()
+    try:
+        listener.on_new_head(105, None, [_event(101)])
+        for _ in range(500):
+            if tracker.updates:
+                break
+            sleep(0.01)
+        # blocks up to 103 are confirmed, but a restart has to sign the event of block 101 again
+        assert tracker.updates[0] == ('signer', 101)
+
+        # retried, and the cursor moves on with the next block once it succeeded
+        for _ in range(500):
+            if len(attempts) == 2:
+                break
+            sleep(0.01)
+        listener.on_new_head(106, None, [])
+        for _ in range(500):
+            if tracker.saved.get('signer') == 106 - CONFIRMATIONS:
+                break
+            sleep(0.01)
+        assert attempts == [101, 101]
+        assert tracker.saved['signer'] == 104
+    finally:
+        listener.stop()
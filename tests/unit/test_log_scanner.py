@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.util.eth.log_scanner import LIMIT_EXCEEDED_CODE, LogScanner
+
+
+class FakeNode:
+    """ eth_getLogs of a node that refuses queries wider than @max_range blocks, with @logs_per_block[n] logs in n """
+    def __init__(self, logs_per_block, max_range: int = 10 ** 9):
+        self.logs_per_block = logs_per_block
+        self.max_range = max_range
+        self.queries = []
+
+    def getLogs(self, log_filter):  # pylint: disable=invalid-name
+        from_block, to_block = log_filter['fromBlock'], log_filter['toBlock']
+        self.queries.append((from_block, to_block))
+        if to_block - from_block + 1 > self.max_range:
+            raise ValueError({'code': LIMIT_EXCEEDED_CODE, 'message': 'query returned more than 10000 results'})
+        return [{'blockNumber': number, 'logIndex': index}
+                for number in range(from_block, to_block + 1) for index in range(self.logs_per_block.get(number, 0))]
+
+
+class Decoder:
+    @staticmethod
+    def topics(events):
+        return events
+
+    @staticmethod
+    def decode(log):
+        return log
+
+
+def _scanner(node: FakeNode, chunk_size: int = LogScanner.START_CHUNK) -> LogScanner:
+    return LogScanner(SimpleNamespace(eth=node), SimpleNamespace(address='0xA', abi=[]), ['Swap'],
+                      chunk_size=chunk_size, decoder=Decoder())
+
+
+def test_bounds_and_order():
+    node = FakeNode({0: 1, 5: 2, 99: 1, 100: 3, 250: 1, 300: 2})
+    scanner = _scanner(node, chunk_size=4)
+
+    logs = [(log['blockNumber'], log['logIndex']) for log in scanner.scan(5, 300)]
+
+    # both ends are included, nothing outside the range, in block (and log) order across chunks
+    assert logs == [(5, 0), (5, 1), (99, 0), (100, 0), (100, 1), (100, 2), (250, 0), (300, 0), (300, 1)]
+    assert node.queries[0][0] == 5 and node.queries[-1][1] == 300
+    assert all(prev[1] + 1 == query[0] for prev, query in zip(node.queries, node.queries[1:]))
+
+
+def test_shrinks_on_limit_exceeded():
+    node = FakeNode({}, max_range=30)
+    scanner = _scanner(node, chunk_size=100)
+
+    assert not list(scanner.scan(0, 99))
+    # 100 -> 50 -> 25 blocks, and only the refused queries were retried
+    assert node.queries[:3] == [(0, 99), (0, 49), (0, 24)]
+    assert scanner.blocks_scanned == 100
+
+
+def test_grows_while_sparse():
+    node = FakeNode({})
+    scanner = _scanner(node, chunk_size=1000)
+
+    list(scanner.scan(0, 100000))
+    sizes = [to_block - from_block + 1 for from_block, to_block in node.queries]
+    assert sizes[:5] == [1000, 2000, 4000, 8000, LogScanner.MAX_CHUNK]
+    assert max(sizes) == LogScanner.MAX_CHUNK
+
+    # and doesn't grow when the results are dense
+    busy = FakeNode({number: 1 for number in range(1000)})
+    scanner = _scanner(busy, chunk_size=200)
+    list(scanner.scan(0, 999))
+    assert all(to_block - from_block + 1 == 200 for from_block, to_block in busy.queries)
+
+
+def test_raises_at_min_chunk():
+    node = FakeNode({}, max_range=0)
+    scanner = _scanner(node, chunk_size=8)
+
+    with pytest.raises(ValueError):
+        list(scanner.scan(0, 10))
+    assert [to_block - from_block + 1 for from_block, to_block in node.queries] == [8, 4, 2, 1]
+
+
+def test_other_errors_not_retried():
+    node = FakeNode({})
+
+    def _get_logs(log_filter):
+        node.queries.append((log_filter['fromBlock'], log_filter['toBlock']))
+        raise ValueError({'code': -32000, 'message': 'header not found'})
+
+    node.getLogs = _get_logs
+    with pytest.raises(ValueError):
+        list(_scanner(node).scan(0, 10))
+    assert len(node.queries) == 1
@@ -0,0 +1,24 @@
+import json
+
+from src.contracts.secret.secret_contract import mint_json
+from src.util import secretcli
+
+
+def _unsigned_tx(secret_contract_addr, transaction_data, *_):
+    """ What `secretcli tx compute execute --generate-only` gives (with the message in plaintext) """
+    return json.dumps({"type": "cosmos-sdk/StdTx", "value": {
+        "msg": [{"type": "wasm/MsgExecuteContract",
+                 "value": {"contract": secret_contract_addr, "msg": json.dumps(transaction_data)}}],
+        "fee": {"amount": [{"denom": "uscrt", "amount": "50000"}], "gas": "200000"},
+        "signatures": None, "memo": ""}})
+
+
+def test_mint_batch(monkeypatch):
+    monkeypatch.setattr(secretcli, 'create_unsigned_tx', _unsigned_tx)
+    mints = [mint_json(str(i), f'0x{i}', 'secret1recipient', 'secret1token') for i in range(3)]
+
+    tx = json.loads(secretcli.create_unsigned_mint_tx('secret1swap', mints, 'chain', 'key', 'hash', 'secret1ms'))
+
+    assert [json.loads(msg['value']['msg']) for msg in tx['value']['msg']] == mints
+    assert tx['value']['fee'] == {"amount": [{"denom": "uscrt", "amount": "150000"}], "gas": "600000"}
+    assert tx['value']['signatures'] is None
@@ -0,0 +1,108 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import perf_counter
+
+import pytest
+from eth_abi import decode_abi, encode_abi
+from hexbytes import HexBytes
+from web3 import Web3
+
+from src.contracts.ethereum import ethr_contract
+from src.contracts.ethereum.multisig_wallet import MultisigWallet
+
+WALLET = Web3.toChecksumAddress('0x' + '11' * 20)
+MULTICALL = Web3.toChecksumAddress('0x' + '55' * 20)
+ACCOUNT = Web3.toChecksumAddress('0x' + '22' * 20)
+DEST = Web3.toChecksumAddress('0x' + '33' * 20)
+SUBMISSION_TYPES = ['address', 'uint256', 'bytes', 'bool', 'uint256', 'address', 'uint256']
+TRANSACTIONS = Web3.keccak(text='transactions(uint256)')[:4]
+CONFIRMATIONS = Web3.keccak(text='confirmations(uint256,address)')[:4]
+AGGREGATE = Web3.keccak(text='aggregate((address,bytes)[])')[:4]
+SUBMISSIONS = 1000
+
+
+def _submission(transaction_id: int) -> list:
+    return [DEST, transaction_id, b'', transaction_id % 2 == 0, transaction_id, DEST, 1]
+
+
+class StandInNode:
+    """Node with a multisig wallet (and a Multicall contract) with SUBMISSIONS submissions"""
+
+    def __init__(self):
+        self.http_requests = 0
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # pylint: disable=invalid-name
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                node.http_requests += 1
+                body = [node.answer(r) for r in payload] if isinstance(payload, list) else node.answer(payload)
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('localhost', 0), Handler)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def uri(self) -> str:
+        return f'http://localhost:{self.server.server_address[1]}'
+
+    @staticmethod
+    def call(data: bytes) -> bytes:
+        selector, args = data[:4], data[4:]
+        if selector == TRANSACTIONS:
+            (transaction_id,) = decode_abi(['uint256'], args)
+            return encode_abi(SUBMISSION_TYPES, _submission(transaction_id))
+        if selector == CONFIRMATIONS:
+            transaction_id, _ = decode_abi(['uint256', 'address'], args)
+            return encode_abi(['bool'], [transaction_id % 3 == 0])
+        if selector == AGGREGATE:
+            (calls,) = decode_abi(['(address,bytes)[]'], args)
+            return encode_abi(['uint256', 'bytes[]'], [1, [StandInNode.call(call_data) for _, call_data in calls]])
+        raise NotImplementedError(selector)
+
+    def answer(self, request: dict) -> dict:
+        if request['method'] == 'eth_chainId':
+            result = '0x1'
+        elif request['method'] == 'eth_call':
+            result = '0x' + self.call(HexBytes(request['params'][0]['data'])).hex()
+        else:
+            raise NotImplementedError(request['method'])
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': result}
+
+
+@pytest.mark.parametrize('multicall_address', [None, MULTICALL])
+def test_submissions_data(monkeypatch, multicall_address):
+    node = StandInNode()
+    w3 = Web3(Web3.HTTPProvider(node.uri))
+    monkeypatch.setattr(ethr_contract, 'w3', w3)
+    MultisigWallet.executed_submissions.entries.clear()
+    wallet = MultisigWallet(w3, WALLET, multicall_address=multicall_address)
+
+    start = perf_counter()
+    node.http_requests = 0
+    bulk = wallet.submissions_data(range(SUBMISSIONS), account=ACCOUNT)
+    elapsed = perf_counter() - start
+    print(f"\n{SUBMISSIONS} submissions with {'multicall' if multicall_address else 'batches'} in "
+          f"{node.http_requests} requests: {SUBMISSIONS / elapsed:.0f} submissions/sec")
+
+    assert node.http_requests == 2 * SUBMISSIONS // 200
+    for transaction_id in [0, 1, 3, 998]:
+        data = bulk[transaction_id]
+        assert data['confirmed'] == (transaction_id % 3 == 0)
+        del data['confirmed']
+        assert data == wallet.parse_submission(transaction_id, _submission(transaction_id))
+
+    # executed submissions are cached
+    node.http_requests = 0
+    assert wallet.submission_data(2) == wallet.parse_submission(2, _submission(2))
+    assert wallet.executed_submission(1) is None
+    assert node.http_requests == 0
@@ -0,0 +1,56 @@
+from time import perf_counter
+
+from src.contracts.ethereum.pending_events import PendingEvents
+
+BACKLOG_SIZES = [1000, 10000, 100000]
+EVENTS_PER_BLOCK = 10
+
+
+def _event(block: int, log_index: int = 0) -> dict:
+    return {'blockNumber': block, 'logIndex': log_index, 'transactionHash': f'{block}-{log_index}'.encode(),
+            'blockHash': str(block).encode()}
+
+
+def test_pending_events_order():
+    pending = PendingEvents()
+    for block, log_index in [(5, 1), (3, 0), (5, 0), (9, 0), (4, 2)]:
+        pending.push(f'{block}-{log_index}', _event(block, log_index))
+
+    assert [name for name, _ in pending.pop_confirmed(5)] == ['3-0', '4-2', '5-0', '5-1']
+    assert pending.pop_confirmed(8) == []
+    assert len(pending) == 1
+
+
+def _list_tick(pending: list, confirmed_block: int) -> list:
+    """The list based confirmation handler we used to have"""
+    res = []
+    for item in list(pending):
+        if item[1]['blockNumber'] <= confirmed_block:
+            pending.remove(item)
+            res.append(item)
+    return res
+
+
+def test_pending_events_benchmark():
+    """Time of a single confirmation tick (one block worth of events confirmed) vs. the size of the backlog"""
+    print(f"\n{'backlog':>10} {'list (ms)':>12} {'heap (ms)':>12}")
+    for size in BACKLOG_SIZES:
+        events = [(str(i), _event(i // EVENTS_PER_BLOCK, i % EVENTS_PER_BLOCK)) for i in range(size)]
+        confirmed_block = 0
+
+        pending_list = list(events)
+        start = perf_counter()
+        assert len(_list_tick(pending_list, confirmed_block)) == EVENTS_PER_BLOCK
+        list_time = perf_counter() - start
+
+        pending_heap = PendingEvents()
+        for name, event in events:
+            pending_heap.push(name, event)
+        start = perf_counter()
+        assert len(pending_heap.pop_confirmed(confirmed_block)) == EVENTS_PER_BLOCK
+        heap_time = perf_counter() - start
+
+        print(f"{size:>10} {list_time * 1000:>12.3f} {heap_time * 1000:>12.3f}")
+        assert len(pending_heap) == size - EVENTS_PER_BLOCK
+
+    assert heap_time < list_time
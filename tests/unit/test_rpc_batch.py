@@ -0,0 +1,92 @@
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+from eth_abi import encode_abi
+from web3 import Web3
+
+from src.util.common import project_base_path
+from src.util.eth.rpc_batch import RpcBatch
+
+WALLET = Web3.toChecksumAddress('0x' + '11' * 20)
+ACCOUNT = Web3.toChecksumAddress('0x' + '22' * 20)
+DEST = Web3.toChecksumAddress('0x' + '33' * 20)
+TOKEN = Web3.toChecksumAddress('0x' + '44' * 20)
+SUBMISSION = [DEST, 10, b'', False, 3, TOKEN, 1]
+
+
+class StandInNode:
+    """JSON-RPC node which answers the signer's reads, and counts the HTTP requests it got"""
+
+    def __init__(self):
+        self.http_requests = 0
+        self.calls = []
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # pylint: disable=invalid-name
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                node.http_requests += 1
+                if isinstance(payload, list):
+                    body = [node.answer(request) for request in payload]
+                else:
+                    body = node.answer(payload)
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('localhost', 0), Handler)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def uri(self) -> str:
+        return f'http://localhost:{self.server.server_address[1]}'
+
+    def answer(self, request: dict) -> dict:
+        self.calls.append(request['method'])
+        results = {
+            'eth_getBalance': hex(10 ** 18),
+            'eth_getTransactionCount': hex(7),
+            'eth_gasPrice': hex(20 * 10 ** 9),
+            'eth_chainId': '0x1',
+        }
+        if request['method'] == 'eth_call':
+            selector = request['params'][0]['data'][:10]
+            if selector == Web3.keccak(text='confirmations(uint256,address)')[:4].hex():
+                result = '0x' + encode_abi(['bool'], [True]).hex()
+            else:
+                result = '0x' + encode_abi(['address', 'uint256', 'bytes', 'bool', 'uint256', 'address', 'uint256'],
+                                           SUBMISSION).hex()
+        else:
+            result = results[request['method']]
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': result}
+
+
+def test_batch_matches_single_calls():
+    node = StandInNode()
+    w3 = Web3(Web3.HTTPProvider(node.uri))
+    path = os.path.join(project_base_path(), 'src', 'contracts', 'ethereum', 'abi', 'MultiSigSwapWallet.json')
+    with open(path) as f:
+        contract = w3.eth.contract(address=WALLET, abi=json.load(f)['abi'])
+
+    batch = RpcBatch(w3)
+    balance = batch.get_balance(ACCOUNT)
+    submission = batch.call(contract.functions.transactions(5))
+    confirmed = batch.call(contract.functions.confirmations(5, ACCOUNT))
+    nonce = batch.get_transaction_count(ACCOUNT)
+    gas_price = batch.gas_price()
+    batch.execute()
+    assert node.http_requests == 1
+
+    assert balance.result == w3.eth.getBalance(ACCOUNT)
+    assert submission.result == contract.functions.transactions(5).call()
+    assert confirmed.result is contract.functions.confirmations(5, ACCOUNT).call() is True
+    assert nonce.result == w3.eth.getTransactionCount(ACCOUNT, 'pending')
+    assert gas_price.result == w3.eth.gasPrice
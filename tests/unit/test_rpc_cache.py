@@ -0,0 +1,70 @@
+from collections import Counter
+
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+from src.util.eth.rpc_cache import FinalityCache, LRUCache
+
+CONFIRMATIONS = 12
+
+
+class StandInProvider(BaseProvider):
+    """Counts the requests that reach the node"""
+
+    def __init__(self):
+        self.head = 100
+        self.requests = Counter()
+
+    def make_request(self, method, params):
+        self.requests[method] += 1
+        if method == 'eth_blockNumber':
+            return {'jsonrpc': '2.0', 'id': 1, 'result': hex(self.head)}
+        if method == 'eth_chainId':
+            return {'jsonrpc': '2.0', 'id': 1, 'result': '0x1'}
+        if method == 'eth_getTransactionReceipt':
+            block = int(params[0][-2:], 16)
+            return {'jsonrpc': '2.0', 'id': 1, 'result': _receipt(params[0], block)}
+        raise NotImplementedError(method)
+
+
+def _receipt(tx_hash: str, block: int) -> dict:
+    return {'transactionHash': tx_hash, 'transactionIndex': '0x0', 'blockHash': '0x' + '11' * 32,
+            'blockNumber': hex(block), 'from': '0x' + '22' * 20, 'to': '0x' + '33' * 20, 'cumulativeGasUsed': '0x1',
+            'gasUsed': '0x1', 'contractAddress': None, 'logs': [], 'logsBloom': '0x' + '00' * 256, 'status': '0x1'}
+
+
+def test_finality_cache():
+    provider = StandInProvider()
+    w3 = Web3(provider)
+    cache = FinalityCache(CONFIRMATIONS)
+    w3.middleware_onion.inject(cache, name='rpc_cache', layer=0)
+
+    for _ in range(5):
+        assert w3.eth.chainId == 1
+    assert provider.requests['eth_chainId'] == 1
+
+    # the head is unknown - nothing that depends on it is cached
+    final_tx = '0x' + '00' * 31 + '50'
+    recent_tx = '0x' + '00' * 31 + '60'
+    w3.eth.getTransactionReceipt(final_tx)
+    w3.eth.getTransactionReceipt(final_tx)
+    assert provider.requests['eth_getTransactionReceipt'] == 2
+
+    assert w3.eth.blockNumber == 100
+    for _ in range(5):
+        assert w3.eth.getTransactionReceipt(final_tx).blockNumber == 0x50
+        assert w3.eth.getTransactionReceipt(recent_tx).blockNumber == 0x60
+    # block 0x50 is final, block 0x60 (96) isn't
+    assert provider.requests['eth_getTransactionReceipt'] == 2 + 1 + 5
+    assert cache.hits == 4 + 4
+
+
+def test_lru_eviction():
+    cache = LRUCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == (True, 1)
+    cache.put('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+    assert len(cache) == 2
@@ -0,0 +1,96 @@
+import json
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import sleep
+
+import pytest
+import requests
+from web3 import Web3
+
+from src.util.eth import rpc_pool
+from src.util.eth.rpc_pool import PooledHTTPProvider
+
+
+class StandInNode:
+    """Minimal JSON-RPC node which answers eth_blockNumber, after @delay seconds"""
+
+    def __init__(self, name: str, delay: float = 0.0):
+        self.name = name
+        self.delay = delay
+        self.down = False
+        self.requests = 0
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # pylint: disable=invalid-name
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                node.requests += 1
+                if node.down:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                sleep(node.delay)
+                body = json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': hex(100)}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('localhost', 0), Handler)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def uri(self) -> str:
+        return f'http://localhost:{self.server.server_address[1]}'
+
+
+def test_pool_routing_and_failover(monkeypatch):
+    monkeypatch.setattr(rpc_pool, 'EXPLORE_RATE', 0)
+    fast, slow = StandInNode('fast'), StandInNode('slow', delay=0.05)
+    provider = PooledHTTPProvider([slow.uri, fast.uri])
+    w3 = Web3(provider)
+
+    for _ in range(20):
+        assert w3.eth.blockNumber == 100
+    # both are tried once, then everything goes to the fast node
+    assert slow.requests == 1
+    assert fast.requests == 19
+
+    # the fast node fails - requests move to the slow one without failing, and the fast node gets ejected
+    fast.down = True
+    for _ in range(10):
+        assert w3.eth.blockNumber == 100
+    assert fast.requests == 19 + rpc_pool.FAILURE_THRESHOLD
+    assert Counter(stats['healthy'] for stats in provider.stats()) == Counter([True, False])
+
+    # back after the ejection time
+    fast.down = False
+    monkeypatch.setattr(rpc_pool, 'EJECT_TIME', 0)
+    for endpoint in provider.endpoints:
+        endpoint.ejected_until = 0.0
+    for _ in range(10):
+        assert w3.eth.blockNumber == 100
+    assert fast.requests > 19 + rpc_pool.FAILURE_THRESHOLD
+
+
+def test_timeouts():
+    first, second = StandInNode('first', delay=0.3), StandInNode('second', delay=0.3)
+    provider = PooledHTTPProvider([first.uri, second.uri], request_timeout=0.05)
+    w3 = Web3(provider)
+
+    # a log query that times out is too heavy for the node - the scanner makes it smaller, the node isn't failed
+    with pytest.raises(requests.Timeout):
+        w3.eth.getLogs({'fromBlock': 0, 'toBlock': 100000})
+    assert first.requests + second.requests == 1
+    assert [endpoint.failures for endpoint in provider.endpoints] == [0, 0]
+
+    # other requests are tried on every node, and still raise a timeout
+    with pytest.raises(requests.Timeout):
+        _ = w3.eth.blockNumber
+    assert first.requests + second.requests == 3
+    assert [endpoint.failures for endpoint in provider.endpoints] == [1, 1]
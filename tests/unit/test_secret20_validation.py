@@ -0,0 +1,137 @@
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+from Crypto.PublicKey import ECC
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+from src.contracts.ethereum.multisig_wallet import MultisigWallet
+from src.contracts.secret.secret_contract import mint_json
+from src.db.collections.eth_swap import Swap
+from src.signer.secret20 import signer as signer_module
+from src.signer.secret20.signer import Secret20Signer
+from src.util.common import Token
+from src.util.secret_encryption import SecretEncryption
+from src.util.secret_tx import unsigned_execute_tx
+
+IO_PUBKEY = ECC.construct(curve='Curve25519', seed=bytes(range(32, 64))).public_key().export_key(format='raw')
+ENCRYPTION = SecretEncryption(bytes(range(32)), IO_PUBKEY)
+CODE_HASH = 'AB' * 32
+TOKEN = 'secret1token'
+ERC20 = '0xerc20'
+SWAPS = {f'0x{i}': (1000 + i, f'secret1recipient{i}') for i in range(3)}
+
+
+class _Contract:
+    parse_swap_event = staticmethod(MultisigWallet.parse_swap_event)
+
+    @staticmethod
+    def extract_amount(tx_log) -> int:
+        return tx_log.args.amount
+
+    @staticmethod
+    def extract_addr(tx_log) -> str:
+        return tx_log.args.recipient.decode()
+
+
+def _no_subprocess(_):
+    raise AssertionError('secretcli should not be used')
+
+
+@pytest.fixture(name='signer')
+def fixture_signer(monkeypatch):
+    monkeypatch.setattr(signer_module, 'tx_encryption', lambda: ENCRYPTION)
+    monkeypatch.setattr(signer_module, 'decrypt', _no_subprocess)
+    monkeypatch.setattr(signer_module, 'TokenPairing', SimpleNamespace(objects=lambda **_: []))
+
+    signer = Secret20Signer.__new__(Secret20Signer)
+    signer.contract = _Contract()
+    signer.config = SimpleNamespace(swap_code_hash=CODE_HASH)
+    signer.logger = logging.getLogger('signer')
+    signer.token_map = {ERC20: Token(TOKEN, 'sTKN')}
+    logs = {tx_hash: AttributeDict({'event': 'SwapToken', 'blockNumber': 1, 'transactionHash': HexBytes(tx_hash),
+                                    'args': AttributeDict({'amount': amount, 'recipient': recipient.encode(),
+                                                           'tokenAddress': ERC20})})
+            for tx_hash, (amount, recipient) in SWAPS.items()}
+    signer.event_store = SimpleNamespace(get=logs.get)
+    return signer
+
+
+def _batch(mints, encryption: SecretEncryption = ENCRYPTION, dst_address: str = TOKEN):
+    """ Swaps of SWAPS (saved with @dst_address) with an unsigned tx minting @mints (a message each) """
+    messages = []
+    for mint in mints:
+        tx = json.loads(unsigned_execute_tx('secret1ms', 'secret1swap', encryption.encrypt(CODE_HASH, json.dumps(mint))))
+        messages += tx['value']['msg']
+    tx['value']['msg'] = messages
+    return [Swap(src_tx_hash=tx_hash, amount=str(amount), dst_address=dst_address, unsigned_tx=json.dumps(tx))
+            for tx_hash, (amount, _) in SWAPS.items()]
+
+
+def _mints(**changes):
+    mints = [mint_json(str(amount), tx_hash, recipient, TOKEN) for tx_hash, (amount, recipient) in SWAPS.items()]
+    for field, value in changes.items():
+        mints[1]['mint_from_ext_chain'][field] = value
+    return mints
+
+
+def test_valid_batch(signer):
+    assert signer._is_valid(_batch(_mints()))  # pylint: disable=protected-access
+    # messages are matched to swaps by identifier, whatever their order
+    assert signer._is_valid(_batch(list(reversed(_mints()))))  # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize('changes', [{'amount': '5000'}, {'address': 'secret1attacker'}, {'token': 'secret1other'},
+                                     {'identifier': '0x0'}])
+def test_tampered_mint(signer, changes):
+    assert not signer._is_valid(_batch(_mints(**changes)))  # pylint: disable=protected-access
+
+
+def test_missing_or_extra_messages(signer):
+    assert not signer._is_valid(_batch(_mints()[:2]))  # pylint: disable=protected-access
+    assert not signer._is_valid(_batch(_mints() + _mints()[:1]))  # pylint: disable=protected-access
+
+
+def test_foreign_key(signer):
+    other_key = SecretEncryption(bytes(range(64, 96)), IO_PUBKEY)
+    assert not signer._is_valid(_batch(_mints(), other_key))  # pylint: disable=protected-access
+
+
+def test_token_from_chain(signer):
+    # the swap rows say the other token too, but the chain says the swap was of a token we map to TOKEN
+    mints = _mints(token='secret1other')
+    assert not signer._is_valid(_batch(mints, dst_address='secret1other'))  # pylint: disable=protected-access
+
+    # a token that isn't paired with a secret token
+    signer.token_map = {}
+    assert not signer._is_valid(_batch(_mints()))  # pylint: disable=protected-access
+
+
+def test_without_io_key(signer, monkeypatch):
+    # no REST server: the messages are decrypted with secretcli, and the plaintext is checked
+    plaintexts = {}
+
+    def _decrypt(encrypted_msg):
+        return plaintexts[encrypted_msg]
+
+    monkeypatch.setattr(signer_module, 'tx_encryption', lambda: None)
+    monkeypatch.setattr(signer_module, 'decrypt', _decrypt)
+
+    for changes in [{}, {'token': 'secret1other'}]:
+        batch = _batch(_mints(**changes))
+        for message, mint in zip(json.loads(batch[0].unsigned_tx)['value']['msg'], _mints(**changes)):
+            plaintexts[message['value']['msg']] = CODE_HASH.lower() + json.dumps(mint)
+        assert signer._is_valid(batch) == (not changes)  # pylint: disable=protected-access
+
+
+def test_partial_batch_waits(signer):
+    failed, signed = [], []
+    signer._is_signed = lambda _: False  # pylint: disable=protected-access
+    signer._set_failed = failed.append  # pylint: disable=protected-access
+    signer._sign_with_secret_cli = lambda *_: signed.append(_)  # pylint: disable=protected-access
+
+    # the rest of the swaps of the tx aren't unsigned yet - not failed, and not signed either
+    signer._validate_and_sign(_batch(_mints())[:2])  # pylint: disable=protected-access
+    assert not failed and not signed
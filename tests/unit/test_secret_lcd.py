@@ -0,0 +1,156 @@
+import base64
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from subprocess import CalledProcessError
+from threading import Thread
+from urllib.parse import urlparse
+
+import pytest
+from Crypto.PublicKey import ECC
+
+from src.util.secret_encryption import SecretEncryption
+from src.util.secret_lcd import SecretLCDClient
+
+CODE_HASH = 'AB' * 32
+CONTRACT = 'secret1contract'
+ACCOUNT = 'secret1account'
+SEED = bytes(range(32))
+CONSENSUS_SEED = bytes(range(32, 64))
+
+
+def _pubkey(seed: bytes) -> bytes:
+    return ECC.construct(curve='Curve25519', seed=seed).public_key().export_key(format='raw')
+
+
+class StandInLCD:
+    """
+    REST server of a node whose enclave knows CONSENSUS_SEED. It has swaps 1 and 2 of 'eth', and a mint transaction
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.consensus_pubkey = _pubkey(CONSENSUS_SEED)
+        self.tx_msg = None
+        lcd = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                lcd.requests += 1
+                status, body = lcd.answer(urlparse(self.path).path)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('localhost', 0), Handler)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f'http://localhost:{self.server.server_address[1]}'
+
+    @staticmethod
+    def enclave(encrypted_msg: bytes):
+        """Returns the sender's key (as seen by the enclave), the nonce and the plaintext of a message"""
+        nonce, pubkey, ciphertext = SecretEncryption.split(encrypted_msg)
+        key = SecretEncryption(CONSENSUS_SEED, pubkey)
+        return key, nonce, key.decrypt(ciphertext, nonce).decode()
+
+    @staticmethod
+    def seal(key: SecretEncryption, nonce: bytes, plaintext: str) -> bytes:
+        """Encrypts an answer of the contract, as the enclave does"""
+        return key.encrypt('', plaintext, nonce)[64:]
+
+    @staticmethod
+    def b64(text: str) -> str:
+        return base64.b64encode(text.encode()).decode()
+
+    def answer(self, path: str):
+        if path == '/reg/consensus-io-exch-pubkey':
+            return 200, {'result': {'ioExchPubkey': base64.b64encode(self.consensus_pubkey).decode()}}
+
+        if path.startswith(f'/wasm/contract/{CONTRACT}/query/'):
+            encrypted_msg = base64.b64decode(bytes.fromhex(path.rsplit('/', 1)[1]))
+            key, nonce, plaintext = self.enclave(encrypted_msg)
+            assert plaintext[:64] == CODE_HASH.lower()
+            query = json.loads(plaintext[64:])['swap']
+            if query['nonce'] > 2:
+                error = base64.b64encode(self.seal(key, nonce, 'Failed to get swap for token')).decode()
+                return 500, {'error': f'query wasm contract failed: encrypted: {error}'}
+            answer = json.dumps({'swap': {'result': {'nonce': query['nonce'], 'token': query['token']}}})
+            return 200, {'result': {'smart': base64.b64encode(self.seal(key, nonce, self.b64(answer))).decode()}}
+
+        if path == f'/auth/accounts/{ACCOUNT}':
+            return 200, {'result': {'type': 'cosmos-sdk/Account', 'value': {
+                'address': ACCOUNT, 'coins': [{'denom': 'uscrt', 'amount': '1000'}],
+                'account_number': '5', 'sequence': '17'}}}
+
+        if path.startswith('/auth/accounts/'):
+            return 200, {'result': {'type': 'cosmos-sdk/Account', 'value': {'address': '', 'coins': []}}}
+
+        if path == '/txs/AABB' and self.tx_msg is not None:
+            key, nonce, _ = self.enclave(self.tx_msg)
+            data = self.seal(key, nonce, self.b64(json.dumps({'mint_from_ext_chain': {'status': 'success'}})))
+            return 200, {'height': '10', 'txhash': 'AABB', 'data': data.hex().upper(), 'tx': {'value': {'msg': [
+                {'type': 'wasm/MsgExecuteContract', 'value': {'msg': base64.b64encode(self.tx_msg).decode()}}]}}}
+
+        return 404, {'error': 'not found'}
+
+
+def test_encryption_roundtrip():
+    ours = SecretEncryption(SEED, _pubkey(CONSENSUS_SEED))
+    encrypted = ours.encrypt(CODE_HASH, '{"a": 1}')
+    _, nonce, plaintext = StandInLCD.enclave(encrypted)
+    assert plaintext == CODE_HASH.lower() + '{"a": 1}'
+
+    # same nonce, same ciphertext - that's what lets signers compare transactions they didn't create
+    assert ours.encrypt(CODE_HASH, '{"a": 1}', nonce) == encrypted
+    with pytest.raises(ValueError):
+        ours.decrypt(SecretEncryption.split(encrypted)[2], bytes(32))
+
+
+def test_query_contract():
+    lcd = StandInLCD()
+    client = SecretLCDClient(lcd.url, SEED)
+
+    answer = client.query_contract(CONTRACT, CODE_HASH, json.dumps({'swap': {'nonce': 1, 'token': 'eth'}}))
+    assert json.loads(answer) == {'swap': {'result': {'nonce': 1, 'token': 'eth'}}}
+
+    # same error secretcli gives, so EtherLeader can tell there are no more swaps
+    with pytest.raises(CalledProcessError) as e:
+        client.query_contract(CONTRACT, CODE_HASH, json.dumps({'swap': {'nonce': 3, 'token': 'eth'}}))
+    assert b'ERROR: query result: encrypted: Failed to get swap for token' in e.value.stderr
+
+    # the io key is fetched once
+    lcd.requests = 0
+    for nonce in range(10):
+        client.query_contract(CONTRACT, CODE_HASH, json.dumps({'swap': {'nonce': nonce % 3, 'token': 'eth'}}))
+    assert lcd.requests == 10
+
+
+def test_account():
+    client = SecretLCDClient(StandInLCD().url, SEED)
+
+    account = client.account(ACCOUNT)
+    assert account['value']['account_number'] == '5'
+    assert account['value']['sequence'] == '17'
+    with pytest.raises(RuntimeError):
+        client.account('secret1nobody')
+
+
+def test_compute_tx():
+    lcd = StandInLCD()
+    client = SecretLCDClient(lcd.url, SEED)
+
+    assert client.tx('AABB') is None
+    assert client.compute_tx('AABB') is None
+
+    lcd.tx_msg = client.encryption.encrypt(CODE_HASH, json.dumps({'mint_from_ext_chain': {}}))
+    result = client.compute_tx('AABB')
+    assert result['output_error'] == ''
+    assert json.loads(result['output_data_as_string']) == {'mint_from_ext_chain': {'status': 'success'}}
@@ -0,0 +1,185 @@
+import json
+import logging
+import random
+from threading import Lock
+from time import sleep
+from types import SimpleNamespace
+
+import pytest
+from mongoengine.errors import NotUniqueError
+
+from src.db.collections.eth_swap import Status
+from src.leader.secret20 import manager as manager_module
+from src.leader.secret20.manager import SecretManager, _Mint
+
+
+class SwapStore:
+    """ Stands in for the swaps collection, keyed (uniquely) by src_tx_hash """
+    def __init__(self):
+        self.swaps = {}
+        # the unsigned swaps (which the signers see) whenever a swap is saved, and the status updates
+        self.unsigned_on_save = []
+        self.updates = []
+
+    def objects(self, src_tx_hash__in=None, **query):
+        if src_tx_hash__in is not None:
+            return SimpleNamespace(distinct=lambda _: [tx_hash for tx_hash in src_tx_hash__in if tx_hash in self.swaps])
+
+        matching = [swap for swap in self.swaps.values()
+                    if all(getattr(swap, field, None) == value for field, value in query.items())]
+
+        def _update(status):
+            self.updates.append((sorted(swap.src_tx_hash for swap in matching), status))
+            for swap in matching:
+                swap.status = status
+
+        return SimpleNamespace(update=_update)
+
+    def swap(self, tx_hash: str):
+        store = self
+
+        class _Swap(SimpleNamespace):
+            def save(self, force_insert=False):
+                if force_insert and self.src_tx_hash in store.swaps:
+                    raise NotUniqueError(f'duplicate key: {self.src_tx_hash}')
+                store.swaps[self.src_tx_hash] = self
+                store.unsigned_on_save.append(sorted(tx_hash for tx_hash, swap in store.swaps.items()
+                                                     if swap.status == Status.SWAP_UNSIGNED))
+
+            def delete(self):
+                del store.swaps[self.src_tx_hash]
+
+        return _Swap(src_tx_hash=tx_hash, amount='1', dst_coin='sTKN', status=Status.SWAP_STAGED)
+
+
+class Tracker:
+    def __init__(self, last: int = -1):
+        self.blocks = []
+        self.last = last
+
+    def last_processed(self, src):
+        assert src == 'Ethereum'
+        return self.blocks[-1] if self.blocks else self.last
+
+    def update_last_processed(self, src, block):
+        assert src == 'Ethereum'
+        self.blocks.append(block)
+
+
+def _unsigned_tx(_, mints, *__):
+    return json.dumps([mint['mint_from_ext_chain']['identifier'] for mint in mints])
+
+
+def _manager(monkeypatch, store: SwapStore, tracker: Tracker) -> SecretManager:
+    monkeypatch.setattr(manager_module, 'Swap', store)
+    monkeypatch.setattr(manager_module, 'SwapTrackerObject', tracker)
+    monkeypatch.setattr(manager_module, 'create_unsigned_mint_tx', _unsigned_tx)
+
+    manager = SecretManager.__new__(SecretManager)
+    manager.logger = logging.getLogger('manager')
+    manager.config = SimpleNamespace(scrt_swap_address='secret1swap', chain_id='chain', enclave_key='key',
+                                     swap_code_hash='hash', eth_start_block=0)
+    manager.multisig = SimpleNamespace(address='secret1ms')
+    manager.sequence = 0
+    manager.pending_mints = []
+    manager.mint_lock = Lock()
+    manager.batch_size = 3
+    return manager
+
+
+def _mint(store: SwapStore, tx_hash: str, block: int) -> _Mint:
+    return _Mint(store.swap(tx_hash), {'mint_from_ext_chain': {'identifier': tx_hash}}, block)
+
+
+def test_duplicates_left_out_of_batch(monkeypatch):
+    store, tracker = SwapStore(), Tracker()
+    manager = _manager(monkeypatch, store, tracker)
+    store.swap('0x0').save()
+
+    manager.pending_mints = [_mint(store, f'0x{i}', 10 + i) for i in range(3)]
+    manager._flush_mints()  # pylint: disable=protected-access
+
+    assert store.swaps['0x1'].batch_id == store.swaps['0x2'].batch_id == '0x1'
+    assert json.loads(store.swaps['0x1'].unsigned_tx) == ['0x1', '0x2']
+    assert manager.sequence == 1
+    assert tracker.blocks == [12]
+
+
+def test_batch_unsigned_at_once(monkeypatch):
+    store, tracker = SwapStore(), Tracker()
+    manager = _manager(monkeypatch, store, tracker)
+
+    manager.pending_mints = [_mint(store, f'0x{i}', 10 + i) for i in range(3)]
+    manager._flush_mints()  # pylint: disable=protected-access
+
+    # the signers see none of the swaps while they're saved, and then all of them
+    assert store.unsigned_on_save == [[], [], []]
+    assert store.updates == [(['0x0', '0x1', '0x2'], Status.SWAP_UNSIGNED)]
+    assert all(swap.status == Status.SWAP_UNSIGNED for swap in store.swaps.values())
+
+
+def test_batch_rebuilt_on_insert_conflict(monkeypatch):
+    store, tracker = SwapStore(), Tracker()
+    manager = _manager(monkeypatch, store, tracker)
+    batch = [_mint(store, f'0x{i}', 10 + i) for i in range(3)]
+
+    # saved by someone else after the duplicate check
+    objects = store.objects
+    monkeypatch.setattr(store, 'objects', lambda src_tx_hash__in=None, **query: objects(**query) if query else
+                        SimpleNamespace(distinct=lambda _: []))
+    store.swap('0x1').save()
+    manager.pending_mints = batch
+    manager._flush_mints()  # pylint: disable=protected-access
+
+    # no swap is left pointing at a tx that mints the duplicate
+    assert {tx_hash: json.loads(swap.unsigned_tx) for tx_hash, swap in store.swaps.items() if tx_hash != '0x1'} == \
+        {'0x0': ['0x0', '0x2'], '0x2': ['0x0', '0x2']}
+    assert store.swaps['0x2'].batch_id == '0x0'
+    assert manager.sequence == 1
+    assert not manager.pending_mints
+
+
+def _catch_up_manager(monkeypatch, tracker: Tracker, fail_at: int = None):
+    """ A manager catching up on a chain with an event every 5 blocks - fetching the segment of @fail_at fails """
+    monkeypatch.setattr(manager_module, 'CATCH_UP_SEGMENT', 10)
+    manager = _manager(monkeypatch, SwapStore(), tracker)
+    handled = []
+
+    def _segment_events(from_block, to_block):
+        # segments are fetched concurrently, and finish in any order
+        sleep(random.random() / 100)
+        if fail_at is not None and from_block <= fail_at <= to_block:
+            raise ValueError('node is down')
+        return [block for block in range(from_block, to_block + 1) if block % 5 == 0]
+
+    manager._segment_events = _segment_events  # pylint: disable=protected-access
+    manager._handle = handled.append  # pylint: disable=protected-access
+    return manager, handled
+
+
+def test_catch_up_in_order(monkeypatch):
+    tracker = Tracker(last=9)
+    manager, handled = _catch_up_manager(monkeypatch, tracker)
+
+    manager.catch_up(99)
+
+    assert handled == list(range(10, 100, 5))
+    # progress is saved after each segment
+    assert tracker.blocks == list(range(19, 100, 10))
+
+
+def test_catch_up_failed_segment(monkeypatch):
+    tracker = Tracker(last=9)
+    manager, handled = _catch_up_manager(monkeypatch, tracker, fail_at=55)
+
+    with pytest.raises(ValueError):
+        manager.catch_up(99)
+
+    # nothing from the failed segment on was handled, and we resume from it
+    assert handled == list(range(10, 50, 5))
+    assert tracker.blocks == [19, 29, 39, 49]
+
+    manager, handled = _catch_up_manager(monkeypatch, tracker)
+    manager.catch_up(99)
+    assert handled == list(range(50, 100, 5))
+    assert tracker.blocks[-1] == 99
@@ -0,0 +1,37 @@
+import base64
+import json
+
+from Crypto.PublicKey import ECC
+
+from src.contracts.secret.secret_contract import mint_json
+from src.util import secretcli
+from src.util.secret_encryption import SecretEncryption
+
+SEED = bytes(range(32))
+IO_PUBKEY = ECC.construct(curve='Curve25519', seed=bytes(range(32, 64))).public_key().export_key(format='raw')
+CODE_HASH = 'AB' * 32
+MINT = mint_json('1000', '0xabc', 'secret1recipient', 'secret1token')
+
+
+class _Client:
+    def __init__(self):
+        self.encryption = SecretEncryption(SEED, IO_PUBKEY)
+
+
+def test_create_unsigned_tx(monkeypatch):
+    client = _Client()
+    monkeypatch.setattr(secretcli, 'lcd_client', lambda: client)
+
+    unsigned_txs = [secretcli.create_unsigned_tx('secret1swap', MINT, 'chain', 'io-master-cert.der', CODE_HASH,
+                                                 'secret1multisig') for _ in range(100)]
+
+    tx = json.loads(unsigned_txs[0])
+    msg = tx['value']['msg'][0]['value']
+    assert msg['sender'] == 'secret1multisig'
+    assert msg['contract'] == 'secret1swap'
+    assert tx['value']['fee']['gas'] == '200000'
+
+    # encrypted with a fresh nonce each time, for the enclave to decrypt
+    assert len(set(unsigned_txs)) == len(unsigned_txs)
+    nonce, _, ciphertext = SecretEncryption.split(base64.b64decode(msg['msg']))
+    assert client.encryption.decrypt(ciphertext, nonce).decode() == CODE_HASH.lower() + json.dumps(MINT)
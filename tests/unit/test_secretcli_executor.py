@@ -0,0 +1,81 @@
+import logging
+import stat
+from subprocess import CalledProcessError
+from threading import Thread
+from time import perf_counter, sleep
+
+import pytest
+
+from src.util.secretcli_executor import SecretCliExecutor, SecretCliTimeout, command_class
+
+logger = logging.getLogger('secretcli')
+
+
+@pytest.fixture(name='secretcli')
+def fixture_secretcli(tmp_path):
+    """ A secretcli which takes 0.2 seconds and prints its arguments (or just hangs for $HANG seconds) """
+    path = tmp_path / 'secretcli'
+    path.write_text('#!/bin/sh\n[ -n "$HANG" ] && exec sleep $HANG\nsleep 0.2\necho "$@"\n')
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def test_command_class():
+    assert command_class(['secretcli', 'tx', 'broadcast', 'signed.json', '-b', 'async']) == 'broadcast'
+    assert command_class(['secretcli', 'tx', 'multisign', 'unsigned.json', 'ms']) == 'sign'
+    assert command_class(['secretcli', 'tx', 'compute', 'execute', 'secret1..', '{}']) == 'tx'
+    assert command_class(['secretcli', 'q', 'compute', 'tx', 'AABB']) == 'query'
+    assert command_class(['secretcli', 'keys', 'list']) == 'other'
+
+
+def test_process_limit(secretcli):
+    executor = SecretCliExecutor(logger, max_processes=2)
+    threads = [Thread(target=executor.run, args=([secretcli, 'query', 'account', str(i)],)) for i in range(6)]
+
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - start
+
+    # 3 rounds of 2 processes
+    assert 0.6 <= elapsed < 1.2
+    stats = executor.stats()['query']
+    assert stats['execution_time'].count == 6
+    assert stats['queue_wait'].quantile(1) >= 0.25
+    print(f"\n6 queries, 2 processes: queue wait {stats['queue_wait']}, execution {stats['execution_time']}")
+
+
+def test_broadcast_first(secretcli):
+    executor = SecretCliExecutor(logger, max_processes=1)
+    finished = []
+
+    def run(*args):
+        finished.append(executor.run([secretcli, *args]).stdout.decode().split()[1])
+
+    threads = [Thread(target=run, args=('query', 'busy'))]
+    threads[0].start()
+    sleep(0.05)
+    for args in [('query', 'q1'), ('query', 'q2'), ('tx', 'broadcast'), ('tx', 'sign')]:
+        threads.append(Thread(target=run, args=args))
+        threads[-1].start()
+        sleep(0.02)
+    for thread in threads:
+        thread.join()
+
+    assert finished == ['busy', 'broadcast', 'sign', 'q1', 'q2']
+
+
+def test_timeout(secretcli, monkeypatch):
+    executor = SecretCliExecutor(logger, timeout=0.3)
+    monkeypatch.setenv('HANG', '10')
+    start = perf_counter()
+    with pytest.raises(CalledProcessError) as e:
+        executor.run([secretcli, 'query', 'account'])
+    assert isinstance(e.value, SecretCliTimeout)
+    assert perf_counter() - start < 1
+    monkeypatch.delenv('HANG')
+
+    # the slot was released
+    assert executor.run([secretcli, 'query', 'account']).stdout == b'query account\n'
@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from time import sleep
+
+import pytest
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+from src.util.eth.singleflight import SingleFlight
+
+THREADS = 20
+
+
+class SlowProvider(BaseProvider):
+    def __init__(self, fail: bool = False):
+        self.requests = 0
+        self.fail = fail
+
+    def make_request(self, method, params):
+        self.requests += 1
+        sleep(0.2)
+        if self.fail:
+            raise ConnectionError('node is down')
+        return {'jsonrpc': '2.0', 'id': 1, 'result': hex(100)}
+
+
+def _w3(provider: BaseProvider):
+    w3 = Web3(provider)
+    singleflight = SingleFlight()
+    w3.middleware_onion.inject(singleflight, name='singleflight', layer=0)
+    return w3, singleflight
+
+
+def _concurrently(fn):
+    barrier = Barrier(THREADS)
+
+    def call(_):
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        return list(pool.map(call, range(THREADS)))
+
+
+def test_identical_requests_are_coalesced():
+    provider = SlowProvider()
+    w3, singleflight = _w3(provider)
+
+    assert _concurrently(lambda: w3.eth.blockNumber) == [100] * THREADS
+    print(f"\n{THREADS} concurrent eth_blockNumber: {provider.requests} reached the node, {singleflight.saved} saved")
+    assert provider.requests < THREADS
+    assert singleflight.saved == THREADS - provider.requests
+
+    # nothing in flight - goes to the node again
+    assert w3.eth.blockNumber == 100
+    assert provider.requests + singleflight.saved == THREADS + 1
+
+
+def test_errors_are_shared():
+    provider = SlowProvider(fail=True)
+    w3, _ = _w3(provider)
+
+    def block_number():
+        with pytest.raises(ConnectionError):
+            w3.eth.blockNumber
+        return True
+
+    assert all(_concurrently(block_number))
+    assert provider.requests < THREADS
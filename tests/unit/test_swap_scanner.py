@@ -0,0 +1,142 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import CalledProcessError
+from threading import Event
+from time import perf_counter, sleep
+
+import pytest
+
+from src.leader.eth.swap_scanner import MAX_BACKOFF, TokenScanner, scan_ahead
+
+BACKLOG = 100
+QUERY_TIME = 0.02
+
+
+def _contract(existing):
+    """Query of a swap contract holding swaps with the nonces in @existing, which takes QUERY_TIME to answer"""
+    def query(nonce: int):
+        sleep(QUERY_TIME)
+        return f'swap {nonce}' if nonce in existing else None
+    return query
+
+
+def test_contiguous_swaps():
+    with ThreadPoolExecutor(10) as pool:
+        assert scan_ahead(_contract({3, 4, 5, 7}), 3, 10, pool) == ['swap 3', 'swap 4', 'swap 5']
+        assert scan_ahead(_contract({4, 5}), 3, 10, pool) == []
+        assert scan_ahead(_contract(set(range(100))), 0, 10, pool) == [f'swap {n}' for n in range(10)]
+
+
+def test_failed_queries():
+    def query(nonce: int):
+        if nonce == 2:
+            raise CalledProcessError(1, 'secretcli')
+        return f'swap {nonce}'
+
+    with ThreadPoolExecutor(10) as pool:
+        # the swaps before the failure are handled, the failure is retried by the next scan
+        assert scan_ahead(query, 0, 10, pool) == ['swap 0', 'swap 1']
+        with pytest.raises(CalledProcessError):
+            scan_ahead(query, 2, 10, pool)
+
+
+def test_backlog():
+    query = _contract(set(range(BACKLOG)))
+    print(f"\nbacklog of {BACKLOG} swaps, {QUERY_TIME * 1000:.0f}ms per query")
+    for window in [1, 10, 50]:
+        start = perf_counter()
+        nonce = 0
+        with ThreadPoolExecutor(window) as pool:
+            while True:
+                swaps = scan_ahead(query, nonce, window, pool)
+                if not swaps:
+                    break
+                nonce += len(swaps)
+        print(f"window {window:>3}: {perf_counter() - start:.2f}s")
+        assert nonce == BACKLOG
+
+
+class _Token:
+    """A token's cursor and the swaps handled for it"""
+
+    def __init__(self):
+        self.nonce = -1
+        self.handled = []
+
+    def handle(self, nonce: int, swap: str):
+        self.handled.append(swap)
+        self.nonce = nonce
+
+
+def _scanner(name: str, token: _Token, query, pool, stop_event: Event) -> TokenScanner:
+    return TokenScanner(name, lambda: token.nonce + 1, query, token.handle, pool, 5, 0.01, stop_event,
+                        logging.getLogger(name))
+
+
+def test_tokens_are_independent():
+    fast, slow, failing = _Token(), _Token(), _Token()
+    failures = []
+
+    def slow_query(nonce: int):
+        sleep(0.5)
+        return f'swap {nonce}' if nonce < 20 else None
+
+    def failing_query(nonce: int):
+        failures.append(nonce)
+        raise CalledProcessError(1, 'secretcli', stderr=b'node is down')
+
+    stop_event = Event()
+    with ThreadPoolExecutor(16) as pool:
+        scanners = [_scanner('fast', fast, _contract(set(range(20))), pool, stop_event),
+                    _scanner('slow', slow, slow_query, pool, stop_event),
+                    _scanner('failing', failing, failing_query, pool, stop_event)]
+        for scanner in scanners:
+            scanner.start()
+        sleep(0.4)
+
+        # the slow token (and the failing one) didn't hold back the fast one
+        assert fast.handled == [f'swap {n}' for n in range(20)]
+        assert slow.handled == []
+        assert failing.handled == []
+
+        # the failing token backs off - its scans get further apart
+        assert scanners[2].failures >= 2
+        assert len(failures) < 5 * 10
+
+        stop_event.set()
+        for scanner in scanners:
+            scanner.join()
+
+    # the first scan of a token only queries the next nonce
+    assert slow.handled == ['swap 0']
+
+
+def test_window_grows_with_backlog():
+    token, queried = _Token(), []
+    existing = set(range(12))
+
+    def query(nonce: int):
+        queried.append(nonce)
+        return f'swap {nonce}' if nonce in existing else None
+
+    with ThreadPoolExecutor(5) as pool:
+        scanner = _scanner('token', token, query, pool, Event())
+        windows = []
+        for _ in range(7):
+            windows.append(scanner.window)
+            scanner.scan()
+
+    # 1, 2, 4 and 5 swaps, then an empty window - back to probing a single nonce while idle
+    assert windows == [1, 2, 4, 5, 5, 1, 1]
+    assert token.handled == [f'swap {n}' for n in range(12)]
+    assert queried[-2:] == [12, 12]
+
+
+def test_backoff():
+    scanner = TokenScanner('token', lambda: 0, None, None, None, 1, 2, Event(), logging.getLogger('token'))
+    delays = []
+    for failures in range(1, 10):
+        scanner.failures = failures
+        delays.append(scanner.backoff())
+    assert delays[:4] == [4, 8, 16, 32]
+    assert max(delays) == MAX_BACKOFF
@@ -0,0 +1,36 @@
+import logging
+import os
+
+import pytest
+
+from src.util.common import SHM_DIR, scratch_dir, temp_file, temp_files
+
+logger = logging.getLogger('temp_files')
+
+
+def test_scratch_dir():
+    path = scratch_dir()
+    assert path == scratch_dir()
+    assert os.path.isdir(path)
+    if os.access(SHM_DIR, os.W_OK):
+        assert os.path.dirname(path) == SHM_DIR
+
+
+def test_temp_file():
+    with temp_file('{"tx": 1}') as path:
+        assert os.path.dirname(path) == scratch_dir()
+        with open(path) as f:
+            assert f.read() == '{"tx": 1}'
+    assert not os.path.exists(path)
+
+
+def test_temp_files_are_removed_on_error():
+    paths = []
+    with pytest.raises(ValueError):
+        with temp_files(['a', 'b', 'c'], logger) as paths:
+            assert [open(path).read() for path in paths] == ['a', 'b', 'c']
+            raise ValueError('multisign failed')
+
+    assert len(paths) == 3
+    assert not any(os.path.exists(path) for path in paths)
+    assert os.listdir(scratch_dir()) == []
@@ -0,0 +1,57 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import perf_counter, sleep
+
+from web3 import Web3
+
+from src.util.eth.providers import ThreadLocalHTTPProvider
+
+LATENCY = 0.02
+REQUESTS_PER_THREAD = 25
+
+
+def _stand_in_node() -> str:
+    """JSON-RPC node which answers every request with a block, after LATENCY seconds"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):  # pylint: disable=invalid-name
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            sleep(LATENCY)
+            block = {'number': request['params'][0], 'hash': '0x' + '11' * 32, 'parentHash': '0x' + '22' * 32,
+                     'transactions': [], 'timestamp': '0x1'}
+            body = json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': block}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('localhost', 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://localhost:{server.server_address[1]}'
+
+
+def _throughput(w3: Web3, threads: int) -> float:
+    def work(thread: int):
+        for i in range(REQUESTS_PER_THREAD):
+            assert w3.eth.getBlock(thread * REQUESTS_PER_THREAD + i).number == thread * REQUESTS_PER_THREAD + i
+
+    start = perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(work, range(threads)))
+    return threads * REQUESTS_PER_THREAD / (perf_counter() - start)
+
+
+def test_throughput_scales_with_threads():
+    w3 = Web3(ThreadLocalHTTPProvider(_stand_in_node()))
+
+    results = {threads: _throughput(w3, threads) for threads in [1, 2, 4, 8]}
+    print('\n' + ', '.join(f'{threads} threads: {rate:.0f} blocks/sec' for threads, rate in results.items()))
+    assert results[8] > 4 * results[1]